@@ -3,14 +3,21 @@ Action Handler
 Handles actions based on violation severity: Discord notifications and logging.
 """
 
+import re
+import threading
+import urllib.parse
 import requests
 import json
 import asyncio
-import csv
-import os
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Tuple
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from ml_analyzer import AnalysisResult, ViolationLevel
+from training_store import TrainingStore, open_store
+from roster_cache import RosterCache
+from notification_dispatcher import NotificationDispatcher
 from logger import log
 
 
@@ -24,10 +31,28 @@ class ActionHandler:
         pp2_admin_url: Optional[str] = None,
         pp2_admin_user: str = "admin",
         pp2_admin_password: Optional[str] = None,
-        discord_bot: Optional[Any] = None
+        discord_bot: Optional[Any] = None,
+        online_learner: Optional[Any] = None,
+        training_store: Optional[TrainingStore] = None,
+        http_pool_size: int = 4,
+        http_retries: int = 3,
+        http_backoff: float = 0.25,
+        roster_refresh_interval: float = 30.0,
+        webhook_queue_size: int = 1000,
+        webhook_max_retries: int = 5,
+        webhook_max_rate_limit_wait: float = 60.0
     ):
         """
         Initialize action handler
+
+        Args:
+            http_pool_size: Keep-alive connections kept per admin server and for the webhook
+            http_retries: Retries for connection errors (and 502/503/504 on roster GETs)
+            http_backoff: Base delay (s) of the exponential backoff between retries
+            roster_refresh_interval: Maximum age (s) of a cached player list
+            webhook_queue_size: Webhook notifications waiting to be sent at most
+            webhook_max_retries: Attempts per notification after 5xx answers or connection errors
+            webhook_max_rate_limit_wait: Total time (s) a notification may wait on Discord 429 answers
         """
         self.discord_webhook_url = discord_webhook_url
         self.discord_enabled = discord_enabled and discord_webhook_url is not None
@@ -35,6 +60,71 @@ class ActionHandler:
         self.pp2_admin_user = pp2_admin_user
         self.pp2_admin_password = pp2_admin_password
         self.discord_bot = discord_bot
+        self.online_learner = online_learner
+        self.training_store = training_store
+
+        self.http_pool_size = http_pool_size
+        self.http_retries = http_retries
+        self.http_backoff = http_backoff
+        # One keep-alive session per (admin_url, user, password), created on first use
+        self._admin_sessions: Dict[Tuple[str, str, str], requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._webhook_session: Optional[requests.Session] = None
+        self.rosters = RosterCache(self._fetch_admin_page, refresh_interval=roster_refresh_interval)
+        # Webhook posts are sent from a worker thread, the monitors only queue them
+        self.notifier = NotificationDispatcher(
+            self._webhook, max_queue=webhook_queue_size,
+            max_retries=webhook_max_retries, backoff=http_backoff,
+            max_rate_limit_wait=webhook_max_rate_limit_wait
+        )
+
+    def _new_session(self, status_retries: bool = True) -> requests.Session:
+        # Commands are not idempotent: POSTs are only retried when the connection
+        # could not be made, reads and 5xx answers are retried for GETs only.
+        # The webhook session gets no status retries at all, the dispatcher
+        # handles 429 and 5xx answers itself and must see every one of them.
+        retry = Retry(
+            total=self.http_retries, connect=self.http_retries, read=self.http_retries,
+            status=self.http_retries if status_retries else 0, backoff_factor=self.http_backoff,
+            status_forcelist=(502, 503, 504) if status_retries else None,
+            allowed_methods=frozenset({"GET"}), raise_on_status=False,
+            respect_retry_after_header=status_retries
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.http_pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _admin_session(self, admin_url: str, admin_user: str, admin_password: str) -> requests.Session:
+        key = (admin_url, admin_user, admin_password)
+        session = self._admin_sessions.get(key)
+        if session is None:
+            with self._sessions_lock:
+                session = self._admin_sessions.get(key)
+                if session is None:
+                    session = self._new_session()
+                    session.auth = HTTPBasicAuth(admin_user, admin_password)
+                    self._admin_sessions[key] = session
+        return session
+
+    def _webhook(self) -> requests.Session:
+        if self._webhook_session is None:
+            with self._sessions_lock:
+                if self._webhook_session is None:
+                    self._webhook_session = self._new_session(status_retries=False)
+        return self._webhook_session
+
+    def close(self):
+        """Send queued notifications and close pooled HTTP connections"""
+        self.notifier.close()
+        with self._sessions_lock:
+            for session in self._admin_sessions.values():
+                session.close()
+            self._admin_sessions.clear()
+            if self._webhook_session is not None:
+                self._webhook_session.close()
+                self._webhook_session = None
     
     def handle_violation(
         self,
@@ -97,7 +187,7 @@ class ActionHandler:
                 }]
             }
             try:
-                requests.post(self.discord_webhook_url, json=payload, timeout=10)
+                self.notifier.submit(self.discord_webhook_url, payload)
             except Exception as e: print(f"❌ Virhe avunpyynnön lähetyksessä Discordiin: {e}")
     
     def _log_violation(self, server_name, player_name, violation_type, content, analysis, ip_address):
@@ -131,7 +221,7 @@ class ActionHandler:
             fields.append({"name": "Ban-komento", "value": f"```{ban_command}```", "inline": False})
         payload = {"embeds": [{"title": title, "color": color, "fields": fields, "timestamp": datetime.utcnow().isoformat(), "footer": {"text": "PP2 Suspicious Detector"}}]}
         try:
-            requests.post(self.discord_webhook_url, json=payload, timeout=10)
+            self.notifier.submit(self.discord_webhook_url, payload)
         except Exception as e: log.error(f"❌ Error sending Discord notification: {e}")
 
     def execute_command(self, command: str, server_config: Optional[dict] = None) -> Optional[str]:
@@ -154,15 +244,13 @@ class ActionHandler:
 
         log.info(f"🚀 Suoritetaan PP2-komento ({pp2_admin_url}): {command}")
         try:
-            from requests.auth import HTTPBasicAuth
             # Force CP1252 encoding for legacy server support
-            import urllib.parse
             encoded_command = urllib.parse.quote(command, encoding='cp1252')
             payload = f"c={encoded_command}"
 
-            response = requests.post(
+            session = self._admin_session(pp2_admin_url, pp2_admin_user, pp2_admin_password)
+            response = session.post(
                 pp2_admin_url, data=payload,
-                auth=HTTPBasicAuth(pp2_admin_user, pp2_admin_password),
                 headers={'Content-Type': 'application/x-www-form-urlencoded', 'Referer': pp2_admin_url},
                 timeout=10
             )
@@ -177,46 +265,21 @@ class ActionHandler:
             return f"Virhe: {str(e)}"
 
     def _save_to_training_data(self, text: str, label: str):
-        """Save a new sample to the training data CSV"""
-        data_file = "data/training_data.csv"
+        """Save a moderator decision to the training store"""
         try:
-            # Ensure directory exists but don't overwrite the file
-            os.makedirs("data", exist_ok=True)
-            
-            # Check if file exists to decide whether to write header
-            file_exists = os.path.isfile(data_file)
-            
-            # Sanitize input: remove commas as they break CSV format
-            text = text.replace(",", "")
-            
-            # Check if we need to add a newline before appending
-            needs_newline = False
-            if file_exists and os.path.getsize(data_file) > 0:
-                try:
-                    with open(data_file, 'rb') as f:
-                        f.seek(-1, os.SEEK_END)
-                        last_char = f.read(1)
-                        if last_char not in [b'\n', b'\r']:
-                            needs_newline = True
-                except Exception:
-                    pass
-
-            with open(data_file, mode='a', newline='', encoding='utf-8') as f:
-                if needs_newline:
-                    f.write('\n')
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow(["text", "label"])
-                writer.writerow([text, label])
-            
+            if self.training_store is None:
+                self.training_store = open_store()
+            self.training_store.add(text, label, source="moderator")
             log.info(f"💾 Tallennettu opetusdataa: '{text[:30]}...' -> {label}")
+            
+            if self.online_learner:
+                self.online_learner.learn(text, label)
         except Exception as e:
             log.error(f"❌ Virhe opetusdatan tallennuksessa: {e}")
 
     def _parse_admin_response(self, html_content: str) -> str:
         """Extract the relevant response content from the admin HTML"""
         try:
-            import re
             # PP2 admin response is usually in a <textarea>
             match = re.search(r'<textarea[^>]*>(.*?)</textarea>', html_content, re.DOTALL | re.IGNORECASE)
             if match:
@@ -233,34 +296,43 @@ class ActionHandler:
         except Exception:
             return "Virhe vastauksen käsittelyssä."
 
-    def get_live_player_index(self, player_name: str, server_config: Optional[dict] = None) -> Optional[str]:
+    def _admin_config(self, server_config: Optional[dict]) -> dict:
         if not server_config:
             # Fallback
-            pp2_admin_url = self.pp2_admin_url
-            pp2_admin_user = self.pp2_admin_user
-            pp2_admin_password = self.pp2_admin_password
-        else:
-            pp2_admin_url = server_config.get('admin_url')
-            pp2_admin_user = server_config.get('admin_user', 'admin')
-            pp2_admin_password = server_config.get('admin_password')
+            return {
+                'admin_url': self.pp2_admin_url,
+                'admin_user': self.pp2_admin_user,
+                'admin_password': self.pp2_admin_password
+            }
+        return server_config
 
+    def _fetch_admin_page(self, server_config: dict) -> Optional[str]:
+        """Download Admin.html (the player list), None on failure"""
+        pp2_admin_url = server_config.get('admin_url')
+        pp2_admin_password = server_config.get('admin_password')
         if not pp2_admin_url or not pp2_admin_password: return None
         try:
-            import re
-            from requests.auth import HTTPBasicAuth
-            response = requests.get(
-                pp2_admin_url, auth=HTTPBasicAuth(pp2_admin_user, pp2_admin_password), timeout=5
-            )
+            session = self._admin_session(pp2_admin_url, server_config.get('admin_user', 'admin'), pp2_admin_password)
+            response = session.get(pp2_admin_url, timeout=5)
             if response.status_code != 200: return None
-            pattern = re.compile(rf"\[(\d+)\]\s+{re.escape(player_name)}", re.IGNORECASE)
-            match = pattern.search(response.text)
-            if match: return match.group(1)
-            fallback_pattern = re.compile(rf"\[(\d+)\]\s+[^<]*{re.escape(player_name)}", re.IGNORECASE)
-            match = fallback_pattern.search(response.text)
-            if match: return match.group(1)
-            return None
+            return response.text
         except Exception: return None
 
+    def get_live_player_index(
+        self, player_name: str, server_config: Optional[dict] = None, fresh: bool = False
+    ) -> Optional[str]:
+        """
+        Slot index of a player from the cached Admin.html player list
+
+        Args:
+            fresh: Download the player list now, for kicks and bans that must not hit whoever took over an old slot
+        """
+        return self.rosters.lookup(player_name, self._admin_config(server_config), max_age=0 if fresh else None)
+
+    def invalidate_roster(self, server_config: Optional[dict] = None):
+        """A player joined or left, reload the player list on the next lookup"""
+        self.rosters.invalidate(self._admin_config(server_config))
+
     def _send_interactive_notification(
         self,
         server_name: str,
@@ -304,9 +376,12 @@ class ActionHandler:
                 if "{full_name}" in cmd:
                     cmd = cmd.replace("{full_name}", name_with_ids if name_with_ids else player_name)
                 
-                # Resolve index in thread
+                # Resolve index in thread, kicks and bans from a freshly downloaded player list
+                destructive = severity != "MINOR"
                 if "{index}" in cmd:
-                    live_index = await asyncio.to_thread(self.get_live_player_index, player_name, server_config)
+                    live_index = await asyncio.to_thread(
+                        self.get_live_player_index, player_name, server_config, destructive
+                    )
                     cmd = cmd.replace("{index}", str(live_index) if live_index else player_name)
                 
                 if ip_address:
@@ -317,7 +392,7 @@ class ActionHandler:
                 
                 # Follow up with kick if it was a ban
                 if "/banaddress" in cmd:
-                    live_index = await asyncio.to_thread(self.get_live_player_index, player_name, server_config)
+                    live_index = await asyncio.to_thread(self.get_live_player_index, player_name, server_config, True)
                     kick_cmd = f"/kick {str(live_index) if live_index else player_name}"
                     await asyncio.to_thread(self.execute_command, kick_cmd, server_config)
             
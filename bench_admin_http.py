@@ -0,0 +1,113 @@
+"""
+Benchmark: PP2 admin commands per second, per-call requests vs pooled sessions
+Runs against FakePP2Server. "legacy" is the previous ActionHandler code path
+(module-level requests.post/get with the imports inside the call, a new TCP
+connection every time); "pooled" is ActionHandler with its keep-alive
+session per admin_url. A "ban" is what confirming a SEVERE action costs:
+roster GET, /banaddress POST, roster GET, /kick POST.
+
+--rtt-ms simulates the network between the detector and pp2host: every
+request waits one round trip, every new connection one more.
+
+Usage:
+    python bench_admin_http.py [--commands 2000] [--threads 1 4] [--rtt-ms 0 20]
+"""
+
+import argparse
+import threading
+import time
+
+import requests
+
+from action_handler import ActionHandler
+from fake_pp2 import FakePP2Server
+
+
+def legacy_execute(command: str, server_config: dict) -> int:
+    from requests.auth import HTTPBasicAuth
+    import urllib.parse
+    url = server_config['admin_url']
+    response = requests.post(
+        url, data=f"c={urllib.parse.quote(command, encoding='cp1252')}",
+        auth=HTTPBasicAuth(server_config['admin_user'], server_config['admin_password']),
+        headers={'Content-Type': 'application/x-www-form-urlencoded', 'Referer': url},
+        timeout=10
+    )
+    return response.status_code
+
+
+def legacy_index(player: str, server_config: dict) -> int:
+    from requests.auth import HTTPBasicAuth
+    response = requests.get(
+        server_config['admin_url'],
+        auth=HTTPBasicAuth(server_config['admin_user'], server_config['admin_password']), timeout=5
+    )
+    return response.status_code
+
+
+def make_ops(kind: str):
+    handler = ActionHandler()
+    if kind == "legacy":
+        execute, index = legacy_execute, legacy_index
+    else:
+        execute, index = handler.execute_command, handler.get_live_player_index
+
+    def command(i, config):
+        execute(f"/{i % 32} Tervetuloa Pelaaja{i}!", config)
+
+    def ban(i, config):
+        index(f"Pelaaja{i % 32}", config)
+        execute(f"/banaddress 10.0.0.{i % 256} 9999999 Pelaaja{i % 32}", config)
+        index(f"Pelaaja{i % 32}", config)
+        execute(f"/kick {i % 32}", config)
+
+    return handler, {"command": command, "ban": ban}
+
+
+def run(kind: str, op: str, count: int, threads: int, rtt_ms: float) -> dict:
+    fake = FakePP2Server(rtt=rtt_ms / 1000).start()
+    for i in range(32):
+        fake.add_player("bench", f"Pelaaja{i}")
+    config = {"admin_url": fake.admin_url("bench"), "admin_user": "admin", "admin_password": "bench"}
+    handler, ops = make_ops(kind)
+    action = ops[op]
+    per_thread = count // threads
+
+    def worker(offset):
+        for i in range(offset, offset + per_thread):
+            action(i, config)
+
+    workers = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    handler.close()
+    fake.close()
+    return {"ops_s": per_thread * threads / elapsed, "requests": fake.requests, "connections": fake.connections}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admin HTTP client benchmark")
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rtt-ms", type=float, nargs="+", default=[0.0, 20.0])
+    args = parser.parse_args()
+
+    print(f"{'RTT ms':>6} | {'Op':<8} | {'Threads':>7} | {'Client':<7} | {'Ops/s':>8} | {'Requests':>8} | {'TCP conns':>9}")
+    print("-" * 71)
+    for rtt_ms in args.rtt_ms:
+        # With a slow link fewer operations are enough for a stable rate
+        scale = 1 if rtt_ms == 0 else 10
+        for op, count in (("command", args.commands // scale), ("ban", args.commands // 4 // scale)):
+            for threads in args.threads:
+                for kind in ("legacy", "pooled"):
+                    r = run(kind, op, count, threads, rtt_ms)
+                    print(f"{rtt_ms:>6g} | {op:<8} | {threads:>7} | {kind:<7} | {r['ops_s']:>8.0f} | "
+                          f"{r['requests']:>8} | {r['connections']:>9}")
+
+
+if __name__ == "__main__":
+    main()
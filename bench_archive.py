@@ -0,0 +1,124 @@
+"""
+Benchmark: chat archive writes, size and range scans
+Appends synthetic chat (Zipf-distributed words, 2000 players, three servers,
+one message every 2 seconds) through ChatArchive.append_message and writes
+the same messages as raw PP2 chatlogs. Reports the cost per append on the
+monitor thread, the compressed size against the raw logs, and the time to
+read one hour and one day back: from the archive (seek index) and by
+re-parsing the raw chatlogs with ChatStreamParser, which is what replaying
+history meant before.
+
+Usage:
+    python bench_archive.py [--messages 1000000] [--frame-records 1000]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bounded_cache import log_minute
+from chat_archive import ChatArchive
+from log_parser import ChatMessage, ChatStreamParser
+
+SYLLABLES = ["ka", "la", "pe", "li", "to", "mi", "nen", "ssa", "ko", "ru", "vi", "ja", "hu", "po", "tä", "mö", "sa", "ri"]
+SERVERS = ["Main Server", "Second Server", "Third Server"]
+
+
+def generate(messages: int, seed: int = 7):
+    rng = random.Random(seed)
+    vocabulary = list(dict.fromkeys(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(8000)
+    ))
+    cumulative = list(itertools.accumulate(1 / (n + 1) for n in range(len(vocabulary))))
+    start_time = datetime(2026, 1, 1)
+    for i in range(messages):
+        timestamp = (start_time + timedelta(seconds=2 * i)).strftime("%d.%m.%Y %H:%M")
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(2, 12))
+        yield rng.choice(SERVERS), ChatMessage(timestamp, f"Pelaaja{rng.randrange(2000)}", " ".join(words))
+
+
+def scan_raw(directory: str, since: int, until: int) -> int:
+    """Replay from the raw chatlogs: parse everything, keep the range"""
+    found = 0
+    for server in SERVERS:
+        parser = ChatStreamParser()
+        with open(os.path.join(directory, f"{server}.log"), encoding="utf-8") as f:
+            for line in f:
+                for message in parser.feed(line):
+                    minute = log_minute(message.timestamp)
+                    if since <= minute * 60 < until:
+                        found += 1
+    return found
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat archive benchmark")
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--frame-records", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_archive_")
+    root = os.path.join(directory, "archive")
+    try:
+        raw_files = {s: open(os.path.join(directory, f"{s}.log"), "w", encoding="utf-8") for s in SERVERS}
+        archive = ChatArchive(root, frame_records=args.frame_records, flush_interval=10.0)
+        append_times = []
+        start = time.perf_counter()
+        for server, message in generate(args.messages):
+            raw_files[server].write(f"{message.player_name}:        [{message.timestamp}]\n{message.message}\n\n")
+            t = time.perf_counter()
+            archive.append_message(server, message)
+            append_times.append(time.perf_counter() - t)
+        archive.close()
+        total = time.perf_counter() - start
+        for f in raw_files.values():
+            f.close()
+
+        append_times.sort()
+        raw_bytes = sum(os.path.getsize(os.path.join(directory, f"{s}.log")) for s in SERVERS)
+        stats = archive.stats()
+        archive_bytes = sum(s["bytes"] for s in stats.values())
+        index_bytes = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root)
+                          for f in files if f.endswith(".idx"))
+        days = max(s["days"] for s in stats.values())
+        print(f"{args.messages} messages over {days} days, {args.frame_records} records per frame\n")
+        print(f"append p50 {append_times[len(append_times) // 2] * 1e6:.1f} us, "
+              f"p99 {append_times[int(len(append_times) * 0.99)] * 1e6:.1f} us, "
+              f"max {append_times[-1] * 1e3:.1f} ms (frame compression on the caller)")
+        print(f"total incl. raw log writes {args.messages / total:.0f} messages/s\n")
+        print(f"raw chatlogs    {raw_bytes / 1e6:8.1f} MB")
+        print(f"archive         {archive_bytes / 1e6:8.1f} MB  ({raw_bytes / archive_bytes:.1f}x smaller, "
+              f"index {index_bytes / 1e3:.0f} kB)\n")
+
+        middle = int(datetime(2026, 1, 1).timestamp()) + args.messages  # half way, 2 s per message
+        middle -= middle % 3600
+        print(f"{'Range':<12} | {'Records':>8} | {'Raw chatlog ms':>14} | {'Archive ms':>10} | Speedup")
+        print("-" * 64)
+        for name, length in [("1 hour", 3600), ("1 day", 86400), ("everything", None)]:
+            since, until = (middle, middle + length) if length else (None, None)
+            raw_ms, raw_count = timed(lambda: scan_raw(directory, since or 0, until or 2 ** 62), 1)
+            archive_ms, count = timed(lambda: sum(1 for _ in archive.scan(since, until)), args.repeat)
+            assert count == raw_count, (count, raw_count)
+            print(f"{name:<12} | {count:>8} | {raw_ms:>14.0f} | {archive_ms:>10.1f} | {raw_ms / archive_ms:>6.1f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
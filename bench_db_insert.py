@@ -0,0 +1,136 @@
+"""
+Benchmark: violation inserts, connection + commit per row vs the WAL writer
+"legacy" is the previous Database.add_violation (sqlite3.connect, INSERT,
+commit, close on the calling thread, rollback journal); "batched" is
+Database with its writer thread group-committing in WAL mode. Reports rows
+per second until everything is committed, and how long the calling
+(monitor) thread waits per insert. A reader thread runs get_stats() the
+whole time, as the Discord bot would.
+
+Usage:
+    python bench_db_insert.py [--rows 2000] [--threads 1 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from database import Database
+
+
+def legacy_database(path: str):
+    """Schema as the old Database created it, and its per-row insert"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, player_name TEXT NOT NULL,
+            ip_address TEXT, violation_type TEXT NOT NULL, content TEXT NOT NULL, level TEXT NOT NULL,
+            reason TEXT NOT NULL, suggested_action TEXT NOT NULL, created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_name ON violations(player_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_level ON violations(level)")
+    conn.commit()
+    conn.close()
+
+    def add_violation(**row):
+        conn = sqlite3.connect(path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO violations (
+                timestamp, player_name, ip_address, violation_type,
+                content, level, reason, suggested_action, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (row['timestamp'], row['player_name'], row['ip_address'], row['violation_type'], row['content'],
+              row['level'], row['reason'], row['suggested_action'], datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+
+    def get_stats():
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("SELECT level, COUNT(*) FROM violations GROUP BY level").fetchall()
+        conn.close()
+
+    return add_violation, get_stats, lambda: None
+
+
+def run(kind: str, rows: int, threads: int, tmpdir: str) -> dict:
+    path = os.path.join(tmpdir, f"{kind}-{threads}.db")
+    if kind == "legacy":
+        add_violation, get_stats, finish = legacy_database(path)
+        db = None
+    else:
+        db = Database(path)
+        add_violation, get_stats, finish = db.add_violation, db.get_stats, db.flush
+
+    per_thread = rows // threads
+    latencies = [[] for _ in range(threads)]
+    stop = threading.Event()
+    reads = [0]
+
+    def writer(n):
+        for i in range(per_thread):
+            start = time.perf_counter()
+            add_violation(
+                timestamp="2024-01-31 12:00", player_name=f"Pelaaja{i % 50}", violation_type="message",
+                content=f"testiviesti {n} {i}", level="MINOR", reason="bench", suggested_action="warn",
+                ip_address="10.0.0.1"
+            )
+            latencies[n].append((time.perf_counter() - start) * 1000)
+
+    def reader():
+        while not stop.is_set():
+            get_stats()
+            reads[0] += 1
+            time.sleep(0.01)
+
+    read_thread = threading.Thread(target=reader)
+    read_thread.start()
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    finish()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    read_thread.join()
+    commits = db.commits if db else per_thread * threads
+    if db:
+        db.close()
+    merged = sorted(l for per in latencies for l in per)
+    return {
+        "rows_s": per_thread * threads / elapsed,
+        "p50": statistics.median(merged),
+        "p99": merged[int(0.99 * (len(merged) - 1))],
+        "commits": commits,
+        "reads": reads[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Violation insert benchmark")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows\n")
+    print(f"{'Threads':>7} | {'Writer':<7} | {'Rows/s':>8} | {'Caller p50 ms':>13} | {'Caller p99 ms':>13} | "
+          f"{'Commits':>7} | {'Reads':>5}")
+    print("-" * 79)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for threads in args.threads:
+            for kind in ("legacy", "batched"):
+                r = run(kind, args.rows, threads, tmpdir)
+                print(f"{threads:>7} | {kind:<7} | {r['rows_s']:>8.0f} | {r['p50']:>13.3f} | {r['p99']:>13.3f} | "
+                      f"{r['commits']:>7} | {r['reads']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: phrase search over violations, FTS5 index vs LIKE scan
+Builds a synthetic violations.db through Database.add_violation (so the
+FTS index is maintained as in production): Zipf-distributed words from a
+generated vocabulary, 2000 players on three servers, one row every 10
+seconds. A rare phrase is planted in a few rows. Then times
+Database.search for typical moderator queries against the LIKE '%...%'
+scan they replace.
+
+--db keeps the generated file, a second run with the same path skips the
+generation.
+
+Usage:
+    python bench_db_search.py [--rows 2000000] [--db /tmp/search.db] [--repeat 5]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+
+NEEDLE = "kultainen kalapuikko"
+SYLLABLES = ["ka", "la", "pe", "li", "to", "mi", "nen", "ssa", "ko", "ru", "vi", "ja", "hu", "po", "tä", "mö", "sa", "ri"]
+
+
+def build(path: str, rows: int, seed: int = 5):
+    rng = random.Random(seed)
+    vocabulary = list(dict.fromkeys(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(8000)
+    ))
+    # Zipf-like: the n-th word is picked with weight 1/n
+    cumulative = list(itertools.accumulate(1 / (n + 1) for n in range(len(vocabulary))))
+    servers = ["Main Server", "Second Server", "Third Server"]
+    start_time = datetime(2024, 1, 1)
+    db = Database(path, batch_size=2000)
+    t = time.perf_counter()
+    for i in range(rows):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(3, 10))
+        if i % (rows // 20) == 7:
+            words.insert(rng.randrange(len(words)), NEEDLE)
+        db.add_violation(
+            (start_time + timedelta(seconds=10 * i)).strftime("%d.%m.%Y %H:%M"), f"Pelaaja{rng.randrange(2000)}",
+            "message", " ".join(words), rng.choice(["MINOR", "MODERATE", "SEVERE"]), "bench", "warn",
+            server_name=rng.choice(servers)
+        )
+        if i and i % 250000 == 0:
+            print(f"  {i} rows, {i / (time.perf_counter() - t):.0f} rows/s")
+    db.close()
+    print(f"  {rows} rows in {time.perf_counter() - t:.0f} s, {rows / (time.perf_counter() - t):.0f} rows/s "
+          f"including the FTS index and rollups, {os.path.getsize(path) / 1e6:.0f} MB\n")
+    return vocabulary
+
+
+def timed(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Violation full-text search benchmark")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--db", default=None, help="Keep the generated database here")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.db
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "violations.db")
+    if not os.path.exists(path):
+        print(f"Building {args.rows} synthetic violations...")
+        build(path, args.rows)
+
+    db = Database(path)
+    scan = sqlite3.connect(path)
+    total = db.get_stats()["total"]
+    last = scan.execute("SELECT MAX(event_time) FROM violations").fetchone()[0]
+    week = last - 7 * 86400
+    common = scan.execute("SELECT content FROM violations WHERE id = 1").fetchone()[0].split()[0]
+    player = scan.execute("SELECT player_name FROM violations WHERE id = 1").fetchone()[0]
+
+    cases = [
+        (f'rare phrase "{NEEDLE}"', lambda: db.search(f'"{NEEDLE}"', limit=6),
+         lambda: scan.execute("SELECT * FROM violations WHERE content LIKE ? LIMIT 6", (f"%{NEEDLE}%",)).fetchall()),
+        (f"common word '{common}'", lambda: db.search(common, limit=6),
+         lambda: scan.execute("SELECT * FROM violations WHERE content LIKE ? ORDER BY event_time DESC LIMIT 6",
+                              (f"%{common}%",)).fetchall()),
+        ("common word, one player", lambda: db.search(common, player_name=player, limit=6),
+         lambda: scan.execute("SELECT * FROM violations WHERE player_name = ? AND content LIKE ? LIMIT 6",
+                              (player, f"%{common}%")).fetchall()),
+        ("common word, last 7 days", lambda: db.search(common, since=week, limit=6),
+         lambda: scan.execute("SELECT * FROM violations WHERE event_time >= ? AND content LIKE ? LIMIT 6",
+                              (week, f"%{common}%")).fetchall()),
+        ("rare phrase, page 3", lambda: db.search(f'"{NEEDLE}"', limit=6, offset=12),
+         lambda: scan.execute("SELECT * FROM violations WHERE content LIKE ? LIMIT 6 OFFSET 12",
+                              (f"%{NEEDLE}%",)).fetchall()),
+    ]
+
+    print(f"{total} violations\n")
+    print(f"{'Query':<40} | {'Hits':>5} | {'FTS5 ms':>8} | {'LIKE ms':>8}")
+    print("-" * 70)
+    for name, fts, like in cases:
+        fts_ms, hits = timed(fts, args.repeat)
+        like_ms, _ = timed(like, max(1, args.repeat // 2))
+        print(f"{name:<40} | {len(hits):>5} | {fts_ms:>8.2f} | {like_ms:>8.1f}")
+
+    scan.close()
+    db.close()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
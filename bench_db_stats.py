@@ -0,0 +1,82 @@
+"""
+Benchmark: Database.get_stats, full-table aggregates vs rollup tables
+Fills violations.db through Database.add_violation (so the rollups are
+maintained as in production) up to each size, then times the previous
+get_stats queries (COUNT, GROUP BY level, GROUP BY player_name ORDER BY
+count) against the rollup-backed get_stats(). Also reports insert
+throughput, which now includes the rollup upserts.
+
+Usage:
+    python bench_db_stats.py [--sizes 10000 100000 500000] [--players 5000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+
+
+def legacy_stats(conn: sqlite3.Connection) -> dict:
+    """The previous get_stats queries"""
+    total = conn.execute("SELECT COUNT(*) FROM violations").fetchone()[0]
+    by_level = dict(conn.execute("SELECT level, COUNT(*) as count FROM violations GROUP BY level").fetchall())
+    top = conn.execute("""
+        SELECT player_name, COUNT(*) as count FROM violations
+        GROUP BY player_name ORDER BY count DESC LIMIT 10
+    """).fetchall()
+    return {"total": total, "by_level": by_level, "top_violators": top}
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Violation statistics benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start_time = datetime(2025, 1, 1)
+    servers = ["Main Server", "Second Server", "Third Server"]
+    levels = ["MINOR", "MINOR", "MODERATE", "SEVERE"]
+
+    print(f"{'Rows':>8} | {'Insert rows/s':>13} | {'Full scan ms':>12} | {'Rollups ms':>10} | {'Speedup':>7}")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "violations.db")
+        db = Database(path, batch_size=1000)
+        conn = sqlite3.connect(path)
+        rows = 0
+        for size in sorted(args.sizes):
+            t = time.perf_counter()
+            for i in range(rows, size):
+                when = start_time + timedelta(seconds=20 * i)
+                db.add_violation(
+                    when.strftime("%d.%m.%Y %H:%M"), f"Pelaaja{int(rng.paretovariate(1.2)) % args.players}",
+                    "message", "testiviesti", rng.choice(levels), "bench", "warn", server_name=rng.choice(servers)
+                )
+            db.flush()
+            insert_rate = (size - rows) / (time.perf_counter() - t)
+            rows = size
+
+            assert legacy_stats(conn)["total"] == db.get_stats()["total"] == size
+            full_ms = timed(lambda: legacy_stats(conn), max(1, args.repeat // 4))
+            rollup_ms = timed(db.get_stats, args.repeat)
+            print(f"{size:>8} | {insert_rate:>13.0f} | {full_ms:>12.2f} | {rollup_ms:>10.3f} | {full_ms / rollup_ms:>6.0f}x")
+        conn.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Load test: the whole detector under synthetic PP2 traffic
+Starts detector.py in a separate process against N simulated servers in a
+temporary directory. The harness appends chatlog.txt / playlog.txt traffic at
+a fixed rate and runs FakePP2Server, a local stand-in for every server's
+Admin.html (player list + command POST) and for the Discord webhook.
+
+Reports end-to-end latency from a line being written to its database row,
+webhook notification and welcome command, the throughput the detector kept
+up with, and the detector's thread count, RSS and CPU time. Use it to size
+hardware for a number of servers and a message rate.
+
+Usage:
+    python bench_load.py [--servers 4] [--rate 50] [--join-rate 1] [--seconds 20]
+    python bench_load.py --servers 20 --mode threads asyncio
+"""
+
+import argparse
+import os
+import random
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import yaml
+
+from fake_pp2 import FakePP2Server
+from generate_training_data import generate_ok_data, generate_minor_data, generate_severe_data
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TAG_PATTERN = re.compile(r"#(\d+)")
+
+
+def make_messages(count: int, toxic: float, seed: int) -> list:
+    """Chat lines from the training data generators, `toxic` share MINOR/SEVERE"""
+    rng = random.Random(seed)
+    ok = [text for text, _ in generate_ok_data(count, rng=rng)]
+    bad = [text for text, _ in generate_minor_data(count // 2, rng=rng) + generate_severe_data(count // 2, rng=rng)]
+    return [rng.choice(bad) if rng.random() < toxic else rng.choice(ok) for _ in range(count)]
+
+
+def write_config(workdir: str, fake: FakePP2Server, servers: int, mode: str, verify_all: bool) -> list:
+    names = [f"srv{i:02d}" for i in range(servers)]
+    config_path = os.path.join(REPO_DIR, "config.yaml")
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config["servers"] = [{
+        "name": name,
+        "chatlog_path": os.path.join(workdir, name, "chatlog.txt"),
+        "playlog_path": os.path.join(workdir, name, "playlog.txt"),
+        "admin_url": fake.admin_url(name),
+        "admin_user": "admin",
+        "admin_password": "bench",
+    } for name in names]
+    config["monitor"]["mode"] = mode
+    config["discord"] = {"enabled": True, "verify_all": verify_all}
+    config["ml"].setdefault("online", {})["enabled"] = False
+    for name in names:
+        os.makedirs(os.path.join(workdir, name))
+        for log_name in ("chatlog.txt", "playlog.txt"):
+            open(os.path.join(workdir, name, log_name), "w").close()
+    with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.dump(config, f, allow_unicode=True)
+    return names
+
+
+def proc_stats(pid: int) -> dict:
+    """Threads, RSS and CPU seconds of a process from /proc"""
+    stats = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Threads", "VmRSS", "VmHWM"):
+                stats[key] = int(value.split()[0])
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    stats["cpu_s"] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return stats
+
+
+def start_detector(workdir: str, servers: int, fake: FakePP2Server) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "DISCORD_WEBHOOK_URL": fake.webhook_url,
+        "DISCORD_BOT_TOKEN": "",
+        "ML_MODEL_PATH": os.path.join(REPO_DIR, "models", "violation_model.joblib"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "detector.py")],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, encoding="utf-8", errors="replace"
+    )
+    # Both monitors of every server log before they start tailing
+    ready = threading.Event()
+
+    def drain():
+        watching = 0
+        for line in process.stdout:
+            if "👀" in line:
+                watching += 1
+                if watching == 2 * servers:
+                    ready.set()
+        ready.set()
+
+    threading.Thread(target=drain, daemon=True).start()
+    if not ready.wait(120) or process.poll() is not None:
+        raise RuntimeError("detector did not start")
+    time.sleep(1.0)  # session index build + tailer setup after the log line
+    return process
+
+
+def write_traffic(workdir, names, fake, messages, rate, join_rate, seconds, sampler):
+    """Append chat messages and joins on schedule. Returns write times by tag / player."""
+    chat_written = {}
+    join_written = {}
+    chat = {name: open(os.path.join(workdir, name, "chatlog.txt"), "a", encoding="utf-8") for name in names}
+    play = {name: open(os.path.join(workdir, name, "playlog.txt"), "a", encoding="utf-8") for name in names}
+
+    start = time.perf_counter()
+    next_chat = next_join = start
+    n_chat = n_join = 0
+    end = start + seconds
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if now >= next_chat:
+                name = names[n_chat % len(names)]
+                stamp = datetime.now().strftime("%d.%m.%Y %H:%M")
+                player = f"Pelaaja{n_chat % 997:03d}"
+                chat[name].write(f"{player}:        [{stamp}]\n{messages[n_chat % len(messages)]} #{n_chat}\n")
+                chat[name].flush()
+                chat_written[n_chat] = time.time()
+                n_chat += 1
+                next_chat += 1.0 / rate
+            if join_rate > 0 and now >= next_join:
+                name = names[n_join % len(names)]
+                player = f"Liittyja{n_join:06d}"
+                ip = f"10.{n_join // 65536 % 256}.{n_join // 256 % 256}.{n_join % 256}"
+                stamp = datetime.now().strftime("%d.%m.%Y %H:%M")
+                fake.add_player(name, player)
+                play[name].write(f"--> {player} joined the game (ip: {ip}). [{stamp}] "
+                                 f"[/banaddress {ip} 60 {player} {1124073472 + n_join} ] [v2.0.7]\n")
+                play[name].flush()
+                join_written[player] = time.time()
+                n_join += 1
+                next_join += 1.0 / join_rate
+            sampler()
+            time.sleep(max(0.0, min(next_chat, next_join if join_rate > 0 else next_chat) - time.perf_counter()))
+    finally:
+        for f in list(chat.values()) + list(play.values()):
+            f.close()
+    return chat_written, join_written, time.perf_counter() - start
+
+
+def db_rows(workdir: str) -> dict:
+    """Violation rows by message tag -> created_at (epoch seconds)"""
+    path = os.path.join(workdir, "data", "violations.db")
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        rows = conn.execute("SELECT content, created_at FROM violations WHERE violation_type = 'message'").fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    conn.close()
+    result = {}
+    for content, created_at in rows:
+        match = TAG_PATTERN.search(content)
+        if match:
+            result[int(match.group(1))] = datetime.fromisoformat(created_at).timestamp()
+    return result
+
+
+def webhook_times(fake: FakePP2Server) -> dict:
+    result = {}
+    with fake.lock:
+        webhooks = list(fake.webhooks)
+    for received_at, payload in webhooks:
+        for embed in payload.get("embeds", []):
+            for field in embed.get("fields", []):
+                if field.get("name") == "Sisältö":
+                    match = TAG_PATTERN.search(field.get("value", ""))
+                    if match:
+                        result[int(match.group(1))] = received_at
+    return result
+
+
+def welcome_times(fake: FakePP2Server) -> dict:
+    with fake.lock:
+        commands = list(fake.commands)
+    return {command.split()[2].rstrip("!"): received_at
+            for received_at, _, command in commands if "Tervetuloa" in command}
+
+
+def latency_ms(written: dict, arrived: dict) -> list:
+    return sorted((arrived[key] - written[key]) * 1000 for key in written if key in arrived)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(mode: str, args, messages: list) -> dict:
+    fake = FakePP2Server().start()
+    workdir = tempfile.mkdtemp(prefix="pp2load-")
+    names = write_config(workdir, fake, args.servers, mode, args.verify_all)
+    process = start_detector(workdir, args.servers, fake)
+    idle = proc_stats(process.pid)
+    peak = {"Threads": idle["Threads"], "VmRSS": idle["VmRSS"]}
+    last_sample = [0.0]
+
+    def sampler():
+        if time.perf_counter() - last_sample[0] < 0.25:
+            return
+        last_sample[0] = time.perf_counter()
+        stats = proc_stats(process.pid)
+        peak["Threads"] = max(peak["Threads"], stats["Threads"])
+        peak["VmRSS"] = max(peak["VmRSS"], stats["VmRSS"])
+
+    try:
+        chat_written, join_written, wrote_s = write_traffic(
+            workdir, names, fake, messages, args.rate, args.join_rate, args.seconds, sampler
+        )
+        # Wait for the backlog to drain: every line accounted for or no progress for --drain seconds
+        expected = len(chat_written) if args.verify_all else None
+        last_count, last_change = -1, time.perf_counter()
+        while time.perf_counter() - last_change < args.drain:
+            sampler()
+            count = len(db_rows(workdir))
+            if count != last_count:
+                last_count, last_change = count, time.perf_counter()
+            if expected is not None and count >= expected and len(welcome_times(fake)) >= len(join_written):
+                break
+            time.sleep(0.2)
+        sampler()
+        final = proc_stats(process.pid)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        fake.close()
+
+    rows = db_rows(workdir)
+    completed = [t for tag, t in rows.items() if tag in chat_written]
+    span = (max(completed) - min(chat_written.values())) if completed else 0.0
+    return {
+        "mode": mode,
+        "written": len(chat_written),
+        "joins": len(join_written),
+        "write_rate": len(chat_written) / wrote_s,
+        "db": latency_ms(chat_written, rows),
+        "webhook": latency_ms(chat_written, webhook_times(fake)),
+        "welcome": latency_ms(join_written, welcome_times(fake)),
+        "throughput": len(completed) / span if span else 0.0,
+        "threads_idle": idle["Threads"],
+        "threads_peak": peak["Threads"],
+        "rss_idle_mb": idle["VmRSS"] / 1024,
+        "rss_peak_mb": max(peak["VmRSS"], final["VmHWM"]) / 1024,
+        "cpu_s": final["cpu_s"] - idle["cpu_s"],
+        "workdir": workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end detector load test")
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0, help="Chat messages per second over all servers")
+    parser.add_argument("--join-rate", type=float, default=1.0, help="Player joins per second over all servers")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--toxic", type=float, default=0.2, help="Share of MINOR/SEVERE messages")
+    parser.add_argument("--mode", nargs="+", default=["threads"], choices=["threads", "asyncio"])
+    parser.add_argument("--no-verify-all", dest="verify_all", action="store_false",
+                        help="Only violations reach the database and webhook (default: every message)")
+    parser.add_argument("--drain", type=float, default=5.0, help="Seconds without progress before giving up")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    messages = make_messages(5000, args.toxic, args.seed)
+    results = [run(mode, args, messages) for mode in args.mode]
+
+    print(f"{args.servers} servers, {args.rate:g} msg/s + {args.join_rate:g} joins/s for {args.seconds:g} s, "
+          f"verify_all={args.verify_all}\n")
+    print(f"{'Mode':<8} | {'Path':<16} | {'Count':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 80)
+    for r in results:
+        for label, key, total in (("line -> DB row", "db", r["written"]),
+                                  ("line -> webhook", "webhook", r["written"]),
+                                  ("join -> welcome", "welcome", r["joins"])):
+            values = r[key]
+            print(f"{r['mode']:<8} | {label:<16} | {len(values):>6} | {percentile(values, 50):>8.1f} | "
+                  f"{percentile(values, 95):>8.1f} | {percentile(values, 99):>8.1f} | "
+                  f"{(values[-1] if values else 0.0):>8.1f}")
+    print()
+    print(f"{'Mode':<8} | {'Written/s':>9} | {'Done/s':>7} | {'Threads idle/peak':>17} | "
+          f"{'RSS idle/peak MB':>16} | {'CPU s':>6}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['mode']:<8} | {r['write_rate']:>9.1f} | {r['throughput']:>7.1f} | "
+              f"{r['threads_idle']:>8} / {r['threads_peak']:<6} | "
+              f"{r['rss_idle_mb']:>7.1f} / {r['rss_peak_mb']:<6.1f} | {r['cpu_s']:>6.1f}")
+    print(f"\nDetector working directories (logs, data/violations.db): {', '.join(r['workdir'] for r in results)}")
+
+
+if __name__ == "__main__":
+    main()
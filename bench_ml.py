@@ -0,0 +1,116 @@
+"""
+Benchmark: ML inference throughput and latency
+Runs concurrent callers (one per simulated server) against MLAnalyzer with
+different batch sizes and reports messages/s and p50/p99 latency per call.
+The second table replays chat-like traffic (the same short lines repeated in
+different casing and with stretched letters) with the prediction cache off
+and on, and reports the hit rate.
+
+Usage:
+    python bench_ml.py [--model models/violation_model.joblib] [--callers 20] [--messages 5000]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from ml_analyzer import MLAnalyzer
+
+SAMPLE_MESSAGES = [
+    "moi kaikille", "lagii", "!!!", "sain juuri ison ahvenen", "vitun idiootti",
+    "onko admin paikalla?", "kiitos pelistä", "tämä serveri pätkii", "haista paska",
+    "mikä on paras syötti kuhalle?", "perkule", "nähdään huomenna",
+]
+
+
+def make_messages(count: int) -> list:
+    rng = random.Random(42)
+    return [f"{rng.choice(SAMPLE_MESSAGES)} {rng.randint(0, 10**6)}" for _ in range(count)]
+
+
+def make_chat_traffic(count: int) -> list:
+    """Repetitive chat: the same lines with random casing and stretched last letter"""
+    rng = random.Random(7)
+    traffic = []
+    for _ in range(count):
+        text = rng.choice(SAMPLE_MESSAGES)
+        if rng.random() < 0.3:
+            text = text.upper()
+        if rng.random() < 0.3:
+            text += text[-1] * rng.randint(1, 6)
+        if rng.random() < 0.2:
+            text = f"{text} {rng.randint(0, 10**6)}"
+        traffic.append(text)
+    return traffic
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * (len(sorted_values) - 1)))]
+
+
+def run(model_path: str, batch_size: int, wait_ms: float, callers: int, messages: list, cache_size: int = 0) -> dict:
+    analyzer = MLAnalyzer(model_path, batch_size=batch_size, batch_wait_ms=wait_ms, cache_size=cache_size)
+    latencies = []
+    lock = threading.Lock()
+    per_caller = len(messages) // callers
+
+    def caller(chunk):
+        local = []
+        for text in chunk:
+            start = time.perf_counter()
+            analyzer.analyze_message("Pelaaja", text)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(messages[i * per_caller:(i + 1) * per_caller],))
+               for i in range(callers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = sorted(v * 1000 for v in latencies)
+    batches = analyzer._batcher.batches if analyzer._batcher else len(ms)
+    return {
+        "throughput": len(ms) / elapsed,
+        "p50": percentile(ms, 50),
+        "p99": percentile(ms, 99),
+        "avg_batch": len(ms) / batches if batches else 0.0,
+        "hit_rate": analyzer.cache_stats()["hit_rate"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ML inference batching benchmark")
+    parser.add_argument("--model", default="models/violation_model.joblib")
+    parser.add_argument("--callers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    print(f"{'Batch':>5} | {'Msg/s':>8} | {'Avg batch':>9} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print("-" * 48)
+    for batch_size in args.batch_sizes:
+        r = run(args.model, batch_size, args.wait_ms, args.callers, messages)
+        print(f"{batch_size:>5} | {r['throughput']:>8.0f} | {r['avg_batch']:>9.1f} | {r['p50']:>7.2f} | {r['p99']:>7.2f}")
+
+    traffic = make_chat_traffic(args.messages)
+    print()
+    print(f"{'Cache':>6} | {'Msg/s':>8} | {'Hit rate':>8} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print("-" * 48)
+    for cache_size in [0, args.cache_size]:
+        r = run(args.model, 8, args.wait_ms, args.callers, traffic, cache_size=cache_size)
+        print(f"{cache_size:>6} | {r['throughput']:>8.0f} | {r['hit_rate']:>8.1%} | {r['p50']:>7.2f} | {r['p99']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: sklearn pipeline vs compiled NumPy model
+Loads each model in a fresh interpreter and reports load time, resident
+memory added by the model, single-message latency and batch throughput,
+then checks that both give the same labels on the train_model.py test split.
+
+Usage:
+    python bench_model_load.py [--model models/violation_model.joblib] [--messages 2000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def test_split():
+    from sklearn.model_selection import train_test_split
+    from training_store import open_store
+
+    texts, labels = open_store("data/training.db").load()
+    _, X_test, _, _ = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    return list(X_test)
+
+
+def child(engine: str, model_path: str, messages: int):
+    """Runs in a separate process so load time and RSS are not shared between engines"""
+    texts = test_split()
+    import numpy  # noqa: F401  (imported by both engines, not part of the model cost)
+    import joblib
+    from compiled_model import CompiledModel
+    if engine == "sklearn":
+        import sklearn.pipeline  # noqa: F401
+
+    before = rss_mb()
+    start = time.perf_counter()
+    if engine == "numpy":
+        model = CompiledModel.load(os.path.splitext(model_path)[0] + ".npz")
+    else:
+        model = joblib.load(model_path)
+    load_s = time.perf_counter() - start
+    model.predict(texts[:10])
+    rss = rss_mb() - before
+
+    latencies = []
+    for text in texts[:messages]:
+        t = time.perf_counter()
+        model.predict([text])
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    labels = [str(label) for label in model.predict(texts)]
+    batch_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "load_ms": load_s * 1000,
+        "rss_mb": rss,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "batch_msg_s": len(texts) / batch_s,
+        "labels": labels,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model load/inference benchmark")
+    parser.add_argument("--model", default="models/violation_model.joblib")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.model, args.messages)
+        return
+
+    results = {}
+    for engine in ["sklearn", "numpy"]:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", engine, "--model", args.model, "--messages", str(args.messages)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[engine] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{'Engine':<8} | {'Load ms':>8} | {'RSS MB':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'Batch msg/s':>11}")
+    print("-" * 64)
+    for engine, r in results.items():
+        print(f"{engine:<8} | {r['load_ms']:>8.1f} | {r['rss_mb']:>7.1f} | {r['p50']:>7.3f} | {r['p99']:>7.3f} | {r['batch_msg_s']:>11.0f}")
+
+    a, b = results["sklearn"]["labels"], results["numpy"]["labels"]
+    same = sum(x == y for x, y in zip(a, b))
+    print(f"\nIdentical labels on the test split: {same}/{len(a)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: analysis latency while a new model version is swapped in
+Keeps N caller threads analysing messages and publishes a new model version
+midway. Compares the old in-line reload (joblib.load on the calling thread
+that noticed the change) with MLAnalyzer's background reload and reports
+p50/p99/max call latency plus the reported version and load time.
+
+Usage:
+    python bench_model_reload.py [--model models/violation_model.joblib] [--callers 8] [--seconds 4]
+
+Linux only (the new version is published from a forked process).
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+
+from ml_analyzer import MLAnalyzer
+from model_registry import publish_model
+
+SAMPLE = ["moi kaikille", "vitun idiootti", "sain ison ahvenen", "perkele", "lagii", "kiitos pelistä"]
+
+
+def run(model_path: str, pipeline, engine: str, inline: bool, callers: int, seconds: float) -> dict:
+    analyzer = MLAnalyzer(model_path, engine=engine, reload_interval=0.0 if inline else 0.1)
+    latencies = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    published = threading.Event()
+    state = {"reloaded": False}
+
+    def caller(i):
+        local, n = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            if inline and published.is_set() and not state["reloaded"]:
+                # The old behaviour: whoever notices the change loads the model
+                with lock:
+                    if not state["reloaded"]:
+                        analyzer.check_for_update()
+                        state["reloaded"] = True
+            analyzer.analyze_message("Pelaaja", f"{SAMPLE[n % len(SAMPLE)]} {i}")
+            local.append((time.perf_counter() - start) * 1000)
+            n += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds / 2)
+    # Published from another process, like train_model.py started by !train
+    initial = analyzer.model_version
+    publisher = multiprocessing.get_context("fork").Process(target=publish_model, args=(pipeline, model_path))
+    publisher.start()
+    publisher.join()
+    published.set()
+    deadline = time.time() + 30
+    while analyzer.model_version == initial and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(seconds / 2)
+    stop.set()
+    for t in threads:
+        t.join()
+    analyzer.close()
+
+    latencies.sort()
+    info = analyzer.model_info()
+    return {
+        "calls": len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "max": latencies[-1],
+        "version": info["version"],
+        "load_ms": info["load_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model hot reload benchmark")
+    parser.add_argument("--model", default="models/violation_model.joblib")
+    parser.add_argument("--callers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    print(f"{'Engine':<8} | {'Reload':<10} | {'Calls':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'Max ms':>8} | {'Load ms':>7} | Version")
+    print("-" * 92)
+    for engine in ["sklearn", "numpy"]:
+        for inline in [True, False]:
+            tmpdir = tempfile.mkdtemp()
+            try:
+                model_path = os.path.join(tmpdir, "violation_model.joblib")
+                publish_model(pipeline, model_path)
+                r = run(model_path, pipeline, engine, inline, args.callers, args.seconds)
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            mode = "in-line" if inline else "background"
+            print(f"{engine:<8} | {mode:<10} | {r['calls']:>7} | {r['p50']:>7.2f} | {r['p99']:>7.2f} | "
+                  f"{r['max']:>8.1f} | {r['load_ms']:>7.1f} | {r['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: threaded vs asyncio log monitoring
+Tails N synthetic logs either with one thread per log (the threaded
+ServerMonitor mode) or with coroutines on a single event loop sharing one
+inotify instance (monitor.mode: asyncio), and reports thread count, CPU time,
+context switches and write-to-read latency.
+
+Usage:
+    python bench_monitors.py [--logs 20 200] [--seconds 5] [--rate 200]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from log_tailer import LogTailer, InotifyHub
+
+
+def write_traffic(paths, seconds: float, rate: float, stop: threading.Event):
+    """Append timestamped lines round-robin across all logs at `rate` lines/s"""
+    interval = 1.0 / rate
+    end = time.perf_counter() + seconds
+    i = 0
+    handles = [open(p, "a", encoding="utf-8") for p in paths]
+    try:
+        while time.perf_counter() < end and not stop.is_set():
+            f = handles[i % len(handles)]
+            f.write(f"{time.perf_counter():.9f} Pelaaja: moro\n")
+            f.flush()
+            i += 1
+            time.sleep(interval)
+    finally:
+        for f in handles:
+            f.close()
+
+
+def usage_snapshot():
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime, ru.ru_nvcsw + ru.ru_nivcsw
+
+
+def run_threads(paths, seconds, rate):
+    latencies = []
+    tailers = [LogTailer(p, "bench", "Bench", start_at_end=True) for p in paths]
+
+    def consume(tailer):
+        for line in tailer.lines():
+            latencies.append(time.perf_counter() - float(line.split()[0]))
+
+    threads = [threading.Thread(target=consume, args=(t,), daemon=True) for t in tailers]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+
+    cpu0, csw0 = usage_snapshot()
+    stop = threading.Event()
+    write_traffic(paths, seconds, rate, stop)
+    time.sleep(0.5)
+    peak_threads = threading.active_count()
+    cpu1, csw1 = usage_snapshot()
+
+    for t in tailers:
+        t.close()
+    return latencies, peak_threads, cpu1 - cpu0, csw1 - csw0
+
+
+def run_asyncio(paths, seconds, rate):
+    latencies = []
+    result = {}
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        try:
+            hub = InotifyHub(loop)
+        except OSError:
+            hub = None
+        tailers = [LogTailer(p, "bench", "Bench", start_at_end=True) for p in paths]
+
+        async def consume(tailer):
+            async for line in tailer.alines(hub):
+                latencies.append(time.perf_counter() - float(line.split()[0]))
+
+        tasks = [asyncio.create_task(consume(t)) for t in tailers]
+        await asyncio.sleep(0.5)
+
+        cpu0, csw0 = usage_snapshot()
+        stop = threading.Event()
+        writer = threading.Thread(target=write_traffic, args=(paths, seconds, rate, stop), daemon=True)
+        writer.start()
+        while writer.is_alive():
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+        # The writer thread is part of the harness, not the monitor
+        result["threads"] = threading.active_count()
+        cpu1, csw1 = usage_snapshot()
+        result["cpu"] = cpu1 - cpu0
+        result["csw"] = csw1 - csw0
+
+        for t in tailers:
+            t.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if hub:
+            hub.close()
+
+    asyncio.run(main())
+    return latencies, result["threads"], result["cpu"], result["csw"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs asyncio monitoring benchmark")
+    parser.add_argument("--logs", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=200.0, help="Total lines per second across all logs")
+    args = parser.parse_args()
+
+    print(f"{'Mode':<8} | {'Logs':>5} | {'Threads':>7} | {'CPU s':>6} | {'Ctx sw':>7} | {'Lines':>6} | {'p50 ms':>7} | {'p99 ms':>8}")
+    print("-" * 78)
+    for n in args.logs:
+        for mode, runner in [("threads", run_threads), ("asyncio", run_asyncio)]:
+            tmpdir = tempfile.mkdtemp()
+            paths = [os.path.join(tmpdir, f"chatlog{i}.txt") for i in range(n)]
+            for p in paths:
+                open(p, "w").close()
+            try:
+                lat, threads, cpu, csw = runner(paths, args.seconds, args.rate)
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            ms = sorted(v * 1000 for v in lat)
+            p50 = statistics.median(ms) if ms else 0.0
+            p99 = ms[int(0.99 * (len(ms) - 1))] if ms else 0.0
+            print(f"{mode:<8} | {n:>5} | {threads:>7} | {cpu:>6.2f} | {csw:>7} | {len(ms):>6} | {p50:>7.2f} | {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: how long a log monitor waits on Discord per violation
+Runs ActionHandler.handle_violation against FakePP2Server's webhook with a
+simulated RTT and a Discord-style rate limit (webhook_limit posts per
+webhook_window). "sync" is the previous code path (the monitor thread posts
+the webhook itself, a 429 is simply lost); "queued" hands the payload to
+NotificationDispatcher. Reports the time the calling thread is blocked,
+delivered notifications, 429 answers and end-to-end delivery time.
+
+Usage:
+    python bench_notifications.py [--violations 50] [--rtt-ms 50] [--limit 5] [--window 2]
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from action_handler import ActionHandler
+from fake_pp2 import FakePP2Server
+from logger import log
+from ml_analyzer import AnalysisResult
+
+
+def run(kind: str, args) -> dict:
+    fake = FakePP2Server(rtt=args.rtt_ms / 1000, webhook_limit=args.limit, webhook_window=args.window).start()
+    handler = ActionHandler(discord_webhook_url=fake.webhook_url)
+    if kind == "sync":
+        handler.notifier.submit = lambda url, payload: handler._webhook().post(url, json=payload, timeout=10)
+    analysis = AnalysisResult(level="MODERATE", reason="bench", suggested_action="warn")
+    config = {"admin_url": fake.admin_url("bench"), "admin_user": "admin", "admin_password": "bench"}
+
+    blocked = []
+    start = time.perf_counter()
+    for i in range(args.violations):
+        t = time.perf_counter()
+        handler.handle_violation("bench", config, f"Pelaaja{i}", "chat", f"viesti {i}", analysis)
+        blocked.append((time.perf_counter() - t) * 1000)
+    handler.notifier.close(timeout=600)  # wait until everything queued is delivered
+    total = time.perf_counter() - start
+    handler.close()
+    fake.close()
+    blocked.sort()
+    return {
+        "p50": statistics.median(blocked),
+        "max": blocked[-1],
+        "caller_s": sum(blocked) / 1000,
+        "delivered": len(fake.webhooks),
+        "429": fake.rate_limited,
+        "total_s": total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discord notification benchmark")
+    parser.add_argument("--violations", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=50.0)
+    parser.add_argument("--limit", type=int, default=5, help="webhook posts per window")
+    parser.add_argument("--window", type=float, default=2.0, help="rate limit window (s)")
+    args = parser.parse_args()
+    log.setLevel(logging.ERROR)
+
+    print(f"{args.violations} violations, RTT {args.rtt_ms:g} ms, limit {args.limit} posts / {args.window:g} s\n")
+    print(f"{'Path':<6} | {'Block p50 ms':>12} | {'Block max ms':>12} | {'Caller s':>8} | "
+          f"{'Delivered':>9} | {'429s':>4} | {'All sent s':>10}")
+    print("-" * 80)
+    for kind in ("sync", "queued"):
+        r = run(kind, args)
+        print(f"{kind:<6} | {r['p50']:>12.2f} | {r['max']:>12.2f} | {r['caller_s']:>8.2f} | "
+              f"{r['delivered']:>9} | {r['429']:>4} | {r['total_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
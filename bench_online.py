@@ -0,0 +1,101 @@
+"""
+Benchmark: incremental online learning vs full retrain
+Splits the training store (data/training.db) into a base set, a stream of "moderator
+decisions" and a test set. The online learner is fit on the base set and then
+folds the stream in batches (as every update_interval would); the full
+retrain refits train_model.py's TF-IDF + LogisticRegression pipeline on
+base + stream seen so far. Reports update latency and test accuracy
+(drift) at checkpoints along the stream.
+
+Usage:
+    python bench_online.py [--stream 2000] [--batch 8] [--checkpoints 4]
+"""
+
+import argparse
+import statistics
+import time
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from online_learner import OnlineLearner, load_training_data, make_classifier
+
+
+class _Analyzer:
+    """Minimal MLAnalyzer stand-in that just holds the installed model"""
+    model = None
+
+    def set_model(self, model, version):
+        self.model = model
+
+
+def full_retrain(texts, labels):
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5))),
+        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000))
+    ])
+    start = time.perf_counter()
+    pipeline.fit(texts, labels)
+    return pipeline, time.perf_counter() - start
+
+
+def accuracy(model, texts, labels):
+    predicted = model.predict(texts)
+    return sum(p == l for p, l in zip(predicted, labels)) / len(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online learning vs full retrain benchmark")
+    parser.add_argument("--store", default="data/training.db")
+    parser.add_argument("--stream", type=int, default=2000, help="Moderator decisions to stream")
+    parser.add_argument("--batch", type=int, default=8, help="Decisions folded in per update")
+    parser.add_argument("--checkpoints", type=int, default=4, help="Full retrains along the stream")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(args.store)
+    X_rest, X_test, y_rest, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42)
+    X_base, y_base = X_rest[args.stream:], y_rest[args.stream:]
+    X_stream, y_stream = X_rest[:args.stream], y_rest[:args.stream]
+
+    analyzer = _Analyzer()
+    learner = OnlineLearner(analyzer, store_path=None, state_path=None)
+    start = time.perf_counter()
+    # Same as OnlineLearner.full_retrain(), but on the base split instead of the CSV
+    learner.classifier = make_classifier().fit(learner.vectorizer.transform(X_base), y_base)
+    learner._remember(list(zip(X_base, y_base)))
+    learner._publish()
+    online_fit_s = time.perf_counter() - start
+
+    every = max(1, args.stream // args.checkpoints)
+    print(f"Base set {len(X_base)} rows, stream {len(X_stream)}, test {len(X_test)}")
+    print(f"Online initial fit: {online_fit_s:.1f} s\n")
+    print(f"{'Streamed':>8} | {'Online acc':>10} | {'Update p50 ms':>13} | {'Update p99 ms':>13} | "
+          f"{'Full acc':>8} | {'Full fit s':>10}")
+    print("-" * 80)
+
+    update_ms = []
+    seen = 0
+    stream_correct = 0
+    for i in range(0, len(X_stream), args.batch):
+        batch = list(zip(X_stream[i:i + args.batch], y_stream[i:i + args.batch]))
+        for text, label in batch:
+            learner.learn(text, label)
+        learner.apply_pending()
+        update_ms.append(learner.last_update_ms)
+        stream_correct += sum(p == l for p, (_, l) in zip(analyzer.model.predict([t for t, _ in batch]), batch))
+        seen += len(batch)
+
+        if seen % every < args.batch or seen == len(X_stream):
+            online_acc = accuracy(analyzer.model, X_test, y_test)
+            full, fit_s = full_retrain(X_base + X_stream[:seen], y_base + y_stream[:seen])
+            ordered = sorted(update_ms)
+            print(f"{seen:>8} | {online_acc:>10.4f} | {statistics.median(ordered):>13.1f} | "
+                  f"{ordered[int(0.99 * (len(ordered) - 1))]:>13.1f} | {accuracy(full, X_test, y_test):>8.4f} | {fit_s:>10.1f}")
+
+    print(f"\nStream decisions predicted correctly right after their update: {stream_correct / seen:.2%}")
+
+
+if __name__ == "__main__":
+    main()
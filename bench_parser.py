@@ -0,0 +1,75 @@
+"""
+Benchmark: chatlog parsing throughput
+Compares the previous per-line path in ServerMonitor.monitor_chatlog
+(import + regex on every line, then a two-line string through
+LogParser.parse_chat_message) against ChatStreamParser.feed().
+
+Usage:
+    python bench_parser.py [--entries 200000]
+"""
+
+import argparse
+import time
+
+from log_parser import LogParser
+
+
+def make_lines(entries: int) -> list:
+    lines = []
+    for n in range(entries):
+        lines.append(f"Pelaaja{n % 500}:        [25.01.2026 07:{n % 60:02d}]\n")
+        lines.append(f"sain juuri ison ahvenen, mitä teille kuuluu? {n}\n")
+    return lines
+
+
+def legacy_path(lines: list) -> int:
+    """The loop previously inlined in ServerMonitor.monitor_chatlog"""
+    parser = LogParser()
+    pending_name_line = None
+    count = 0
+    for line in lines:
+        line = line.strip('\r\n')
+        if not line: continue
+
+        import re
+        name_time_match = re.search(r'^(.+?):\s+\[(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2})\]\s*$', line)
+
+        if name_time_match:
+            pending_name_line = line
+            continue
+
+        if pending_name_line:
+            full_entry = f"{pending_name_line}\n{line}"
+            message = parser.parse_chat_message(full_entry, "")
+            if message:
+                count += 1
+            pending_name_line = None
+    return count
+
+
+def stream_path(lines: list) -> int:
+    stream = LogParser().chat_stream()
+    count = 0
+    for line in lines:
+        count += len(stream.feed(line))
+    count += len(stream.flush())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatlog parser throughput benchmark")
+    parser.add_argument("--entries", type=int, default=200000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.entries)
+    print(f"{'Parser':<18} | {'Messages':>9} | {'Seconds':>8} | {'Lines/s':>11}")
+    print("-" * 55)
+    for name, fn in [("legacy per-line", legacy_path), ("ChatStreamParser", stream_path)]:
+        start = time.perf_counter()
+        count = fn(lines)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} | {count:>9} | {elapsed:>8.2f} | {len(lines) / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: retention pass next to a live insert load
+Builds a violations.db whose rows span 180 days (one row every
+180 days / --rows), then keeps 90 days of it three ways while a load thread
+adds a violation every 10 ms and times how long each waits for its commit:
+
+  idle        no retention, the baseline commit latency
+  chunked     RetentionJob: archive, delete and vacuum in --chunk rows per writer task
+  one delete  the same rows deleted in a single writer transaction
+
+Also reports archive size, rows/s of the pass and the database file size
+before and after.
+
+Usage:
+    python bench_retention.py [--rows 300000] [--chunk 500]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+from retention import RetentionJob
+
+SERVERS = ["Main Server", "Second Server", "Third Server"]
+WORDS = ["perkele", "vittu", "idiootti", "kalapuikko", "moi", "pelaa", "huijari", "noob", "saatana", "hyvä"]
+
+
+def build(path: str, rows: int):
+    db = Database(path, batch_size=2000)
+    now = datetime.now()
+    step = 180 * 86400 / rows
+    start = time.perf_counter()
+    for i in range(rows):
+        when = now - timedelta(seconds=(rows - i) * step)
+        db.add_violation(
+            when.strftime("%d.%m.%Y %H:%M"), f"Pelaaja{i % 2000}", "message",
+            " ".join(WORDS[(i * 7 + k) % len(WORDS)] for k in range(i % 9 + 3)) + f" {i}",
+            ["MINOR", "MODERATE", "SEVERE"][i % 3], "bench", "warn", server_name=SERVERS[i % 3]
+        )
+    db.close()
+    print(f"built {rows} rows in {time.perf_counter() - start:.0f} s, {os.path.getsize(path) / 1e6:.0f} MB\n")
+
+
+def db_size(path: str) -> int:
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def run(path: str, name: str, work, duration: float):
+    db = Database(path)
+    waits = []
+    stop = threading.Event()
+
+    def load():
+        while not stop.is_set():
+            db.add_violation(datetime.now().strftime("%d.%m.%Y %H:%M"), "Uusi", "message", "uusi viesti",
+                             "MINOR", "bench", "warn", server_name="Main Server")
+            start = time.perf_counter()
+            db.flush()
+            waits.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    before = db_size(path)
+    thread = threading.Thread(target=load)
+    thread.start()
+    time.sleep(0.5)
+    start = time.perf_counter()
+    archived = work(db) if work else 0
+    elapsed = time.perf_counter() - start
+    time.sleep(max(0.5, duration - elapsed))
+    stop.set()
+    thread.join()
+    db.close()
+    waits.sort()
+    rate = f"{archived / elapsed:>8.0f}" if archived else f"{'-':>8}"
+    print(f"{name:<11} | {archived:>8} | {elapsed:>6.1f} | {rate} | "
+          f"{statistics.median(waits) * 1000:>6.1f} | {waits[int(len(waits) * 0.99)] * 1000:>6.1f} | "
+          f"{waits[-1] * 1000:>7.0f} | {before / 1e6:>6.1f} -> {db_size(path) / 1e6:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retention benchmark")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load in the idle run")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_retention_")
+    try:
+        template = os.path.join(directory, "template.db")
+        build(template, args.rows)
+        archive_dir = os.path.join(directory, "archive")
+
+        def chunked(db):
+            result = RetentionJob(db, keep_days=90, archive_dir=archive_dir, chunk_size=args.chunk).run_once()
+            return result["archived"]
+
+        def one_delete(db):
+            cutoff = int(time.time()) - 90 * 86400
+            ids = [row["id"] for row in db.get_violations_before(cutoff, limit=args.rows)]
+            deleted = db.delete_violations(ids)
+            db.incremental_vacuum(1 << 30)
+            return deleted
+
+        print(f"{'Run':<11} | {'Archived':>8} | {'Secs':>6} | {'Rows/s':>8} | "
+              f"{'p50 ms':>6} | {'p99 ms':>6} | {'max ms':>7} | DB MB")
+        print("-" * 86)
+        for name, work in [("idle", None), ("chunked", chunked), ("one delete", one_delete)]:
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+            shutil.copy(template, path)
+            run(path, name, work, args.duration)
+
+        archive_bytes = sum(os.path.getsize(os.path.join(archive_dir, f)) for f in os.listdir(archive_dir))
+        print(f"\nmonthly archive files: {len(os.listdir(archive_dir))}, {archive_bytes / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
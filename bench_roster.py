@@ -0,0 +1,110 @@
+"""
+Benchmark: live player index lookups, Admin.html per lookup vs RosterCache
+Against FakePP2Server with a simulated RTT, replays a mix of joins (each
+invalidates the roster and looks the new player up for the welcome message)
+and moderator actions (two lookups, like a ban + kick), then a burst of
+simultaneous joins from several threads. Reports Admin.html downloads and
+lookup latency.
+
+Usage:
+    python bench_roster.py [--players 64] [--events 400] [--rtt-ms 20] [--burst 16]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import threading
+import time
+
+from action_handler import ActionHandler
+from fake_pp2 import FakePP2Server
+
+
+def uncached_index(handler: ActionHandler, player_name: str, server_config: dict):
+    """The previous get_live_player_index: download and regex-scan the page every time"""
+    html = handler._fetch_admin_page(server_config)
+    if html is None:
+        return None
+    match = re.search(rf"\[(\d+)\]\s+{re.escape(player_name)}", html, re.IGNORECASE)
+    if not match:
+        match = re.search(rf"\[(\d+)\]\s+[^<]*{re.escape(player_name)}", html, re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def run(kind: str, args) -> dict:
+    fake = FakePP2Server(slots=args.players, rtt=args.rtt_ms / 1000).start()
+    for i in range(args.players):
+        fake.add_player("bench", f"Pelaaja{i:04d}")
+    config = {"admin_url": fake.admin_url("bench"), "admin_user": "admin", "admin_password": "bench"}
+    handler = ActionHandler()
+
+    def lookup(name):
+        if kind == "cached":
+            return handler.get_live_player_index(name, config)
+        return uncached_index(handler, name, config)
+
+    rng = random.Random(1)
+    latencies = []
+    joined = args.players
+    for _ in range(args.events):
+        if rng.random() < 0.3:
+            name = f"Pelaaja{joined:04d}"
+            joined += 1
+            fake.add_player("bench", name)
+            handler.invalidate_roster(config)
+            lookups = [name]
+        else:
+            name = f"Pelaaja{rng.randrange(args.players):04d}"
+            lookups = [name, name]
+        for player in lookups:
+            start = time.perf_counter()
+            lookup(player)
+            latencies.append((time.perf_counter() - start) * 1000)
+    sequential_gets = fake.requests
+
+    # Simultaneous joins, e.g. a round starting
+    names = [f"Pelaaja{joined + i:04d}" for i in range(args.burst)]
+    for name in names:
+        fake.add_player("bench", name)
+    handler.invalidate_roster(config)
+    threads = [threading.Thread(target=lookup, args=(name,)) for name in names]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    burst_ms = (time.perf_counter() - start) * 1000
+
+    handler.close()
+    fake.close()
+    latencies.sort()
+    return {
+        "lookups": len(latencies),
+        "gets": sequential_gets,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "burst_gets": fake.requests - sequential_gets,
+        "burst_ms": burst_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live roster lookup benchmark")
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--burst", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{args.players} players, {args.events} events, RTT {args.rtt_ms:g} ms, burst of {args.burst} joins\n")
+    print(f"{'Lookup':<8} | {'Lookups':>7} | {'GETs':>5} | {'p50 ms':>7} | {'p99 ms':>7} | {'Burst GETs':>10} | {'Burst ms':>8}")
+    print("-" * 70)
+    for kind in ("uncached", "cached"):
+        r = run(kind, args)
+        print(f"{kind:<8} | {r['lookups']:>7} | {r['gets']:>5} | {r['p50']:>7.2f} | {r['p99']:>7.2f} | "
+              f"{r['burst_gets']:>10} | {r['burst_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Soak test: memory over time for message de-duplication and session tracking
+Feeds a long synthetic chat stream (timestamps advance one log minute per
+--per-minute messages) through the previous unbounded set/dict and through
+TimeWindowDeduplicator + SessionCache, sampling traced memory as it goes.
+The bounded structures should stay flat.
+
+Usage:
+    python bench_soak_memory.py [--messages 2000000] [--per-minute 500]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bounded_cache import TimeWindowDeduplicator, SessionCache
+
+
+class Unbounded:
+    """The previous ServerMonitor bookkeeping"""
+    def __init__(self):
+        self.processed_messages = set()
+        self.player_sessions = {}
+
+    def process(self, timestamp, player, message):
+        msg_id = f"{timestamp}:{player}:{message}"
+        if msg_id in self.processed_messages:
+            return
+        self.processed_messages.add(msg_id)
+        self.player_sessions[player] = {"ip": "1.2.3.4", "ban_command": "/banaddress", "name_with_ids": player}
+
+
+class Bounded:
+    def __init__(self):
+        self.processed_messages = TimeWindowDeduplicator(window_minutes=10)
+        self.player_sessions = SessionCache(max_size=5000, ttl=24 * 3600)
+
+    def process(self, timestamp, player, message):
+        if self.processed_messages.seen(timestamp, player, message):
+            return
+        self.player_sessions[player] = {"ip": "1.2.3.4", "ban_command": "/banaddress", "name_with_ids": player}
+
+
+def soak(impl, messages: int, per_minute: int, samples: int) -> list:
+    gc.collect()
+    tracemalloc.start()
+    start = datetime(2026, 1, 25, 7, 0)
+    results = []
+    step = max(1, messages // samples)
+    for i in range(messages):
+        timestamp = (start + timedelta(minutes=i // per_minute)).strftime("%d.%m.%Y %H:%M")
+        # Player names keep changing over time, like new visitors over weeks
+        impl.process(timestamp, f"Pelaaja{i // 50}", f"viesti numero {i}")
+        if (i + 1) % step == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            results.append((i + 1, current / (1024 * 1024)))
+    tracemalloc.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory soak test for dedup/session bookkeeping")
+    parser.add_argument("--messages", type=int, default=2000000)
+    parser.add_argument("--per-minute", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=10)
+    args = parser.parse_args()
+
+    unbounded = soak(Unbounded(), args.messages, args.per_minute, args.samples)
+    bounded = soak(Bounded(), args.messages, args.per_minute, args.samples)
+
+    print(f"{'Messages':>10} | {'Unbounded MB':>13} | {'Bounded MB':>11}")
+    print("-" * 42)
+    for (n, mb_old), (_, mb_new) in zip(unbounded, bounded):
+        print(f"{n:>10} | {mb_old:>13.1f} | {mb_new:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark: log tailing latency and throughput
+Measures the delay from a line being written to chatlog.txt until LogTailer
+yields it, for the inotify and polling backends. With --throughput-mb it also
+reads a large synthetic chatlog from the start and compares the byte-oriented
+reader against the previous text-mode readline()/tell() loop.
+
+Usage:
+    python bench_tail.py [--lines 200] [--interval 0.05]
+    python bench_tail.py --throughput-mb 300
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from log_tailer import LogTailer, InotifyWatcher
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def run_backend(backend: str, lines: int, interval: float) -> dict:
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "chatlog.txt")
+    open(path, "w").close()
+
+    tailer = LogTailer(path, "bench", "Bench", start_at_end=True, backend=backend, poll_interval=1.0)
+    latencies = []
+    done = threading.Event()
+
+    def reader():
+        for line in tailer.lines():
+            written_at = float(line.split()[0])
+            latencies.append(time.perf_counter() - written_at)
+            if len(latencies) >= lines:
+                done.set()
+                break
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    with open(path, "a", encoding="utf-8") as f:
+        for _ in range(lines):
+            f.write(f"{time.perf_counter():.9f} Pelaaja: moro\n")
+            f.flush()
+            time.sleep(interval)
+
+    done.wait(timeout=lines * interval + 10)
+    tailer.close()
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+    ms = [v * 1000 for v in latencies]
+    return {
+        "backend": backend,
+        "received": len(ms),
+        "mean": statistics.mean(ms) if ms else 0.0,
+        "p50": percentile(ms, 50),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else 0.0,
+    }
+
+
+def write_large_chatlog(path: str, size_mb: int) -> int:
+    """Write a synthetic UTF-8 chatlog of roughly size_mb megabytes. Returns the line count."""
+    entry = ("Pelaaja{n}:        [25.01.2026 07:30]\n"
+             "sain juuri ison ahvenen, mitä teille kuuluu? ääliöt {n}\n").encode("utf-8")
+    target = size_mb * 1024 * 1024
+    lines = 0
+    written = 0
+    with open(path, "wb") as f:
+        batch = []
+        n = 0
+        while written < target:
+            data = entry.replace(b"{n}", str(n).encode())
+            batch.append(data)
+            written += len(data)
+            lines += 2
+            n += 1
+            if len(batch) >= 10000:
+                f.write(b"".join(batch))
+                batch = []
+        f.write(b"".join(batch))
+    return lines
+
+
+def legacy_read(path: str) -> int:
+    """The previous text-mode loop: readline() + tell() after every line"""
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            f.tell()
+            count += 1
+    return count
+
+
+def tailer_read(path: str, expected: int) -> int:
+    tailer = LogTailer(path, "bench", "Bench", start_at_end=False, backend="poll")
+    count = 0
+    for _ in tailer.lines():
+        count += 1
+        if count >= expected:
+            break
+    return count
+
+
+def run_throughput(size_mb: int):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "chatlog.txt")
+    try:
+        print(f"Writing {size_mb} MB synthetic chatlog...")
+        expected = write_large_chatlog(path, size_mb)
+        size = os.path.getsize(path) / (1024 * 1024)
+
+        print(f"{'Reader':<22} | {'Lines':>10} | {'Seconds':>8} | {'MB/s':>8} | {'Lines/s':>10}")
+        print("-" * 70)
+        for name, fn in [("text readline+tell", lambda: legacy_read(path)),
+                         ("binary LogTailer", lambda: tailer_read(path, expected))]:
+            start = time.perf_counter()
+            count = fn()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} | {count:>10} | {elapsed:>8.2f} | {size / elapsed:>8.1f} | {count / elapsed:>10.0f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail latency and throughput benchmark")
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between written lines")
+    parser.add_argument("--throughput-mb", type=int, default=0,
+                        help="Also benchmark reading a synthetic chatlog of this size")
+    args = parser.parse_args()
+
+    if args.throughput_mb:
+        run_throughput(args.throughput_mb)
+        print()
+
+    backends = ["poll"]
+    try:
+        InotifyWatcher(__file__).close()
+        backends.insert(0, "inotify")
+    except OSError:
+        print("inotify not available, benchmarking polling only")
+
+    print(f"{'Backend':<10} | {'Lines':>6} | {'Mean ms':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'Max ms':>8}")
+    print("-" * 64)
+    for backend in backends:
+        r = run_backend(backend, args.lines, args.interval)
+        print(f"{r['backend']:<10} | {r['received']:>6} | {r['mean']:>8.2f} | {r['p50']:>8.2f} | {r['p99']:>8.2f} | {r['max']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
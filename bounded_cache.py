@@ -0,0 +1,162 @@
+"""
+Bounded Caches
+Fixed-memory structures for long-running monitors: a time-windowed message
+de-duplicator and a TTL/LRU cache for player sessions.
+"""
+
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Any, Dict, List, Set
+
+
+def log_minute(timestamp: str) -> Optional[int]:
+    """Convert a PP2 log timestamp ('dd.mm.yyyy HH:MM') to minutes since the epoch"""
+    try:
+        return int(datetime.strptime(timestamp, "%d.%m.%Y %H:%M").timestamp()) // 60
+    except (ValueError, TypeError):
+        return None
+
+
+def _stable_hash(parts: tuple) -> int:
+    # hash() is salted per process, a saved window must match after a restart
+    data = "\x1f".join(parts).encode("utf-8", errors="surrogatepass")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class TimeWindowDeduplicator:
+    """
+    Remembers which messages were already processed, but only for a sliding
+    window of log minutes. Each entry is a 64-bit hash stored in a per-minute
+    bucket, and buckets older than the window are dropped. The window can be
+    saved with snapshot() and loaded with restore(), so lines replayed after
+    a restart are recognised.
+    """
+
+    def __init__(self, window_minutes: int = 10):
+        """
+        Args:
+            window_minutes: How many log minutes back duplicates are detected
+        """
+        self.window_minutes = window_minutes
+        self._buckets: Dict[int, Set[int]] = {}
+        self._newest = 0
+        self._minute_cache: Dict[str, Optional[int]] = {}
+        # The monitor thread checks, the checkpoint flush snapshots
+        self._lock = threading.Lock()
+
+    def _minute(self, timestamp: str) -> int:
+        # The same timestamp string repeats for a whole minute, avoid re-parsing it
+        minute = self._minute_cache.get(timestamp)
+        if minute is None:
+            minute = log_minute(timestamp)
+            if minute is None:
+                minute = int(time.time()) // 60
+            if len(self._minute_cache) > 64:
+                self._minute_cache.clear()
+            self._minute_cache[timestamp] = minute
+        return minute
+
+    def seen(self, timestamp: str, *parts: str) -> bool:
+        """
+        Check a message and remember it
+
+        Returns:
+            True if the same message was already seen within the window
+        """
+        key = _stable_hash(parts)
+        with self._lock:
+            minute = self._minute(timestamp)
+
+            bucket = self._buckets.get(minute)
+            if bucket is not None and key in bucket:
+                return True
+
+            if minute > self._newest:
+                self._newest = minute
+                self._evict()
+            elif minute <= self._newest - self.window_minutes:
+                # Older than the window, cannot be compared reliably any more
+                return False
+
+            if bucket is None:
+                bucket = self._buckets[minute] = set()
+            bucket.add(key)
+            return False
+
+    def _evict(self):
+        cutoff = self._newest - self.window_minutes
+        for minute in [m for m in self._buckets if m <= cutoff]:
+            del self._buckets[minute]
+
+    def snapshot(self) -> Dict[str, List[int]]:
+        """The window as JSON-friendly data: minute -> hashes"""
+        with self._lock:
+            return {str(minute): list(bucket) for minute, bucket in self._buckets.items()}
+
+    def restore(self, snapshot: Optional[Dict[str, List[int]]]):
+        """Load a window saved with snapshot(), merged with what is already known"""
+        if not snapshot:
+            return
+        with self._lock:
+            for minute, keys in snapshot.items():
+                self._buckets.setdefault(int(minute), set()).update(keys)
+            self._newest = max(self._newest, max(self._buckets))
+            self._evict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(b) for b in self._buckets.values())
+
+
+class SessionCache:
+    """Thread-safe LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_size: int = 5000, ttl: float = 24 * 3600):
+        """
+        Args:
+            max_size: Maximum number of entries, least recently used are evicted first
+            ttl: Seconds after the last write before an entry expires
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            written_at, value = item
+            if time.monotonic() - written_at > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self):
+        """Drop every expired entry (entries are otherwise expired lazily on access)"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (t, _) in self._data.items() if now - t > self.ttl]:
+                del self._data[key]
@@ -0,0 +1,445 @@
+"""
+Chat Archive
+Every parsed chat message and join event, append-only, per server and per
+day: data/archive/<server>/<YYYY-MM-DD>.seg. A segment is a sequence of
+zlib-compressed frames of JSON lines; each frame header carries its record
+count and time range, and <day>.idx repeats the headers with their offsets
+so a range scan reads only the frames it needs. Unlike violations.db this
+keeps the clean stream, for replaying history through a new model and for
+building training sets.
+
+Usage:
+    python chat_archive.py stats
+    python chat_archive.py export --since 2026-01-01 --server "Main Server" > chat.jsonl
+    python chat_archive.py replay --since 2026-01-01
+    python chat_archive.py replay --since 2026-01-01 --store data/training.db --write-store
+"""
+
+import argparse
+import heapq
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from bounded_cache import log_minute
+from log_parser import ChatMessage, PlayerJoinEvent
+from logger import log
+
+
+FRAME_MAGIC = b"PPA1"
+# magic, payload length, record count, first and last record time
+FRAME_HEADER = struct.Struct("<4sIIqq")
+# frame offset, record count, first and last record time
+INDEX_ENTRY = struct.Struct("<QIqq")
+
+
+class Frame(NamedTuple):
+    offset: int
+    length: int      # compressed payload bytes
+    count: int
+    first: int
+    last: int
+
+
+def _safe_dirname(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "_"
+
+
+def _day(epoch: int) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(epoch))
+
+
+def _read_frames(seg_path: str) -> Tuple[List[Frame], int]:
+    """
+    Frames of a segment: the index first, then headers of frames written
+    after the last index entry (a crash between the two writes)
+
+    Returns:
+        (frames, offset where the valid data ends)
+    """
+    frames: List[Frame] = []
+    idx_path = seg_path[:-4] + ".idx"
+    try:
+        with open(idx_path, "rb") as f:
+            data = f.read()
+        for pos in range(0, len(data) - len(data) % INDEX_ENTRY.size, INDEX_ENTRY.size):
+            offset, count, first, last = INDEX_ENTRY.unpack_from(data, pos)
+            frames.append(Frame(offset, 0, count, first, last))
+    except FileNotFoundError:
+        pass
+
+    size = os.path.getsize(seg_path)
+    with open(seg_path, "rb") as f:
+        # The index does not store lengths, the headers do; trust it only up to the file size
+        checked: List[Frame] = []
+        for frame in frames:
+            f.seek(frame.offset)
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            magic, length, count, first, last = FRAME_HEADER.unpack(header)
+            if magic != FRAME_MAGIC or frame.offset + FRAME_HEADER.size + length > size:
+                break
+            checked.append(Frame(frame.offset, length, count, first, last))
+        frames = checked
+        end = frames[-1].offset + FRAME_HEADER.size + frames[-1].length if frames else 0
+        while end + FRAME_HEADER.size <= size:
+            f.seek(end)
+            magic, length, count, first, last = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+            if magic != FRAME_MAGIC or end + FRAME_HEADER.size + length > size:
+                break
+            frames.append(Frame(end, length, count, first, last))
+            end += FRAME_HEADER.size + length
+    return frames, end
+
+
+def _read_records(f, frame: Frame) -> List[dict]:
+    f.seek(frame.offset + FRAME_HEADER.size)
+    payload = zlib.decompress(f.read(frame.length))
+    # JSON strings never contain a raw newline, so the lines decode as one array
+    return json.loads(b"[" + payload.replace(b"\n", b",") + b"]")
+
+
+class _Segment:
+    """Open day segment of one server, appended to by the flusher"""
+
+    def __init__(self, seg_path: str):
+        self.path = seg_path
+        self.idx_path = seg_path[:-4] + ".idx"
+        if os.path.exists(seg_path):
+            frames, end = _read_frames(seg_path)
+            if end < os.path.getsize(seg_path):
+                log.warning(f"⚠️ Arkiston {seg_path} lopussa keskeneräinen kehys, katkaistaan kohtaan {end}")
+                os.truncate(seg_path, end)
+            # Rewrite the index from the verified frames (also repairs a missing tail)
+            with open(self.idx_path, "wb") as f:
+                f.write(b"".join(INDEX_ENTRY.pack(fr.offset, fr.count, fr.first, fr.last) for fr in frames))
+        self.seg = open(seg_path, "ab")
+        self.idx = open(self.idx_path, "ab")
+
+    def write(self, records: List[dict], level: int):
+        payload = zlib.compress(b"\n".join(json.dumps(r, ensure_ascii=False).encode("utf-8") for r in records), level)
+        times = [r["t"] for r in records]
+        first, last = min(times), max(times)
+        offset = self.seg.tell()
+        # One write per frame, the index entry only after the frame is complete
+        self.seg.write(FRAME_HEADER.pack(FRAME_MAGIC, len(payload), len(records), first, last) + payload)
+        self.seg.flush()
+        self.idx.write(INDEX_ENTRY.pack(offset, len(records), first, last))
+        self.idx.flush()
+
+    def close(self):
+        self.seg.close()
+        self.idx.close()
+
+
+class ChatArchive:
+    """Compressed, time-partitioned archive of chat messages and joins"""
+
+    def __init__(
+        self,
+        root: str = "data/archive",
+        frame_records: int = 1000,
+        flush_interval: float = 10.0,
+        compression_level: int = 6
+    ):
+        """
+        Args:
+            root: Archive directory, one subdirectory per server
+            frame_records: Records per compressed frame (larger frames compress better, scans skip coarser)
+            flush_interval: Seconds a record may wait in memory before its frame is written
+            compression_level: zlib level 1-9
+        """
+        self.root = root
+        self.frame_records = frame_records
+        self.flush_interval = flush_interval
+        self.compression_level = compression_level
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[Tuple[str, str], List[dict]] = {}   # (server dir, day) -> records
+        self._oldest: Dict[Tuple[str, str], float] = {}
+        self._segments: Dict[Tuple[str, str], _Segment] = {}
+        self.records = 0
+        self.frames = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="ChatArchive")
+            self._thread.start()
+
+    def _append(self, server_name: str, kind: str, timestamp: str, fields: dict):
+        minute = log_minute(timestamp)
+        epoch = minute * 60 if minute is not None else int(time.time())
+        record = {"t": epoch, "kind": kind, **fields}
+        key = (_safe_dirname(server_name), _day(epoch))
+        with self._lock:
+            buffer = self._buffers.setdefault(key, [])
+            if not buffer:
+                self._oldest[key] = time.monotonic()
+            buffer.append(record)
+            self.records += 1
+            if len(buffer) >= self.frame_records:
+                self._write(key)
+
+    def append_message(self, server_name: str, message: ChatMessage):
+        """Archive a parsed chat message"""
+        self._append(server_name, "chat", message.timestamp, asdict(message))
+
+    def append_join(self, server_name: str, join_event: PlayerJoinEvent):
+        """Archive a parsed join event"""
+        self._append(server_name, "join", join_event.timestamp, asdict(join_event))
+
+    def _write(self, key: Tuple[str, str]):
+        # Called with self._lock held
+        records = self._buffers.pop(key, None)
+        self._oldest.pop(key, None)
+        if not records:
+            return
+        segment = self._segments.get(key)
+        if segment is None:
+            server_dir, day = key
+            os.makedirs(os.path.join(self.root, server_dir), exist_ok=True)
+            segment = self._segments[key] = _Segment(os.path.join(self.root, server_dir, f"{day}.seg"))
+        try:
+            segment.write(records, self.compression_level)
+            self.frames += 1
+        except OSError as e:
+            log.error(f"❌ Chat-arkiston kirjoitus epäonnistui ({segment.path}), {len(records)} tietuetta menetettiin: {e}")
+
+    def flush(self, max_age: float = 0.0):
+        """Write buffered records that have waited at least max_age seconds"""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, t in self._oldest.items() if now - t >= max_age]:
+                self._write(key)
+            # Yesterday's segment is done once its buffer is empty
+            today = _day(int(time.time()))
+            for key in [k for k in self._segments if k[1] < today and k not in self._buffers]:
+                self._segments.pop(key).close()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval / 2):
+            try:
+                self.flush(self.flush_interval)
+            except Exception as e:
+                log.error(f"❌ Virhe chat-arkiston tallennuksessa: {e}")
+
+    def close(self):
+        """Write everything buffered and close the segments"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        with self._lock:
+            for key in list(self._buffers):
+                self._write(key)
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+    # Reading
+
+    def servers(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def segments(self, server_dir: str) -> List[str]:
+        """Day segment paths of a server directory, oldest first"""
+        directory = os.path.join(self.root, server_dir)
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".seg")]
+
+    def _scan_server(
+        self, server_dir: str, since: Optional[int], until: Optional[int], kinds: Optional[set]
+    ) -> Iterator[dict]:
+        first_day = _day(since) if since is not None else None
+        last_day = _day(until) if until is not None else None
+        for seg_path in self.segments(server_dir):
+            day = os.path.basename(seg_path)[:-4]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            frames, _ = _read_frames(seg_path)
+            with open(seg_path, "rb") as f:
+                for frame in frames:
+                    if (since is not None and frame.last < since) or (until is not None and frame.first >= until):
+                        continue
+                    for record in _read_records(f, frame):
+                        t = record["t"]
+                        if (since is not None and t < since) or (until is not None and t >= until):
+                            continue
+                        if kinds and record["kind"] not in kinds:
+                            continue
+                        record["server"] = server_dir
+                        yield record
+
+    def scan(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        servers: Optional[Iterable[str]] = None,
+        kinds: Optional[Iterable[str]] = None
+    ) -> Iterator[dict]:
+        """
+        Archived records in log order, servers merged by time. Records still
+        in memory are not included, call flush() first in the same process.
+
+        Args:
+            since: First epoch second to include (optional)
+            until: Epoch second to stop before (optional)
+            servers: Server names to include (optional, default all)
+            kinds: "chat" and/or "join" (optional, default both)
+
+        Returns:
+            Iterator of dicts: t (epoch), kind, server (directory name) and the event fields
+        """
+        dirs = self.servers()
+        if servers is not None:
+            wanted = {_safe_dirname(s) for s in servers}
+            dirs = [d for d in dirs if d in wanted]
+        kinds = set(kinds) if kinds else None
+        iterators = [self._scan_server(d, since, until, kinds) for d in dirs]
+        if len(iterators) == 1:
+            return iterators[0]
+        return heapq.merge(*iterators, key=lambda r: r["t"])
+
+    def stats(self) -> Dict[str, dict]:
+        """Per server directory: days, frames, records, compressed bytes and time range"""
+        result = {}
+        for server_dir in self.servers():
+            entry = {"days": 0, "frames": 0, "records": 0, "bytes": 0, "first": None, "last": None}
+            for seg_path in self.segments(server_dir):
+                frames, _ = _read_frames(seg_path)
+                entry["days"] += 1
+                entry["frames"] += len(frames)
+                entry["records"] += sum(f.count for f in frames)
+                entry["bytes"] += os.path.getsize(seg_path)
+                if frames:
+                    first, last = min(f.first for f in frames), max(f.last for f in frames)
+                    entry["first"] = first if entry["first"] is None else min(entry["first"], first)
+                    entry["last"] = last if entry["last"] is None else max(entry["last"], last)
+            result[server_dir] = entry
+        return result
+
+
+def _date_arg(value: Optional[str]) -> Optional[int]:
+    return int(datetime.strptime(value, "%Y-%m-%d").timestamp()) if value else None
+
+
+def replay(
+    archive: ChatArchive,
+    model_path: str,
+    engine: str = "numpy",
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    servers: Optional[Iterable[str]] = None,
+    store_path: Optional[str] = None,
+    write_store: bool = False,
+    batch_size: int = 2048,
+    progress=print
+) -> Counter:
+    """
+    Label archived chat with a model, e.g. to compare a new model against the
+    old one or to grow the training store with real messages (source "replay")
+
+    Args:
+        store_path: Training store the labelled messages are added to
+        write_store: Must be set to write to store_path. The labels are the
+            model's own predictions, training on them only reinforces its mistakes;
+            TrainingStore.load() leaves them out unless asked for.
+
+    Returns:
+        Label counts of the distinct messages
+    """
+    if store_path and not write_store:
+        raise ValueError("Replay labels are model predictions, pass write_store=True to add them to the store")
+
+    from ml_analyzer import MLAnalyzer
+    from training_store import open_store
+
+    analyzer = MLAnalyzer(model_path=model_path, engine=engine)
+    store = open_store(store_path) if store_path else None
+    labels: Counter = Counter()
+    seen = set()
+    batch: List[str] = []
+    start = time.perf_counter()
+    scanned = 0
+
+    def run_batch():
+        predictions = analyzer.predict_batch(batch)
+        labels.update(predictions)
+        if store:
+            store.add_many(zip(batch, predictions), source="replay")
+        batch.clear()
+
+    try:
+        with store.bulk() if store else nullcontext():
+            for record in archive.scan(since, until, servers, kinds=["chat"]):
+                scanned += 1
+                text = record["message"].strip()
+                if not text or text in seen:
+                    continue
+                seen.add(text)
+                batch.append(text)
+                if len(batch) >= batch_size:
+                    run_batch()
+            if batch:
+                run_batch()
+    finally:
+        analyzer.close()
+        if store:
+            store.close()
+    progress(f"{scanned} messages, {len(seen)} distinct, labelled in {time.perf_counter() - start:.1f} s")
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat archive tools")
+    parser.add_argument("--root", default="data/archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Records and size per server")
+    for name in ("export", "replay"):
+        p = sub.add_parser(name)
+        p.add_argument("--since", help="YYYY-MM-DD")
+        p.add_argument("--until", help="YYYY-MM-DD (exclusive)")
+        p.add_argument("--server", action="append", help="Server name, can be repeated")
+        if name == "export":
+            p.add_argument("--kind", action="append", choices=["chat", "join"])
+        else:
+            p.add_argument("--model", default="models/violation_model.joblib")
+            p.add_argument("--engine", default="numpy")
+            p.add_argument("--store", help="Add the labelled messages to this training store (needs --write-store)")
+            p.add_argument("--write-store", action="store_true",
+                           help="Confirm writing the model's own predictions to --store as source \"replay\"")
+    args = parser.parse_args()
+
+    archive = ChatArchive(args.root, flush_interval=0)
+    if args.command == "stats":
+        print(f"{'Server':<24} | {'Days':>4} | {'Frames':>6} | {'Records':>9} | {'MB':>7} | First - last")
+        print("-" * 90)
+        for server_dir, s in archive.stats().items():
+            span = (f"{datetime.fromtimestamp(s['first']):%Y-%m-%d %H:%M} - {datetime.fromtimestamp(s['last']):%Y-%m-%d %H:%M}"
+                    if s["first"] is not None else "-")
+            print(f"{server_dir:<24} | {s['days']:>4} | {s['frames']:>6} | {s['records']:>9} | "
+                  f"{s['bytes'] / 1e6:>7.2f} | {span}")
+    elif args.command == "export":
+        for record in archive.scan(_date_arg(args.since), _date_arg(args.until), args.server, args.kind):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    else:
+        if args.store and not args.write_store:
+            parser.error("--store writes the model's own predictions to the training store, add --write-store")
+        labels = replay(archive, args.model, args.engine, _date_arg(args.since), _date_arg(args.until),
+                        args.server, args.store, args.write_store)
+        for label, count in labels.most_common():
+            print(f"{label:<9} {count}")
+
+
+if __name__ == "__main__":
+    main()
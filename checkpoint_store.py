@@ -0,0 +1,181 @@
+"""
+Checkpoint Store
+Persists per-server, per-log read offsets so that monitoring resumes
+where it left off after a restart. State that has to agree with the
+offsets (the de-duplication windows) is attached with attach_state() and
+written in the same atomic file.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Optional, Dict
+from logger import log
+
+
+# Number of bytes from the start of the file used to recognise it
+FINGERPRINT_SIZE = 1024
+
+
+@dataclass
+class Checkpoint:
+    """Saved read position of a single log file"""
+    offset: int
+    inode: int
+    fingerprint: str
+    fingerprint_len: int
+    updated_at: float = 0.0
+
+
+def file_fingerprint(fd: int, length: int = FINGERPRINT_SIZE) -> tuple[str, int]:
+    """
+    Hash the head of an open file
+
+    Returns:
+        (hex digest, number of bytes hashed)
+    """
+    head = os.pread(fd, length, 0)
+    return hashlib.sha1(head).hexdigest(), len(head)
+
+
+def resolve_start_offset(checkpoint: Optional[Checkpoint], fd: int) -> Optional[int]:
+    """
+    Decide where to resume reading an opened file
+
+    Returns:
+        Byte offset to resume from, or None if there is no usable checkpoint
+        (the caller then falls back to its default start position).
+        0 is returned when the checkpoint belongs to a rotated or truncated file.
+    """
+    if checkpoint is None:
+        return None
+
+    st = os.fstat(fd)
+    digest, length = file_fingerprint(fd, checkpoint.fingerprint_len)
+    if length < checkpoint.fingerprint_len or digest != checkpoint.fingerprint:
+        # Head of the file differs -> a different (rotated/rewritten) file
+        return 0
+    if checkpoint.offset > st.st_size:
+        # Same head but shorter than before -> truncated and rewritten
+        return 0
+    # Inode may differ if the file was copied, but the content still matches
+    return checkpoint.offset
+
+
+class CheckpointStore:
+    """Thread-safe checkpoint store written to disk in batches"""
+
+    def __init__(self, path: str = "data/checkpoints.json", flush_every: int = 500, flush_interval: float = 5.0):
+        """
+        Initialize checkpoint store
+
+        Args:
+            path: JSON file holding the checkpoints
+            flush_every: Write to disk after this many updates
+            flush_interval: ...or after this many seconds since the last write
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._checkpoints: Dict[str, Checkpoint] = {}
+        self._states: Dict[str, Any] = {}
+        self._state_providers: Dict[str, Callable[[], Any]] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._load()
+
+    @staticmethod
+    def key(server_name: str, label: str) -> str:
+        return f"{server_name}|{label}"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if isinstance(raw.get("checkpoints"), dict):
+                self._states = raw.get("state") or {}
+                raw = raw["checkpoints"]
+            # Older files hold the checkpoints only
+            self._checkpoints = {k: Checkpoint(**v) for k, v in raw.items()}
+            log.info(f"📍 Ladattu {len(self._checkpoints)} lukukohtaa: {self.path}")
+        except Exception as e:
+            log.warning(f"⚠️ Lukukohtien lataus epäonnistui ({self.path}): {e}")
+            self._checkpoints = {}
+            self._states = {}
+
+    def get(self, key: str) -> Optional[Checkpoint]:
+        with self._lock:
+            return self._checkpoints.get(key)
+
+    def update(self, key: str, offset: int, inode: int, fingerprint: str, fingerprint_len: int):
+        """Record a new position in memory, flushing to disk when the batch is full"""
+        with self._lock:
+            self._checkpoints[key] = Checkpoint(offset, inode, fingerprint, fingerprint_len, time.time())
+            self._pending += 1
+            due = (self._pending >= self.flush_every or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def attach_state(self, key: str, snapshot: Callable[[], Any]) -> Any:
+        """
+        Save snapshot() with every flush from now on
+
+        Args:
+            key: Name of the state in the file
+            snapshot: Returns JSON-serialisable data, called from the flushing thread
+
+        Returns:
+            The state saved under key by the previous run, or None
+        """
+        with self._lock:
+            self._state_providers[key] = snapshot
+            return self._states.get(key)
+
+    def maybe_flush(self):
+        """Flush if there are pending updates older than flush_interval"""
+        with self._lock:
+            due = self._pending and time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self, force: bool = False):
+        """
+        Atomically write all checkpoints and attached state to disk
+
+        Args:
+            force: Write even without checkpoint updates since the last flush (shutdown)
+        """
+        with self._lock:
+            if not self._pending and not force:
+                return
+            snapshot = {
+                "checkpoints": {k: asdict(v) for k, v in self._checkpoints.items()},
+                "state": dict(self._states),
+            }
+            for key, provider in self._state_providers.items():
+                try:
+                    snapshot["state"][key] = provider()
+                except Exception as e:
+                    log.error(f"❌ Tilan {key} tallennus epäonnistui: {e}")
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                log.error(f"❌ Virhe lukukohtien tallennuksessa: {e}")
@@ -0,0 +1,238 @@
+"""
+Compiled Linear Model
+Exports the trained TfidfVectorizer(char_wb) + LogisticRegression pipeline to
+a flat NumPy .npz (sorted 64-bit n-gram hashes, float32 idf and coefficient
+rows) and scores texts with vectorized NumPy. Loading memory-maps the arrays
+instead of unpickling the vectorizer's vocabulary dict.
+"""
+
+import io
+import mmap
+import struct
+import zipfile
+from typing import List, Sequence, Dict
+
+import numpy as np
+
+
+# Local file header of a zip member: fixed 30 bytes, then name and extra field
+_ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+_MASK = (1 << 64) - 1
+_PRIME = 0x100000001B3
+
+
+def _mix(h):
+    """splitmix64 finaliser, works on Python ints and uint64 arrays alike"""
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9
+    h = h & _MASK if isinstance(h, int) else h
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB
+    h = h & _MASK if isinstance(h, int) else h
+    return h ^ (h >> 31)
+
+
+def ngram_hash(gram: str) -> int:
+    """
+    Stable 64-bit hash of an n-gram (Python's hash() is salted per process).
+    A polynomial over the code points so that CompiledModel can compute the
+    same value for every window of a message with a few array operations.
+    """
+    h = len(gram)
+    for ch in gram:
+        h = (h * _PRIME + ord(ch)) & _MASK
+    return _mix(h)
+
+
+def char_wb_ngrams(text: str, min_n: int, max_n: int) -> List[str]:
+    """Same n-grams as TfidfVectorizer(analyzer='char_wb') (reference implementation)"""
+    grams = []
+    for w in text.split():
+        w = " " + w + " "
+        w_len = len(w)
+        for n in range(min_n, max_n + 1):
+            offset = 0
+            grams.append(w[offset:offset + n])
+            while offset + n < w_len:
+                offset += 1
+                grams.append(w[offset:offset + n])
+            if offset == 0:
+                # A word shorter than n is only counted once
+                break
+    return grams
+
+
+def char_wb_hashes(texts: Sequence[str], min_n: int, max_n: int, lowercase: bool = True):
+    """
+    Hash every char_wb n-gram of every text without building the strings
+
+    Returns:
+        (hashes, docs): uint64 n-gram hashes and the index of the text each came from
+    """
+    words, lengths, word_docs = [], [], []
+    for i, text in enumerate(texts):
+        if lowercase:
+            text = text.lower()
+        split = text.split()
+        words.extend(split)
+        lengths.extend(len(w) + 2 for w in split)
+        word_docs.extend([i] * len(split))
+    if not words:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.intp)
+
+    # " w1 " + " w2 " + ... as one array of code points
+    joined = " " + "  ".join(words) + " "
+    chars = np.frombuffer(joined.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    starts = np.cumsum(lengths) - lengths
+    word_docs = np.asarray(word_docs, dtype=np.intp)
+    prime = np.uint64(_PRIME)
+
+    hashes, docs = [], []
+    for n in range(min_n, max_n + 1):
+        # Sliding windows of words longer than n
+        longer = np.nonzero(lengths > n)[0]
+        counts = lengths[longer] - n + 1
+        word_idx = np.repeat(longer, counts)
+        within = np.arange(len(word_idx)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pos = starts[word_idx] + within
+        h = np.full(len(pos), n, dtype=np.uint64)
+        for i in range(n):
+            h = h * prime + chars[pos + i]
+        hashes.append(h)
+        docs.append(word_docs[word_idx])
+
+        # Words no longer than n are counted once, as a whole
+        whole = np.nonzero(np.maximum(lengths, min_n) == n)[0]
+        if len(whole):
+            pos, size = starts[whole], lengths[whole]
+            h = size.astype(np.uint64)
+            for i in range(n):
+                inside = i < size
+                h = np.where(inside, h * prime + chars[np.minimum(pos + i, len(chars) - 1)], h)
+            hashes.append(h)
+            docs.append(word_docs[whole])
+
+    return _mix(np.concatenate(hashes)), np.concatenate(docs)
+
+
+def export_pipeline(pipeline, path: str):
+    """
+    Write the compact inference artifact for a fitted pipeline
+
+    Args:
+        pipeline: Pipeline([('tfidf', TfidfVectorizer), ('clf', LogisticRegression)])
+        path: Destination .npz file or binary file object
+    """
+    tfidf = pipeline.named_steps["tfidf"]
+    clf = pipeline.named_steps["clf"]
+    if tfidf.analyzer != "char_wb" or tfidf.norm != "l2" or tfidf.sublinear_tf or tfidf.strip_accents:
+        raise ValueError("Only TfidfVectorizer(analyzer='char_wb', norm='l2') pipelines can be compiled")
+
+    grams = tfidf.get_feature_names_out()
+    hashes = np.fromiter((ngram_hash(g) for g in grams), dtype=np.uint64, count=len(grams))
+    order = np.argsort(hashes)
+    hashes = hashes[order]
+    if len(hashes) > 1 and np.any(hashes[1:] == hashes[:-1]):
+        raise ValueError("n-gram hash collision, cannot compile the model")
+
+    idf = tfidf.idf_ if tfidf.use_idf else np.ones(len(grams))
+    # One row per n-gram so a message only touches the rows it contains
+    coef = np.ascontiguousarray(clf.coef_.T[order], dtype=np.float32)
+
+    np.savez(
+        path,
+        hashes=hashes,
+        idf=idf[order].astype(np.float32),
+        coef=coef,
+        intercept=clf.intercept_.astype(np.float32),
+        classes=np.asarray(clf.classes_, dtype=str),
+        ngram_range=np.asarray(tfidf.ngram_range, dtype=np.int32),
+        lowercase=np.asarray(tfidf.lowercase),
+    )
+
+
+def compile_pipeline(pipeline) -> "CompiledModel":
+    """Compile a fitted pipeline in memory, e.g. to compare it with sklearn before publishing"""
+    buffer = io.BytesIO()
+    export_pipeline(pipeline, buffer)
+    buffer.seek(0)
+    with np.load(buffer) as npz:
+        return CompiledModel({name: npz[name] for name in npz.files})
+
+
+def _mmap_npz(path: str) -> Dict[str, np.ndarray]:
+    """Map every member of an uncompressed .npz as a read-only array"""
+    arrays = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f) as zf:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(zf.open(info))
+                continue
+            header = _ZIP_LOCAL_HEADER.unpack_from(mm, info.header_offset)
+            start = info.header_offset + _ZIP_LOCAL_HEADER.size + header[-2] + header[-1]
+            member = memoryview(mm)[start:start + info.file_size]
+            shape, fortran_order, dtype, data_offset = _npy_header(member)
+            if dtype.hasobject or dtype.kind == "U":
+                # Small string arrays are copied, numeric ones stay mapped
+                arrays[name] = np.load(zf.open(info))
+                continue
+            array = np.frombuffer(member, dtype=dtype, count=int(np.prod(shape)), offset=data_offset)
+            arrays[name] = array.reshape(shape, order="F" if fortran_order else "C")
+    return arrays
+
+
+def _npy_header(member: memoryview):
+    stream = io.BytesIO(member[:4096].tobytes())
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    return shape, fortran_order, dtype, stream.tell()
+
+
+class CompiledModel:
+    """Drop-in replacement for the sklearn pipeline's predict()"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.hashes = arrays["hashes"]
+        self.idf = arrays["idf"]
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.classes_ = arrays["classes"]
+        self.min_n, self.max_n = (int(n) for n in arrays["ngram_range"])
+        self.lowercase = bool(arrays["lowercase"])
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledModel":
+        return cls(_mmap_npz(path))
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        n_docs = len(texts)
+        hashes, docs = char_wb_hashes(texts, self.min_n, self.max_n, self.lowercase)
+        n_features = len(self.hashes)
+        rows = np.searchsorted(self.hashes, hashes)
+        rows[rows == n_features] = 0
+        known = self.hashes[rows] == hashes
+
+        # Term counts per (text, n-gram)
+        keys, counts = np.unique(docs[known] * n_features + rows[known], return_counts=True)
+        docs, rows = np.divmod(keys, n_features)
+        weights = counts * self.idf[rows].astype(np.float64)
+        norms = np.sqrt(np.bincount(docs, weights * weights, minlength=n_docs))
+        norms[norms == 0] = 1.0
+        weights /= norms[docs]
+
+        # Accumulate in float64 so the float32 weights rank classes like sklearn
+        scores = np.empty((n_docs, self.coef.shape[1]), dtype=np.float64)
+        for c in range(self.coef.shape[1]):
+            scores[:, c] = np.bincount(docs, weights * self.coef[rows, c], minlength=n_docs)
+        return scores + self.intercept
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        if scores.shape[1] == 1:
+            return self.classes_[(scores[:, 0] > 0).astype(np.intp)]
+        return self.classes_[scores.argmax(axis=1)]
@@ -1,61 +1,463 @@
 """
 Database Module
 SQLite database for storing violations and analysis history.
+
+One long-lived writer connection in WAL mode lives on its own thread and
+group-commits queued inserts (every batch_size rows or flush_ms
+milliseconds), so the monitor threads never wait for an fsync. Reads use a
+small pool of read-only connections, which WAL lets run next to the writer.
+
+The schema is versioned with PRAGMA user_version; MIGRATIONS upgrade an
+existing violations.db in place when it is opened.
 """
 
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from ml_analyzer import ViolationLevel
+from bounded_cache import log_minute
+from logger import log
+
+
+INSERT_VIOLATION = """
+    INSERT INTO violations (
+        id, timestamp, player_name, ip_address, violation_type,
+        content, level, reason, suggested_action, created_at,
+        server_name, event_time
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def event_epoch(timestamp: Optional[str], created_at: Optional[str]) -> int:
+    """
+    Epoch seconds of a violation: the PP2 log time ('dd.mm.yyyy HH:MM'),
+    or the time it was recorded if the log time does not parse
+    """
+    minute = log_minute(timestamp)
+    if minute is not None:
+        return minute * 60
+    try:
+        return int(datetime.fromisoformat(created_at).timestamp())
+    except (ValueError, TypeError):
+        return 0
+
+
+def _migrate_server_and_event_time(conn: sqlite3.Connection):
+    """v1: server column, integer event time and indexes that match the queries"""
+    conn.execute("ALTER TABLE violations ADD COLUMN server_name TEXT NOT NULL DEFAULT ''")
+    conn.execute("ALTER TABLE violations ADD COLUMN event_time INTEGER NOT NULL DEFAULT 0")
+    conn.create_function("event_epoch", 2, event_epoch, deterministic=True)
+    conn.execute("UPDATE violations SET event_time = event_epoch(timestamp, created_at)")
+    # Player history per server and across servers, newest first
+    conn.execute("CREATE INDEX idx_server_player_time ON violations(server_name, player_name, event_time)")
+    conn.execute("CREATE INDEX idx_player_time ON violations(player_name, event_time)")
+    # Recent violations by level and level counts are answered from the index alone
+    conn.execute("CREATE INDEX idx_level_time ON violations(level, event_time)")
+    conn.execute("CREATE INDEX idx_event_time ON violations(event_time)")
+    # Prefixes of the indexes above
+    conn.execute("DROP INDEX IF EXISTS idx_player_name")
+    conn.execute("DROP INDEX IF EXISTS idx_level")
+
+
+ROLLUP_UPSERTS = {
+    'player': """
+        INSERT INTO stats_player (player_name, count, last_time) VALUES (?, ?, ?)
+        ON CONFLICT(player_name) DO UPDATE SET
+            count = count + excluded.count, last_time = MAX(last_time, excluded.last_time)
+    """,
+    'level': """
+        INSERT INTO stats_level (level, count) VALUES (?, ?)
+        ON CONFLICT(level) DO UPDATE SET count = count + excluded.count
+    """,
+    'server': """
+        INSERT INTO stats_server (server_name, count) VALUES (?, ?)
+        ON CONFLICT(server_name) DO UPDATE SET count = count + excluded.count
+    """,
+    'hour': """
+        INSERT INTO stats_hour (hour, server_name, level, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT(hour, server_name, level) DO UPDATE SET count = count + excluded.count
+    """,
+}
+
+
+def update_rollups(conn: sqlite3.Connection, rows: List[tuple], sign: int = 1):
+    """
+    Add (server_name, player_name, level, event_time) rows to the stats
+    tables, one upsert per distinct key instead of one per row. With
+    sign=-1 the rows are subtracted (retention) and keys that reach zero
+    are removed.
+    """
+    players: Dict[str, List[int]] = {}
+    levels: Counter = Counter()
+    servers: Counter = Counter()
+    hours: Counter = Counter()
+    for server_name, player_name, level, event_time in rows:
+        entry = players.get(player_name)
+        if entry is None:
+            players[player_name] = [sign, event_time if sign > 0 else 0]
+        else:
+            entry[0] += sign
+            if sign > 0:
+                entry[1] = max(entry[1], event_time)
+        levels[level] += sign
+        servers[server_name] += sign
+        hours[(event_time // 3600, server_name, level)] += sign
+    conn.executemany(ROLLUP_UPSERTS['player'], [(name, c, t) for name, (c, t) in players.items()])
+    conn.executemany(ROLLUP_UPSERTS['level'], levels.items())
+    conn.executemany(ROLLUP_UPSERTS['server'], servers.items())
+    conn.executemany(ROLLUP_UPSERTS['hour'], [(*key, c) for key, c in hours.items()])
+    if sign < 0:
+        # Retention removes the oldest rows, so a player's last_time stays right while any row is left
+        conn.executemany("DELETE FROM stats_player WHERE player_name = ? AND count <= 0", [(p,) for p in players])
+        conn.executemany("DELETE FROM stats_level WHERE level = ? AND count <= 0", [(l,) for l in levels])
+        conn.executemany("DELETE FROM stats_server WHERE server_name = ? AND count <= 0", [(s,) for s in servers])
+        conn.executemany(
+            "DELETE FROM stats_hour WHERE hour = ? AND server_name = ? AND level = ? AND count <= 0", list(hours)
+        )
+
+
+def _migrate_rollups(conn: sqlite3.Connection):
+    """v2: per-player, per-level, per-server and per-hour counts kept up to date by the writer"""
+    conn.execute("""
+        CREATE TABLE stats_player (
+            player_name TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            last_time INTEGER NOT NULL
+        )
+    """)
+    # Top violators are the first rows of this index
+    conn.execute("CREATE INDEX idx_stats_player_count ON stats_player(count)")
+    conn.execute("CREATE TABLE stats_level (level TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE stats_server (server_name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    conn.execute("""
+        CREATE TABLE stats_hour (
+            hour INTEGER NOT NULL,          -- event_time // 3600
+            server_name TEXT NOT NULL,
+            level TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (hour, server_name, level)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO stats_player (player_name, count, last_time)
+        SELECT player_name, COUNT(*), MAX(event_time) FROM violations GROUP BY player_name
+    """)
+    conn.execute("INSERT INTO stats_level (level, count) SELECT level, COUNT(*) FROM violations GROUP BY level")
+    conn.execute("""
+        INSERT INTO stats_server (server_name, count)
+        SELECT server_name, COUNT(*) FROM violations GROUP BY server_name
+    """)
+    conn.execute("""
+        INSERT INTO stats_hour (hour, server_name, level, count)
+        SELECT event_time / 3600, server_name, level, COUNT(*) FROM violations
+        GROUP BY event_time / 3600, server_name, level
+    """)
+
+
+def _migrate_fulltext(conn: sqlite3.Connection):
+    """v3: FTS5 index over violations.content, filled by the writer next to each insert"""
+    # External content: the index stores tokens only, the text stays in violations.
+    # Player and server are indexed too, so their filters narrow the match inside FTS.
+    conn.execute("""
+        CREATE VIRTUAL TABLE violations_fts USING fts5(
+            content,
+            player_name,
+            server_name,
+            content='violations',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("INSERT INTO violations_fts(violations_fts) VALUES('rebuild')")
+
+
+# Applied in order, MIGRATIONS[n] brings user_version n to n + 1
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _migrate_server_and_event_time,
+    _migrate_rollups,
+    _migrate_fulltext,
+]
+
+
+SEARCH_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _fts_string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def has_tokens(text: str) -> bool:
+    """True if unicode61 finds a word in text (letters, digits, private use), not only punctuation or symbols"""
+    return any(unicodedata.category(ch)[0] in "LN" or unicodedata.category(ch) == "Co" for ch in text)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Turn what a moderator typed into an FTS5 query: every word (or "quoted
+    phrase") must appear, a trailing * matches word prefixes. FTS5 operators
+    and punctuation are taken literally, so any input is a valid query.
+    Terms without a single word ("???", "☆") are dropped, FTS5 never matches them.
+
+    Returns:
+        The MATCH expression, or None if there is nothing to search for
+    """
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(text):
+        term = phrase or word
+        prefix = not phrase and term.endswith("*")
+        term = term.rstrip("*").strip()
+        if has_tokens(term):
+            terms.append(_fts_string(term) + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+class _WriterTask:
+    """Function queued between the rows, run on the writer connection"""
+
+    def __init__(self, fn: Callable[[sqlite3.Connection], Any]):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+    def run(self, conn: sqlite3.Connection):
+        try:
+            self.result = self.fn(conn)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done.set()
 
 
 class Database:
     """SQLite database for storing violation records"""
-    
-    def __init__(self, db_path: str = "data/violations.db"):
+
+    def __init__(
+        self,
+        db_path: str = "data/violations.db",
+        batch_size: int = 200,
+        flush_ms: float = 50.0,
+        read_connections: int = 2,
+        max_pending: int = 10000,
+        wait_timeout: float = 30.0
+    ):
         """
         Initialize database connection
-        
+
         Args:
             db_path: Path to SQLite database file
+            batch_size: Rows committed at most in one transaction
+            flush_ms: Longest time (ms) a queued row waits for its commit
+            read_connections: Pooled read-only connections
+            max_pending: Queued rows at most, add_violation blocks when full
+            wait_timeout: Default seconds flush(), reads and writer tasks wait for the writer thread
         """
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.wait_timeout = wait_timeout
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._writer = sqlite3.connect(db_path, check_same_thread=False)
         self._init_db()
-    
+        self._next_id = (self._writer.execute("SELECT MAX(id) FROM violations").fetchone()[0] or 0) + 1
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._id_lock = threading.Lock()
+        self._commit_cond = threading.Condition()
+        self._committed_id = self._next_id - 1
+        self._closed = False
+        self.commits = 0
+        self.write_errors = 0
+
+        self._readers: "queue.LifoQueue" = queue.LifoQueue()
+        self._reader_slots = threading.Semaphore(read_connections)
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True, name="DatabaseWriter")
+        self._thread.start()
+
     def _init_db(self):
-        """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create violations table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS violations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                player_name TEXT NOT NULL,
-                ip_address TEXT,
-                violation_type TEXT NOT NULL,
-                content TEXT NOT NULL,
-                level TEXT NOT NULL,
-                reason TEXT NOT NULL,
-                suggested_action TEXT NOT NULL,
-                created_at TEXT NOT NULL
+        """Initialize database schema and bring it to the current version"""
+        conn = self._writer
+        # New files give deleted pages back with PRAGMA incremental_vacuum (retention);
+        # an existing file keeps its mode until a full VACUUM (python retention.py vacuum)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, a power cut can lose the last commits but not corrupt
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # A retention pass grows the WAL, checkpoints cut it back to this size instead of leaving it at its peak
+        conn.execute("PRAGMA journal_size_limit=16777216")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        # The original layout, the migrations take it from there. Skipped for
+        # upgraded files, where a migration may have dropped these indexes.
+        if version == 0:
+            cursor = conn.cursor()
+
+            # Create violations table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS violations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    player_name TEXT NOT NULL,
+                    ip_address TEXT,
+                    violation_type TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    suggested_action TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+
+            # Create index on player_name for faster lookups
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_player_name ON violations(player_name)
+            """)
+
+            # Create index on level for filtering
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_level ON violations(level)
+            """)
+
+            conn.commit()
+        self._migrate(version)
+
+    def _migrate(self, version: int):
+        """Run the migrations this file has not seen yet, each in its own transaction"""
+        conn = self._writer
+        for target in range(version + 1, len(MIGRATIONS) + 1):
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                MIGRATIONS[target - 1](conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            log.info(f"🗄️ Tietokanta päivitetty versioon {target} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def _write_loop(self):
+        """Writer thread: drain the queue in transactions of up to batch_size rows"""
+        while True:
+            try:
+                if not self._write_next():
+                    return
+            except Exception as e:
+                # Anything escaping a commit must not stop the only writer
+                self.write_errors += 1
+                log.error(f"❌ Virhe tietokannan kirjoitussäikeessä: {e}")
+
+    def _write_next(self) -> bool:
+        """Commit the next batch (or run the next task). False when asked to stop."""
+        row = self._queue.get()
+        if row is None:
+            return False
+        if isinstance(row, _WriterTask):
+            row.run(self._writer)
+            return True
+        batch = [row]
+        stop = False
+        task = None
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is None:
+                stop = True
+                break
+            if isinstance(row, _WriterTask):
+                task = row
+                break
+            batch.append(row)
+        try:
+            self._commit(batch)
+        finally:
+            # Waiters are released even if the batch could not be written
+            with self._commit_cond:
+                self._committed_id = max(self._committed_id, batch[-1][0])
+                self._commit_cond.notify_all()
+            if task:
+                task.run(self._writer)
+        return not stop
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the lock, the write can be retried"""
+        code = getattr(error, "sqlite_errorcode", None)
+        if code is not None:
+            return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+        return isinstance(error, sqlite3.OperationalError) and (
+            "locked" in str(error) or "busy" in str(error)
+        )
+
+    def _commit(self, batch: List[tuple]):
+        # The log time is parsed here, off the monitor threads; it repeats for a whole minute
+        epochs: Dict[str, int] = {}
+        rows = []
+        for row in batch:
+            timestamp, created_at = row[1], row[9]
+            epoch = epochs.get(timestamp)
+            if epoch is None:
+                epoch = epochs[timestamp] = event_epoch(timestamp, created_at)
+            rows.append(row + (epoch,))
+
+        delay = 0.05
+        started = time.monotonic()
+        while True:
+            try:
+                self._insert(rows)
+                self.commits += 1
+                return
+            except Exception as e:
+                if not self._is_transient(e):
+                    break
+                if self._closed and time.monotonic() - started > self.wait_timeout:
+                    # Shutting down, close() must not wait for a lock forever
+                    self.write_errors += len(rows)
+                    log.error(f"❌ Tietokanta on yhä lukittu, {len(rows)} riviä menetettiin sulkiessa: {e}")
+                    return
+                # connect() already waited its busy timeout, keep the rows and try again
+                log.warning(f"⚠️ Tietokanta on lukittu, yritetään {len(rows)} rivin kirjoitusta uudelleen: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+        # A permanent error: write the rows one by one so only the broken ones are lost
+        lost = 0
+        for row in rows:
+            try:
+                self._insert([row])
+                self.commits += 1
+            except Exception as e:
+                lost += 1
+                self.write_errors += 1
+                log.error(f"❌ Rikkomuksen {row[0]} kirjoitus tietokantaan epäonnistui, rivi menetettiin: {e}")
+        if lost < len(rows):
+            log.info(f"💾 {len(rows) - lost}/{len(rows)} riviä kirjoitettiin yksitellen virheen jälkeen")
+
+    def _insert(self, rows: List[tuple]):
+        with self._writer:
+            self._writer.executemany(INSERT_VIOLATION, rows)
+            # Same transaction, the stats never disagree with the rows
+            update_rollups(self._writer, [(r[10], r[2], r[6], r[11]) for r in rows])
+            self._writer.executemany(
+                "INSERT INTO violations_fts(rowid, content, player_name, server_name) VALUES (?, ?, ?, ?)",
+                [(r[0], r[5], r[2], r[10]) for r in rows]
             )
-        """)
-        
-        # Create index on player_name for faster lookups
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_player_name ON violations(player_name)
-        """)
-        
-        # Create index on level for filtering
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_level ON violations(level)
-        """)
-        
-        conn.commit()
-        conn.close()
-    
+
     def add_violation(
         self,
         timestamp: str,
@@ -65,11 +467,13 @@ class Database:
         level: ViolationLevel,
         reason: str,
         suggested_action: str,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        server_name: str = ""
     ) -> int:
         """
-        Add a violation record to the database
-        
+        Add a violation record to the database. The row is queued for the
+        writer thread and committed within flush_ms.
+
         Args:
             timestamp: Timestamp from the log
             player_name: Name of the player
@@ -79,141 +483,411 @@ class Database:
             reason: ML's reasoning
             suggested_action: Suggested action to take
             ip_address: Player's IP address (optional)
-            
+            server_name: Server the violation happened on
+
         Returns:
             ID of the inserted record
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO violations (
-                timestamp, player_name, ip_address, violation_type,
-                content, level, reason, suggested_action, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            timestamp,
-            player_name,
-            ip_address,
-            violation_type,
-            content,
-            level,
-            reason,
-            suggested_action,
-            datetime.now().isoformat()
-        ))
-        
-        violation_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
+        # This is the only writer, ids are handed out here so the caller gets one without waiting
+        with self._id_lock:
+            if self._closed:
+                raise RuntimeError("Database is closed")
+            violation_id = self._next_id
+            self._next_id += 1
+            self._queue.put((
+                violation_id,
+                timestamp,
+                player_name,
+                ip_address,
+                violation_type,
+                content,
+                level,
+                reason,
+                suggested_action,
+                datetime.now().isoformat(),
+                server_name
+            ))
         return violation_id
-    
+
+    def _writer_alive(self) -> bool:
+        if self._thread.is_alive():
+            return True
+        log.error("❌ Tietokannan kirjoitussäie on pysähtynyt")
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every row queued so far is committed
+
+        Args:
+            timeout: Seconds to wait at most (default: wait_timeout)
+
+        Returns:
+            False on timeout or if the writer thread has stopped
+        """
+        with self._id_lock:
+            target = self._next_id - 1
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        with self._commit_cond:
+            # Short waits, so a writer that died is noticed instead of waited for
+            while self._committed_id < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._writer_alive():
+                    return False
+                self._commit_cond.wait(min(remaining, 0.5))
+            return True
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a pooled read-only connection"""
+        with self._reader_slots:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        # Reads see everything add_violation() returned before them, or what is there after wait_timeout
+        if not self.flush():
+            log.warning("⚠️ Tietokannan kirjoitukset ovat jäljessä, luetaan ilman viimeisimpiä rivejä")
+        with self._reader() as conn:
+            return conn.execute(sql, params).fetchall()
+
     def get_player_violations(
         self,
         player_name: str,
-        limit: int = 10
+        limit: int = 10,
+        server_name: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get recent violations for a specific player
-        
+
         Args:
             player_name: Name of the player
             limit: Maximum number of records to return
-            
+            server_name: Only violations on this server (optional)
+
         Returns:
-            List of violation records
+            List of violation records, newest first
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM violations
-            WHERE player_name = ?
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (player_name, limit))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
+        if server_name is not None:
+            rows = self._query("""
+                SELECT * FROM violations
+                WHERE server_name = ? AND player_name = ?
+                ORDER BY event_time DESC, id DESC
+                LIMIT ?
+            """, (server_name, player_name, limit))
+        else:
+            rows = self._query("""
+                SELECT * FROM violations
+                WHERE player_name = ?
+                ORDER BY event_time DESC, id DESC
+                LIMIT ?
+            """, (player_name, limit))
+
         return [dict(row) for row in rows]
-    
+
     def get_recent_violations(
         self,
         level: Optional[ViolationLevel] = None,
-        limit: int = 50
+        limit: int = 50,
+        since: Optional[int] = None,
+        until: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get recent violations, optionally filtered by level
-        
+        Get recent violations, optionally filtered by level and time
+
         Args:
             level: Filter by violation level (optional)
             limit: Maximum number of records to return
-            
+            since: Only violations at or after this epoch second (optional)
+            until: Only violations before this epoch second (optional)
+
         Returns:
-            List of violation records
+            List of violation records, newest first
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
+        conditions, params = [], []
         if level:
-            cursor.execute("""
-                SELECT * FROM violations
-                WHERE level = ?
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, (level, limit))
-        else:
-            cursor.execute("""
-                SELECT * FROM violations
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
+            conditions.append("level = ?")
+            params.append(level)
+        if since is not None:
+            conditions.append("event_time >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("event_time < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"""
+            SELECT * FROM violations
+            {where}
+            ORDER BY event_time DESC, id DESC
+            LIMIT ?
+        """, (*params, limit))
+
         return [dict(row) for row in rows]
-    
-    def get_stats(self) -> Dict[str, Any]:
+
+    def search(
+        self,
+        text: str,
+        player_name: Optional[str] = None,
+        server_name: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: int = 10,
+        offset: int = 0,
+        max_ranked: int = 10000
+    ) -> List[Dict[str, Any]]:
         """
-        Get violation statistics
-        
+        Full-text search over violation content, best matches first
+
+        Args:
+            text: Words that must all appear, "quoted phrases" and prefix* allowed
+            player_name: Only this player (optional)
+            server_name: Only this server (optional)
+            since: Only violations at or after this epoch second (optional)
+            until: Only violations before this epoch second (optional)
+            limit: Page size
+            offset: Records to skip (page * limit)
+            max_ranked: Only the newest this many matches are ranked, so a
+                word in every other message does not score the whole history
+
+        Returns:
+            Violation records with a `snippet` (matches in **bold**) and `score` (lower is better)
+        """
+        query = fts_query(text)
+        if query is None:
+            return []
+        content_query = f"content : ({query})"
+        # A name that is all symbols ("☆☆") has no tokens to match, the exact filter below still applies
+        if player_name is not None and has_tokens(player_name):
+            content_query += f" AND player_name : {_fts_string(player_name)}"
+        if server_name is not None and has_tokens(server_name):
+            content_query += f" AND server_name : {_fts_string(server_name)}"
+
+        # Exact filters on the joined row, FTS only narrows by token
+        conditions, params = ["violations_fts MATCH ?"], [content_query]
+        if player_name is not None:
+            conditions.append("v.player_name = ?")
+            params.append(player_name)
+        if server_name is not None:
+            conditions.append("v.server_name = ?")
+            params.append(server_name)
+        if since is not None:
+            conditions.append("v.event_time >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("v.event_time < ?")
+            params.append(until)
+
+        self.flush()
+        with self._reader() as conn:
+            # Matches are walked in rowid order, a rowid bound skips the older part of the index
+            min_rowid = None
+            if since is not None:
+                min_rowid = conn.execute(
+                    "SELECT MIN(id) FROM violations INDEXED BY idx_event_time WHERE event_time >= ?", (since,)
+                ).fetchone()[0]
+                if min_rowid is None:
+                    return []
+            bound = "AND rowid >= ?" if min_rowid is not None else ""
+            newest = conn.execute(f"""
+                SELECT rowid FROM violations_fts WHERE violations_fts MATCH ? {bound}
+                ORDER BY rowid DESC LIMIT 1 OFFSET ?
+            """, (content_query, *([min_rowid] if min_rowid is not None else []), max_ranked - 1)).fetchone()
+            if newest is not None:
+                min_rowid = max(min_rowid or 0, newest[0])
+            if min_rowid is not None:
+                conditions.append("violations_fts.rowid >= ?")
+                params.append(min_rowid)
+
+            rows = conn.execute(f"""
+                SELECT v.*,
+                       snippet(violations_fts, 0, '**', '**', '…', 16) AS snippet,
+                       bm25(violations_fts, 1.0, 0.0, 0.0) AS score
+                FROM violations_fts
+                JOIN violations v ON v.id = violations_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score, v.event_time DESC
+                LIMIT ? OFFSET ?
+            """, (*params, limit, offset)).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Get violation statistics from the rollup tables, the cost does not
+        grow with the number of violations
+
+        Args:
+            top: Number of top violators
+
         Returns:
             Dictionary with statistics
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total violations
-        cursor.execute("SELECT COUNT(*) FROM violations")
-        total = cursor.fetchone()[0]
-        
-        # Violations by level
-        cursor.execute("""
-            SELECT level, COUNT(*) as count
-            FROM violations
-            GROUP BY level
-        """)
-        by_level = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Top violators
-        cursor.execute("""
-            SELECT player_name, COUNT(*) as count
-            FROM violations
-            GROUP BY player_name
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        top_violators = [{"player": row[0], "count": row[1]} for row in cursor.fetchall()]
-        
-        conn.close()
-        
+        self.flush()
+        with self._reader() as conn:
+            cursor = conn.cursor()
+
+            # Violations by level, the total is their sum
+            cursor.execute("SELECT level, count FROM stats_level WHERE count > 0")
+            by_level = {row[0]: row[1] for row in cursor.fetchall()}
+
+            cursor.execute("SELECT server_name, count FROM stats_server WHERE count > 0")
+            by_server = {row[0]: row[1] for row in cursor.fetchall()}
+
+            # Top violators
+            cursor.execute("""
+                SELECT player_name, count
+                FROM stats_player
+                ORDER BY count DESC
+                LIMIT ?
+            """, (top,))
+            top_violators = [{"player": row[0], "count": row[1]} for row in cursor.fetchall()]
+
         return {
-            "total": total,
+            "total": sum(by_level.values()),
             "by_level": by_level,
+            "by_server": by_server,
             "top_violators": top_violators
         }
+
+    def get_hourly_counts(
+        self,
+        since: int,
+        until: Optional[int] = None,
+        server_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Violations per hour, server and level
+
+        Args:
+            since: Hours containing or after this epoch second
+            until: Hours starting before this epoch second (optional)
+            server_name: Only this server (optional)
+
+        Returns:
+            Records of hour (epoch second it starts at), server_name, level and count, oldest first
+        """
+        conditions, params = ["hour >= ?"], [since // 3600]
+        if until is not None:
+            conditions.append("hour < ?")
+            params.append(-(-until // 3600))
+        if server_name is not None:
+            conditions.append("server_name = ?")
+            params.append(server_name)
+        rows = self._query(f"""
+            SELECT hour * 3600 AS hour, server_name, level, count
+            FROM stats_hour
+            WHERE {' AND '.join(conditions)}
+            ORDER BY hour, server_name, level
+        """, tuple(params))
+
+        return [dict(row) for row in rows]
+
+    def pending_writes(self) -> int:
+        """Rows and tasks waiting for the writer thread"""
+        return self._queue.qsize()
+
+    def _run_on_writer(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Queue fn behind the rows added so far and wait for its result"""
+        task = _WriterTask(fn)
+        with self._id_lock:
+            if self._closed:
+                raise RuntimeError("Database is closed")
+            self._queue.put(task)
+        deadline = time.monotonic() + self.wait_timeout
+        while not task.done.wait(min(max(deadline - time.monotonic(), 0), 0.5)):
+            if not self._writer_alive():
+                raise RuntimeError("Database writer thread has stopped")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Database writer did not respond in {self.wait_timeout:.0f} s")
+        if task.error:
+            raise task.error
+        return task.result
+
+    def get_violations_before(self, cutoff: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Oldest rows with event_time before cutoff, every column
+
+        Args:
+            cutoff: Epoch seconds
+            limit: Rows at most
+        """
+        rows = self._query("""
+            SELECT * FROM violations INDEXED BY idx_event_time
+            WHERE event_time < ?
+            ORDER BY event_time, id
+            LIMIT ?
+        """, (cutoff, limit))
+        return [dict(row) for row in rows]
+
+    def delete_violations(self, ids: List[int]) -> int:
+        """
+        Delete rows by id in one writer transaction, together with their
+        full-text entries and rollup counts. Ids that are already gone are
+        skipped.
+
+        Returns:
+            Rows deleted
+        """
+        def delete(conn: sqlite3.Connection) -> int:
+            rows = []
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows += conn.execute(f"""
+                    SELECT id, content, player_name, server_name, level, event_time
+                    FROM violations WHERE id IN ({','.join('?' * len(chunk))})
+                """, chunk).fetchall()
+            if not rows:
+                return 0
+            with conn:
+                # External-content FTS: a delete must repeat the indexed values
+                conn.executemany(
+                    "INSERT INTO violations_fts(violations_fts, rowid, content, player_name, server_name) "
+                    "VALUES ('delete', ?, ?, ?, ?)",
+                    [(r[0], r[1], r[2], r[3]) for r in rows]
+                )
+                update_rollups(conn, [(r[3], r[2], r[4], r[5]) for r in rows], sign=-1)
+                conn.executemany("DELETE FROM violations WHERE id = ?", [(r[0],) for r in rows])
+            return len(rows)
+
+        return self._run_on_writer(delete)
+
+    def incremental_vacuum(self, pages: int = 1000) -> Optional[int]:
+        """
+        Give up to `pages` free pages back to the file system and checkpoint the WAL
+
+        Returns:
+            Free pages left, or None if the file was not created with auto_vacuum=INCREMENTAL
+        """
+        def vacuum(conn: sqlite3.Connection) -> Optional[int]:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return None
+            # execute() steps a statement without result columns once, which frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            # The file only shrinks when the WAL is copied back; PASSIVE never waits for readers
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        return self._run_on_writer(vacuum)
+
+    def close(self):
+        """Commit everything queued and close the connections"""
+        with self._id_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        # Last connection out checkpoints and removes the WAL, a read-only one could not
+        self._writer.close()
@@ -5,20 +5,41 @@ Main application that monitors PP2 host logs and detects rule violations using M
 
 import os
 import time
+import signal
 import yaml
+import asyncio
 import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List
 from dotenv import load_dotenv
 
-from log_parser import LogParser, ChatMessage, PlayerJoinEvent
+from log_parser import LogParser, ChatStreamParser, ChatMessage, PlayerJoinEvent
+from log_tailer import LogTailer, InotifyHub
+from checkpoint_store import Checkpoint, CheckpointStore
+from session_index import PlayerSessionIndex
+from bounded_cache import TimeWindowDeduplicator, SessionCache
 from ml_analyzer import MLAnalyzer
+from online_learner import OnlineLearner
+from training_jobs import TrainingJobManager, OnlineTrainingJobManager
+from training_store import open_store
 from action_handler import ActionHandler
+from task_scheduler import DelayedTaskScheduler
 from discord_bot import DiscordBot
 from database import Database
+from chat_archive import ChatArchive
+from retention import RetentionJob
 from logger import log
 
 
+def _safe_filename(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 class ServerMonitor:
     """Monitors a single PP2 server instance"""
     
@@ -29,9 +50,31 @@ class ServerMonitor:
         self.chatlog_path = server_config.get('chatlog_path')
         self.playlog_path = server_config.get('playlog_path')
         
-        self.processed_messages = set()
-        self.processed_players = set()
-        self.player_sessions = {}
+        monitor_conf = detector.config.get('monitor', {}) or {}
+        self.processed_messages = TimeWindowDeduplicator(
+            window_minutes=monitor_conf.get('dedup_window_minutes', 10)
+        )
+        if monitor_conf.get('resume_from_checkpoint', True):
+            # Lines after the last saved offset are read again after a restart,
+            # the window saved with that offset recognises the ones already handled
+            self.processed_messages.restore(detector.checkpoints.attach_state(
+                f"dedup|{self.name}|chat", self.processed_messages.snapshot
+            ))
+        self.player_sessions = SessionCache(
+            max_size=monitor_conf.get('session_cache_size', 5000),
+            ttl=monitor_conf.get('session_ttl_hours', 24) * 3600
+        )
+        self.session_index = PlayerSessionIndex(
+            self.playlog_path,
+            persist_path=os.path.join("data", "sessions", f"{_safe_filename(self.name)}.json"),
+            max_players=monitor_conf.get('session_index_size', 50000)
+        )
+        # Joins within welcome_delay are welcomed together after one roster download
+        self.welcome_delay = monitor_conf.get('welcome_delay', 1.0)
+        self._welcome_lock = threading.Lock()
+        self._pending_welcomes: List[tuple] = []  # (player name, due time)
+        self._tailers: List[LogTailer] = []
+        self._threads: List[threading.Thread] = []
         
         # Admin password discovery for this server
         self.admin_password = server_config.get('admin_password') or os.getenv('ADMIN_PASSWORD')
@@ -77,115 +120,116 @@ class ServerMonitor:
     def start(self):
         log.info(f"🚀 Käynnistetään valvonta palvelimelle: {self.name}")
         if self.chatlog_path:
-            threading.Thread(target=self.monitor_chatlog, daemon=True, name=f"ChatMon-{self.name}").start()
+            self._threads.append(threading.Thread(target=self.monitor_chatlog, daemon=True, name=f"ChatMon-{self.name}"))
         if self.playlog_path:
-            threading.Thread(target=self.monitor_playlog, daemon=True, name=f"PlayMon-{self.name}").start()
+            self._threads.append(threading.Thread(target=self.monitor_playlog, daemon=True, name=f"PlayMon-{self.name}"))
+        for thread in self._threads:
+            thread.start()
 
-    def tail_file(self, filepath: str, label: str, start_at_end: bool = True):
-        """Tail a file and yield new lines with heartbeat"""
-        if not os.path.exists(filepath):
-            log.error(f"🛑 Tiedostoa ei löydy ({self.name}): {filepath}")
-            return
-            
-        log.info(f"📖 Aloitetaan seuranta [{self.name}] ({label}): {filepath} (alusta: {not start_at_end})")
-        
-        pos = 0
-        if start_at_end:
-            pos = os.path.getsize(filepath)
-        
-        last_heartbeat = time.time()
-        
-        while True:
-            try:
-                if not os.path.exists(filepath):
-                     time.sleep(5)
-                     continue
-                     
-                current_size = os.path.getsize(filepath)
-                if current_size < pos:
-                    log.info(f"🔄 Tiedosto muuttunut merkittävästi [{self.name}] ({label}), resetoidaan indeksi.")
-                    pos = 0
+    def stop(self, timeout: float = 10.0):
+        """Stop tailing and wait until the lines already read have been processed"""
+        for tailer in self._tailers:
+            tailer.close()
+        for thread in self._threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                log.warning(f"⚠️ {thread.name} ei pysähtynyt {timeout:.0f} sekunnissa")
 
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        f.seek(pos)
-                        while True:
-                            line = f.readline()
-                            if line:
-                                yield line
-                                pos = f.tell()
-                                last_heartbeat = time.time()
-                            else:
-                                break
-                except UnicodeDecodeError:
-                    with open(filepath, 'r', encoding='cp1252', errors='replace') as f:
-                        f.seek(pos)
-                        while True:
-                            line = f.readline()
-                            if line:
-                                yield line
-                                pos = f.tell()
-                                last_heartbeat = time.time()
-                            else:
-                                break
-
-                # Heartbeat
-                current_size = os.path.getsize(filepath)
-                if time.time() - last_heartbeat > 120:
-                    log.debug(f"💓 Seuranta käynnissä [{self.name}] ({label}) - Pos: {pos}")
-                    last_heartbeat = time.time()
-                
-                time.sleep(1)
-                if os.path.exists(filepath) and os.path.getsize(filepath) != current_size:
-                    continue
-            except Exception as e:
-                log.error(f"❌ Virhe tiedoston {label} luvussa [{self.name}]: {e}")
-                time.sleep(5)
+    async def run_async(self, hub: Optional[InotifyHub], executor: Executor):
+        """Monitor both logs as coroutines on the running event loop"""
+        log.info(f"🚀 Käynnistetään valvonta palvelimelle: {self.name} (asyncio)")
+        coros = []
+        if self.chatlog_path:
+            coros.append(self.amonitor_chatlog(hub, executor))
+        if self.playlog_path:
+            coros.append(self.amonitor_playlog(hub, executor))
+        await asyncio.gather(*coros)
+
+    def _make_tailer(self, filepath: str, label: str, start_at_end: bool = True) -> LogTailer:
+        monitor_conf = self.detector.config.get('monitor', {}) or {}
+        tailer = LogTailer(
+            filepath, label, self.name,
+            start_at_end=start_at_end,
+            backend=monitor_conf.get('tail_backend', 'auto'),
+            poll_interval=monitor_conf.get('poll_interval', 1.0),
+            checkpoints=self.detector.checkpoints if monitor_conf.get('resume_from_checkpoint', True) else None
+        )
+        self._tailers.append(tailer)
+        return tailer
+
+    def tail_file(self, filepath: str, label: str, start_at_end: bool = True, yield_idle: bool = False):
+        """Tail a file and yield new lines (inotify when available, polling otherwise)"""
+        yield from self._make_tailer(filepath, label, start_at_end).lines(yield_idle)
+
+    def _process_chat_safely(self, message: ChatMessage):
+        try:
+            self.process_chat_message(message)
+        except Exception as e: log.error(f"❌ Virhe chat-monitorissa [{self.name}]: {e}")
+
+    def _finish_chat(self, stream: ChatStreamParser):
+        """On shutdown, handle the message still in the parser before the database closes"""
+        for message in stream.flush():
+            self._process_chat_safely(message)
 
     def monitor_chatlog(self):
         log.info(f"👀 Valvotaan chat-lokia [{self.name}]: {self.chatlog_path}")
-        pending_name_line = None
-        
-        for line in self.tail_file(self.chatlog_path, "chat", start_at_end=True):
-            line = line.strip('\r\n')
-            if not line: continue
-            
-            import re
-            name_time_match = re.search(r'^(.+?):\s+\[(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2})\]\s*$', line)
-            
-            if name_time_match:
-                pending_name_line = line
-                continue
-            
-            if pending_name_line:
-                full_entry = f"{pending_name_line}\n{line}"
-                message = self.detector.parser.parse_chat_message(full_entry, "")
-                if message:
-                    self.process_chat_message(message)
-                pending_name_line = None
+        stream = ChatStreamParser()
+        tailer = self._make_tailer(self.chatlog_path, "chat")
+        try:
+            for line in tailer.lines(yield_idle=True):
+                messages = stream.flush() if line is None else stream.feed(line, tailer.pos)
+                for message in messages:
+                    self._process_chat_safely(message)
+                # The saved offset stays at the header of a message that is not complete yet
+                tailer.hold(stream.pending_offset)
+        finally:
+            self._finish_chat(stream)
+
+    async def amonitor_chatlog(self, hub: Optional[InotifyHub], executor: Executor):
+        log.info(f"👀 Valvotaan chat-lokia [{self.name}]: {self.chatlog_path}")
+        loop = asyncio.get_running_loop()
+        stream = ChatStreamParser()
+        tailer = self._make_tailer(self.chatlog_path, "chat")
+        try:
+            async for line in tailer.alines(hub, yield_idle=True):
+                messages = stream.flush() if line is None else stream.feed(line, tailer.pos)
+                for message in messages:
+                    # ML, DB and HTTP are blocking, run them on the shared worker pool
+                    await loop.run_in_executor(executor, self._process_chat_safely, message)
+                tailer.hold(stream.pending_offset)
+        finally:
+            self._finish_chat(stream)
 
     def monitor_playlog(self):
         log.info(f"👀 Valvotaan pelaajalokia [{self.name}]: {self.playlog_path}")
-        for line in self.tail_file(self.playlog_path, "play", start_at_end=True):
+        self.session_index.load_or_build()
+        tailer = self._make_tailer(self.playlog_path, "play")
+        for line in tailer.lines():
             try:
                 je = self.detector.parser.parse_player_join(line)
-                if je: self.process_player_join(je)
+                if je: self.process_player_join(je, tailer.position())
+                elif self.detector.parser.parse_player_leave(line): self.process_player_leave()
+            except Exception as e: log.error(f"❌ Virhe pelaaja-monitorissa [{self.name}]: {e}")
+
+    async def amonitor_playlog(self, hub: Optional[InotifyHub], executor: Executor):
+        log.info(f"👀 Valvotaan pelaajalokia [{self.name}]: {self.playlog_path}")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self.session_index.load_or_build)
+        tailer = self._make_tailer(self.playlog_path, "play")
+        async for line in tailer.alines(hub):
+            try:
+                je = self.detector.parser.parse_player_join(line)
+                if je: await loop.run_in_executor(executor, self.process_player_join, je, tailer.position())
+                elif self.detector.parser.parse_player_leave(line): self.process_player_leave()
             except Exception as e: log.error(f"❌ Virhe pelaaja-monitorissa [{self.name}]: {e}")
 
     def _find_historical_session(self, player_name: str) -> Optional[dict]:
-        try:
-            with open(self.playlog_path, 'r', encoding='latin-1', errors='replace') as f:
-                for line in f:
-                    if player_name in line:
-                        je = self.detector.parser.parse_player_join(line)
-                        if je and je.player_name == player_name:
-                            return {'ip': je.ip_address, 'ban_command': je.ban_command, 'name_with_ids': je.name_with_ids}
-            return None
-        except Exception: return None
+        return self.session_index.get(player_name)
 
     def process_chat_message(self, message: ChatMessage):
-        msg_id = f"{message.timestamp}:{message.player_name}:{message.message}"
-        if msg_id in self.processed_messages: return
+        if self.processed_messages.seen(message.timestamp, message.player_name, message.message): return
+        if self.detector.archive:
+            self.detector.archive.append_message(self.name, message)
 
         player_ip = None
         ban_command = None
@@ -203,10 +247,8 @@ class ServerMonitor:
 
         ignored_senders = ["Server", "ADMIN", "system"]
         if message.player_name in ignored_senders or not message.player_name.strip():
-            self.processed_messages.add(msg_id)
             return
 
-        self.processed_messages.add(msg_id)
         log.info(f"📨 [{self.name}] Viesti ({message.player_name}): {message.message[:100]}")
         
         if message.message.strip().startswith("!yllapitaja"):
@@ -232,7 +274,8 @@ class ServerMonitor:
                 timestamp=message.timestamp, player_name=message.player_name,
                 violation_type="message", content=message.message,
                 level=analysis.level, reason=analysis.reason,
-                suggested_action=analysis.suggested_action, ip_address=player_ip
+                suggested_action=analysis.suggested_action, ip_address=player_ip,
+                server_name=self.name
             )
             self.detector.action_handler.handle_violation(
                 self.name, self.server_config,
@@ -240,13 +283,19 @@ class ServerMonitor:
                 player_ip, ban_command, name_with_ids
             )
 
-    def process_player_join(self, join_event: PlayerJoinEvent):
-        self.player_sessions[join_event.player_name] = {
-            'ip': join_event.ip_address, 'ban_command': join_event.ban_command,
-            'name_with_ids': join_event.name_with_ids
-        }
+    def process_player_leave(self):
+        # Slot indexes shift when players leave, the cached player list is stale
+        self.detector.action_handler.invalidate_roster(self.server_config)
+
+    def process_player_join(self, join_event: PlayerJoinEvent, position: Optional[Checkpoint] = None):
+        if not self.session_index.record(join_event, position):
+            log.debug(f"ℹ️ [{self.name}] Liittyminen käsiteltiin jo ennen uudelleenkäynnistystä: {join_event.player_name}")
+            return
+        self.player_sessions[join_event.player_name] = PlayerSessionIndex.session_from_event(join_event)
+        self.detector.action_handler.invalidate_roster(self.server_config)
+        if self.detector.archive:
+            self.detector.archive.append_join(self.name, join_event)
 
-        
         log.info(f"👤 [{self.name}] Liittyi: {join_event.player_name} ({join_event.ip_address})")
         analysis = self.detector.analyzer.analyze_nickname(join_event.player_name)
         if analysis.level != "OK":
@@ -255,7 +304,8 @@ class ServerMonitor:
                 timestamp=join_event.timestamp, player_name=join_event.player_name,
                 violation_type="nickname", content=join_event.player_name,
                 level=analysis.level, reason=analysis.reason,
-                suggested_action=analysis.suggested_action, ip_address=join_event.ip_address
+                suggested_action=analysis.suggested_action, ip_address=join_event.ip_address,
+                server_name=self.name
             )
             self.detector.action_handler.handle_violation(
                 self.name, self.server_config,
@@ -263,19 +313,34 @@ class ServerMonitor:
                 join_event.ip_address, join_event.ban_command, join_event.name_with_ids
             )
         
-        # Welcome message regardless of violation (since actions are manual)
-        try:
-            # Give server a moment to register the player fully
-            time.sleep(1)
-            live_index = self.detector.action_handler.get_live_player_index(join_event.player_name, self.server_config)
-            if live_index:
-                welcome_msg = f"/{live_index} Tervetuloa {join_event.player_name}! Valvon tätä palvelinta. Käytä !yllapitaja komentoa jos tarvitset apua."
-                log.info(f"👋 Lähetetään tervetuloviesti pelaajalle {join_event.player_name} (ID: {live_index})")
-                threading.Thread(target=self.detector.action_handler.execute_command, args=(welcome_msg, self.server_config)).start()
-            else:
-                log.warning(f"⚠️ Ei voitu lähettää tervetuloviestiä: Pelaajan ID ei löytynyt ({join_event.player_name})")
-        except Exception as e:
-            log.error(f"❌ Virhe tervetuloviestin lähetyksessä: {e}")
+        # Welcome message regardless of violation (since actions are manual).
+        # Sent from the scheduler once the server has registered the player fully.
+        with self._welcome_lock:
+            self._pending_welcomes.append((join_event.player_name, time.monotonic() + self.welcome_delay))
+        self.detector.scheduler.schedule(self.welcome_delay, self._send_welcomes, key=("welcome", self.name))
+
+    def _send_welcomes(self):
+        # Players due within a quarter of the delay ride along, later ones get their own flush
+        cutoff = time.monotonic() + self.welcome_delay / 4
+        with self._welcome_lock:
+            players = [name for name, due in self._pending_welcomes if due <= cutoff]
+            self._pending_welcomes = [(name, due) for name, due in self._pending_welcomes if due > cutoff]
+            next_due = self._pending_welcomes[0][1] if self._pending_welcomes else None
+        if next_due is not None:
+            self.detector.scheduler.schedule(next_due - time.monotonic(), self._send_welcomes, key=("welcome", self.name))
+        handler = self.detector.action_handler
+        for player_name in players:
+            try:
+                # The first lookup downloads the roster, the rest of the batch uses the cached one
+                live_index = handler.get_live_player_index(player_name, self.server_config)
+                if live_index:
+                    welcome_msg = f"/{live_index} Tervetuloa {player_name}! Valvon tätä palvelinta. Käytä !yllapitaja komentoa jos tarvitset apua."
+                    log.info(f"👋 Lähetetään tervetuloviesti pelaajalle {player_name} (ID: {live_index})")
+                    self.detector.scheduler.schedule(0, handler.execute_command, welcome_msg, self.server_config)
+                else:
+                    log.warning(f"⚠️ Ei voitu lähettää tervetuloviestiä: Pelaajan ID ei löytynyt ({player_name})")
+            except Exception as e:
+                log.error(f"❌ Virhe tervetuloviestin lähetyksessä: {e}")
 
 
 class PP2Detector:
@@ -291,7 +356,48 @@ class PP2Detector:
 
         self.parser = LogParser()
         model_path = os.getenv('ML_MODEL_PATH') or self.config['ml'].get('model_path', 'models/violation_model.joblib')
-        self.analyzer = MLAnalyzer(model_path=model_path)
+        online_conf = self.config['ml'].get('online', {}) or {}
+        online_enabled = online_conf.get('enabled', False)
+        self.analyzer = MLAnalyzer(
+            model_path=model_path,
+            batch_size=self.config['ml'].get('batch_size', 64),
+            batch_wait_ms=self.config['ml'].get('batch_wait_ms', 2.0),
+            cache_size=self.config['ml'].get('cache_size', 10000),
+            engine=self.config['ml'].get('engine', 'sklearn'),
+            # In online mode the learner owns the live model
+            reload_interval=0.0 if online_enabled else self.config['ml'].get('reload_interval', 5.0)
+        )
+        info = self.analyzer.model_info()
+        log.info(f"🧠 ML-malli: versio {info['version'] or 'tuntematon'} ({info['engine']}, ladattu {info['load_ms']:.0f} ms)")
+        
+        Path("data").mkdir(exist_ok=True)
+        # Labelled corpus, the old data/training_data.csv is imported on first start
+        self.training_store = open_store("data/training.db")
+        training_conf = self.config['ml'].get('training', {}) or {}
+        
+        self.online_learner = None
+        if online_enabled:
+            self.online_learner = OnlineLearner(
+                self.analyzer,
+                store_path="data/training.db",
+                state_path=online_conf.get('state_path', 'models/online_model.joblib'),
+                update_interval=online_conf.get('update_interval', 5.0),
+                full_retrain_hours=online_conf.get('full_retrain_hours', 24),
+                new_sample_weight=online_conf.get('new_sample_weight', 5.0)
+            )
+            # The online model is the live one, !train retrains it instead of the TF-IDF model
+            self.training_jobs = OnlineTrainingJobManager(
+                self.online_learner,
+                min_accuracy=training_conf.get('min_accuracy', 0.95),
+                max_queued=training_conf.get('max_queued', 1)
+            )
+        else:
+            self.training_jobs = TrainingJobManager(
+                store_path="data/training.db",
+                model_path=model_path,
+                min_accuracy=training_conf.get('min_accuracy', 0.95),
+                max_queued=training_conf.get('max_queued', 1)
+            )
         
         self.discord_bot = None
         bot_token = os.getenv("DISCORD_BOT_TOKEN")
@@ -313,6 +419,8 @@ class PP2Detector:
         # Action Handler (global)
         # We don't pass specific admin creds here anymore effectively, 
         # or we pass defaults. But execute_command will require server_config now.
+        http_conf = self.config.get('http', {}) or {}
+        monitor_conf = self.config.get('monitor', {}) or {}
         self.action_handler = ActionHandler(
             discord_webhook_url=os.getenv('DISCORD_WEBHOOK_URL'),
             discord_enabled=self.config['discord']['enabled'],
@@ -320,7 +428,16 @@ class PP2Detector:
             pp2_admin_url=None, 
             pp2_admin_user="admin",
             pp2_admin_password=None,
-            discord_bot=self.discord_bot
+            discord_bot=self.discord_bot,
+            online_learner=self.online_learner,
+            training_store=self.training_store,
+            http_pool_size=http_conf.get('pool_size', 4),
+            http_retries=http_conf.get('retries', 3),
+            http_backoff=http_conf.get('backoff', 0.25),
+            roster_refresh_interval=monitor_conf.get('roster_refresh_interval', 30.0),
+            webhook_queue_size=http_conf.get('webhook_queue_size', 1000),
+            webhook_max_retries=http_conf.get('webhook_max_retries', 5),
+            webhook_max_rate_limit_wait=http_conf.get('webhook_max_rate_limit_wait', 60.0)
         )
         
         self.config_path = config_path
@@ -328,10 +445,44 @@ class PP2Detector:
         if self.discord_bot:
             self.discord_bot.set_command_callback(self._handle_bot_command)
             self.discord_bot.set_config_callback(self._handle_config_update)
+            self.discord_bot.set_training_manager(self.training_jobs)
+            # The online learner swaps its model in itself, only report it
+            self.discord_bot.set_model_reload_callback(
+                self.analyzer.model_info if self.online_learner else self.analyzer.reload_now
+            )
             # Pass full server list to bot if needed, or bot calls back to us
         
-        Path("data").mkdir(exist_ok=True)
-        self.db = Database("data/violations.db")
+        db_conf = self.config.get('database', {}) or {}
+        self.db = Database(
+            "data/violations.db",
+            batch_size=db_conf.get('batch_size', 200),
+            flush_ms=db_conf.get('flush_ms', 50),
+            read_connections=db_conf.get('read_connections', 2)
+        )
+        if self.discord_bot:
+            self.discord_bot.set_search_callback(self.db.search)
+        # Rows older than keep_days move to monthly .jsonl.gz files (0 = keep everything)
+        retention_conf = self.config.get('retention', {}) or {}
+        self.retention = None
+        if retention_conf.get('keep_days', 0) > 0:
+            self.retention = RetentionJob(
+                self.db,
+                keep_days=retention_conf['keep_days'],
+                archive_dir=retention_conf.get('archive_path', "data/violations_archive"),
+                interval=retention_conf.get('interval_hours', 6) * 3600,
+                chunk_size=retention_conf.get('chunk_size', 500)
+            )
+            self.retention.start()
+        # Full chat and join history for replay and retraining (python chat_archive.py)
+        archive_conf = self.config.get('archive', {}) or {}
+        self.archive = ChatArchive(
+            archive_conf.get('path', "data/archive"),
+            frame_records=archive_conf.get('frame_records', 1000),
+            flush_interval=archive_conf.get('flush_interval', 10.0)
+        ) if archive_conf.get('enabled', True) else None
+        # Delayed admin commands (welcome messages) of every server
+        self.scheduler = DelayedTaskScheduler(workers=monitor_conf.get('welcome_workers', 2), name="Welcome")
+        self.checkpoints = CheckpointStore("data/checkpoints.json")
         
         self.monitors: List[ServerMonitor] = []
         for server_conf in self.config['servers']:
@@ -414,6 +565,20 @@ class PP2Detector:
         return False
 
     def run(self):
+        # docker stop / systemd send SIGTERM, save the offsets and state as on Ctrl+C
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        if self.online_learner:
+            self.online_learner.start()
+        mode = (self.config.get('monitor', {}) or {}).get('mode', 'threads')
+        if mode == 'asyncio':
+            try:
+                asyncio.run(self.run_async())
+            except KeyboardInterrupt:
+                log.info("👋 Lopetetaan...")
+            finally:
+                self._save_state()
+            return
+
         log.info("🚀 Käynnistetään PP2 Suspicious Detector (Multi-Server)...")
         if self.discord_bot: self.discord_bot.start_in_thread()
         
@@ -422,7 +587,64 @@ class PP2Detector:
         
         try:
             while True: time.sleep(1)
-        except KeyboardInterrupt: log.info("👋 Lopetetaan...")
+        except KeyboardInterrupt:
+            log.info("👋 Lopetetaan...")
+        finally:
+            self._save_state()
+
+    def _save_state(self):
+        # Monitors first: what they have read reaches the database before the offsets are saved
+        for monitor in self.monitors:
+            monitor.stop()
+        self.scheduler.close()
+        self.training_jobs.close()
+        self.action_handler.close()
+        if self.retention:
+            self.retention.close()
+        self.db.close()
+        if self.archive:
+            self.archive.close()
+        self.checkpoints.flush(force=True)
+        if self.online_learner:
+            self.online_learner.save()
+        for monitor in self.monitors:
+            monitor.session_index.save()
+
+    async def run_async(self):
+        """
+        Run every monitor and the Discord bot on a single event loop.
+        Blocking work (ML, database, admin/webhook HTTP) goes to one bounded
+        worker pool, so the thread count does not grow with the number of servers.
+        """
+        log.info("🚀 Käynnistetään PP2 Suspicious Detector (Multi-Server, asyncio)...")
+        monitor_conf = self.config.get('monitor', {}) or {}
+        loop = asyncio.get_running_loop()
+
+        executor = ThreadPoolExecutor(
+            max_workers=monitor_conf.get('async_workers', 4),
+            thread_name_prefix="DetectorWorker"
+        )
+        # Bot commands use run_in_executor(None, ...) / to_thread, keep them on the same pool
+        loop.set_default_executor(executor)
+
+        hub = None
+        if monitor_conf.get('tail_backend', 'auto') != 'poll':
+            try:
+                hub = InotifyHub(loop)
+            except OSError as e:
+                log.warning(f"⚠️ inotify ei käytettävissä: {e}. Käytetään pollausta.")
+
+        tasks = []
+        if self.discord_bot:
+            tasks.append(self.discord_bot.start_async())
+        for monitor in self.monitors:
+            tasks.append(monitor.run_async(hub, executor))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if hub:
+                hub.close()
 
 def main():
     PP2Detector().run()
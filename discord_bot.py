@@ -3,12 +3,60 @@ import os
 from discord.ext import commands
 from discord import ui
 import asyncio
+import re
 import threading
-import subprocess
-import sys
+import time
 import yaml
+from datetime import datetime
 from typing import Optional, Callable, Dict, Any
 from logger import log
+from training_jobs import TrainingBusyError
+from database import fts_query
+
+SEARCH_PAGE_SIZE = 5
+SEARCH_OPTION = re.compile(r'(\w+):(?:"([^"]*)"|(\S+))')
+SEARCH_KEYS = {
+    "pelaaja": "player_name", "player": "player_name",
+    "palvelin": "server_name", "server": "server_name",
+    "päivät": "days", "days": "days",
+    "sivu": "page", "page": "page",
+}
+
+
+def parse_search_args(args: str) -> Dict[str, Any]:
+    """
+    Split "!search" arguments into the search text and filters:
+    pelaaja:Nimi, palvelin:"Main Server", päivät:7, sivu:2
+
+    Returns:
+        Keyword arguments for Database.search plus `page` (1-based)
+
+    Raises:
+        ValueError: With a message for the user if a filter value is invalid
+            or the text has no searchable words
+    """
+    options: Dict[str, Any] = {"page": 1}
+
+    def take(match):
+        key = SEARCH_KEYS.get(match.group(1).lower())
+        if key is None:
+            return match.group(0)  # "klo:12" etc. is part of the search text
+        value = match.group(2) if match.group(2) is not None else match.group(3)
+        if key in ("days", "page"):
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"{match.group(1)} pitää olla positiivinen kokonaisluku")
+            options[key] = int(value)
+        else:
+            options[key] = value
+        return ""
+
+    options["text"] = " ".join(SEARCH_OPTION.sub(take, args).split())
+    if options["text"] and fts_query(options["text"]) is None:
+        raise ValueError(f"Haussa `{options['text']}` ei ole haettavia sanoja (pelkkiä välimerkkejä tai symboleita)")
+    days = options.pop("days", None)
+    if days:
+        options["since"] = int(time.time()) - days * 86400
+    return options
 
 class SeveritySelect(ui.Select):
     """Dropdown menu for selecting violation severity"""
@@ -124,6 +172,9 @@ class DiscordBot:
         self.channel_id = int(channel_id) if channel_id else None
         self.cmd_callback = None # Set later
         self.config_callback = None  # Callback for config updates
+        self.model_reload_callback = None  # Loads the newest model after !train
+        self.training_manager = None  # Runs !train jobs
+        self.search_callback = None  # Database.search for !search
         
         # We need message_content to read !c commands
         # If this fails, recommend the user to enable it in the portal
@@ -177,35 +228,33 @@ class DiscordBot:
         @self.bot.command(name="train")
         async def train_ml_model(ctx):
             """Käynnistä ML-mallin opetus"""
-            status_msg = await ctx.send("🏃 Opetetaan mallia... Tämä voi kestää hetken.")
+            if not self.training_manager:
+                await ctx.send("❌ Mallin opetus ei ole käytössä.")
+                return
             
+            async def report(line: str):
+                await ctx.send(f"📈 {line}")
+            
+            status_msg = await ctx.send("🏃 Opetetaan mallia... Edistyminen näkyy tällä kanavalla.")
             try:
-                # Run the training script via subprocess
-                # We use the current python interpreter to stay in the same environment
-                process = await asyncio.create_subprocess_exec(
-                    sys.executable, "train_model.py",
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate()
-                
-                output = ""
-                if stdout:
-                    output += f"**Output:**\n```\n{stdout.decode('utf-8', errors='replace')}\n```\n"
-                if stderr:
-                    output += f"**Errors:**\n```\n{stderr.decode('utf-8', errors='replace')}\n```"
-                
-                if not output:
-                    output = "✅ Opetus valmis (ei tulostetta)."
+                result = await self.training_manager.train(str(ctx.author), report)
+                if result is None:
+                    await ctx.send("❌ Opetusdataa ei löytynyt.")
+                    return
+                if not result['published']:
+                    await ctx.send(f"⚠️ Uutta mallia ei otettu käyttöön: tarkkuus {result['accuracy']:.4f} "
+                                   f"on alle rajan {self.training_manager.min_accuracy:.4f}.")
+                    return
                 
-                # Split output if it's too long for Discord (max 2000 chars)
-                if len(output) > 1950:
-                    for i in range(0, len(output), 1950):
-                        await ctx.send(output[i:i+1950])
-                else:
-                    await ctx.send(output)
-                    
+                output = f"✅ Opetus valmis: versio **{result['version']}**, tarkkuus {result['accuracy']:.4f}"
+                if self.model_reload_callback:
+                    loop = asyncio.get_event_loop()
+                    info = await loop.run_in_executor(None, self.model_reload_callback)
+                    output += (f"\n🔄 Käytössä mallin versio **{info.get('version') or 'tuntematon'}** "
+                               f"({info.get('engine')}, ladattu {info.get('load_ms', 0):.0f} ms)")
+                await ctx.send(output)
+            except TrainingBusyError as e:
+                await ctx.send(f"⛔ {e}")
             except Exception as e:
                 await ctx.send(f"❌ Virhe opetuksen aikana: {str(e)}")
             finally:
@@ -249,6 +298,50 @@ class DiscordBot:
             except Exception as e:
                 await ctx.send(f"❌ Virhe: {str(e)}")
 
+        @self.bot.command(name="search")
+        async def search_violations(ctx, *, args: str = ""):
+            """Hae rikkomuksista: !search <sanat tai "fraasi"> [pelaaja:Nimi] [palvelin:Nimi] [päivät:7] [sivu:2]"""
+            if not self.search_callback:
+                await ctx.send("❌ Haku ei ole käytössä.")
+                return
+            try:
+                options = parse_search_args(args)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+            if not options["text"]:
+                await ctx.send('❌ Käyttö: `!search <sanat tai "fraasi"> [pelaaja:Nimi] [palvelin:Nimi] [päivät:7] [sivu:2]`')
+                return
+
+            page = options.pop("page")
+            try:
+                # One extra row tells whether there is a next page
+                results = await asyncio.to_thread(
+                    self.search_callback, **options,
+                    limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE
+                )
+            except Exception as e:
+                log.error(f"❌ Virhe !search komennossa: {e}")
+                await ctx.send(f"❌ Virhe haussa: {str(e)}")
+                return
+
+            if not results:
+                await ctx.send(f"🔍 Ei osumia haulle: `{options['text']}`" + (f" (sivu {page})" if page > 1 else ""))
+                return
+
+            lines = [f"🔍 **Haku:** `{options['text']}` — sivu {page}"]
+            for n, row in enumerate(results[:SEARCH_PAGE_SIZE], start=(page - 1) * SEARCH_PAGE_SIZE + 1):
+                when = datetime.fromtimestamp(row['event_time']).strftime("%d.%m.%Y %H:%M") if row.get('event_time') else row['timestamp']
+                server = f"{row['server_name']} / " if row.get('server_name') else ""
+                lines.append(f"**{n}.** `{when}` {server}**{row['player_name']}** ({row['level']}): {row['snippet']}")
+            if len(results) > SEARCH_PAGE_SIZE:
+                lines.append(f"➡️ Lisää tuloksia: `!search {args.strip()} sivu:{page + 1}`" if "sivu:" not in args
+                             else f"➡️ Lisää tuloksia sivulla {page + 1}")
+            output = "\n".join(lines)
+            if len(output) > 1900:
+                output = output[:1900] + "... (katkaistu)"
+            await ctx.send(output)
+
         @self.bot.command(name="unban")
         async def unban_player(ctx):
             """Poista banni pelaajalta: !unban"""
@@ -270,6 +363,10 @@ class DiscordBot:
                 log.error(f"❌ Virhe !unban komennossa: {e}")
                 await ctx.send(f"❌ Virhe: {str(e)}")
 
+    def set_search_callback(self, callback: Callable[..., list]):
+        """Set the function !search queries (Database.search)"""
+        self.search_callback = callback
+
     def set_command_callback(self, callback: Callable[[str], None]):
         """Set the function to call when a PP2 command needs to be executed"""
         self.cmd_callback = callback
@@ -278,6 +375,14 @@ class DiscordBot:
         """Set the function to call when config needs to be read or updated"""
         self.config_callback = callback
 
+    def set_training_manager(self, manager):
+        """Set the TrainingJobManager used by !train"""
+        self.training_manager = manager
+
+    def set_model_reload_callback(self, callback: Callable[[], Dict[str, Any]]):
+        """Set the function that swaps in a newly trained model and returns its info"""
+        self.model_reload_callback = callback
+
     async def send_interaction(self, embed_data: Dict[str, Any], callback_confirm: Callable, callback_reject: Callable):
         """Send a message with interactive buttons"""
         if not self.is_ready:
@@ -311,21 +416,25 @@ class DiscordBot:
         view = ModerationView(callback_confirm, callback_reject, initial_severity=initial_severity)
         await channel.send(embed=embed, view=view)
 
+    async def start_async(self):
+        """Run the bot on the current event loop (asyncio monitoring mode)"""
+        try:
+            await self.bot.start(self.token)
+        except discord.errors.PrivilegedIntentsRequired:
+            log.error("❌ VIRHE: Discord-botti vaatii 'Message Content Intent' -oikeuden.")
+            log.error("1. Mene osoitteeseen: https://discord.com/developers/applications/")
+            log.error("2. Valitse sovelluksesi -> Bot")
+            log.error("3. Ota käyttöön: 'Message Content Intent'")
+            log.error("4. Tallenna muutokset ja käynnistä detector uudelleen.")
+        except Exception as e:
+            log.error(f"❌ Odottamaton virhe Discord-botin käynnistyksessä: {e}")
+
     def start_in_thread(self):
         """Run the bot in a background thread"""
         def run():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(self.bot.start(self.token))
-            except discord.errors.PrivilegedIntentsRequired:
-                log.error("❌ VIRHE: Discord-botti vaatii 'Message Content Intent' -oikeuden.")
-                log.error("1. Mene osoitteeseen: https://discord.com/developers/applications/")
-                log.error("2. Valitse sovelluksesi -> Bot")
-                log.error("3. Ota käyttöön: 'Message Content Intent'")
-                log.error("4. Tallenna muutokset ja käynnistä detector uudelleen.")
-            except Exception as e:
-                log.error(f"❌ Odottamaton virhe Discord-botin käynnistyksessä: {e}")
+            loop.run_until_complete(self.start_async())
         
         thread = threading.Thread(target=run, daemon=True)
         thread.start()
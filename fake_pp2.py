@@ -0,0 +1,161 @@
+"""
+Fake PP2 server
+Local HTTP stand-in for PP2 Admin.html pages and the Discord webhook, used by
+the load test and benchmarks instead of a real pp2host.
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakePP2Server:
+    """
+    Stand-in for PP2 Admin.html pages and the Discord webhook on 127.0.0.1
+
+    Admin pages are served at /<server>/Admin.html: GET lists the players the
+    harness has added as "[slot] Name" lines, POST (c=<command>) records the
+    command and answers like PP2 does. /webhook records Discord payloads and
+    can enforce a Discord-style rate limit (X-RateLimit-* headers, 429 with
+    retry_after).
+    """
+
+    def __init__(self, slots: int = 64, rtt: float = 0.0, webhook_limit: int = 0, webhook_window: float = 2.0):
+        """
+        Args:
+            slots: Player slots per server
+            rtt: Simulated network round trip (s), paid once per request and
+                once more for every new TCP connection (the handshake)
+            webhook_limit: Webhook posts allowed per window (0 = unlimited)
+            webhook_window: Rate limit window (s)
+        """
+        self.slots = slots
+        self.rtt = rtt
+        self.webhook_limit = webhook_limit
+        self.webhook_window = webhook_window
+        self.webhook_responses = []  # status codes to answer the next webhook posts with
+        self.rate_limited = 0
+        self._bucket_reset = 0.0
+        self._bucket_used = 0
+        self.lock = threading.Lock()
+        self.rosters = {}        # server -> list of names, index = slot
+        self.commands = []       # (received_at, server, command)
+        self.webhooks = []       # (received_at, payload)
+        self.requests = 0
+        self.connections = 0
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive when the client wants it
+            # Headers and body go out in separate writes, don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+                if fake.rtt:
+                    time.sleep(fake.rtt)
+
+            def handle_one_request(self):
+                if fake.rtt:
+                    time.sleep(fake.rtt)
+                super().handle_one_request()
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: str = "", content_type: str = "text/html", headers: dict = None):
+                data = body.encode("cp1252", errors="replace")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests += 1
+                    players = list(fake.rosters.get(self.path.strip("/").split("/")[0], []))
+                rows = "\n".join(f"[{slot}] {name} (0 kills)" for slot, name in enumerate(players) if name)
+                self._reply(200, f"<html><body><pre>Players:\n{rows}\n</pre>"
+                                 f"<form method=post><input name=c></form></body></html>")
+
+            def _webhook(self, received_at: float, body: bytes):
+                headers = {}
+                with fake.lock:
+                    status = fake.webhook_responses.pop(0) if fake.webhook_responses else 204
+                    if fake.webhook_limit:
+                        now = time.monotonic()
+                        if now >= fake._bucket_reset:
+                            fake._bucket_reset = now + fake.webhook_window
+                            fake._bucket_used = 0
+                        reset_after = fake._bucket_reset - now
+                        if fake._bucket_used >= fake.webhook_limit:
+                            status = 429
+                        elif status < 400:
+                            fake._bucket_used += 1
+                        headers = {
+                            "X-RateLimit-Limit": str(fake.webhook_limit),
+                            "X-RateLimit-Remaining": str(fake.webhook_limit - fake._bucket_used),
+                            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+                        }
+                    if status == 429:
+                        fake.rate_limited += 1
+                    elif status < 400:
+                        fake.webhooks.append((received_at, json.loads(body)))
+                if status == 429:
+                    retry_after = float(headers.get("X-RateLimit-Reset-After", 0.05))
+                    self._reply(429, json.dumps({"message": "You are being rate limited.",
+                                                 "retry_after": retry_after, "global": False}),
+                                "application/json", headers)
+                else:
+                    self._reply(status, headers=headers)
+
+            def do_POST(self):
+                received_at = time.time()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake.lock:
+                    fake.requests += 1
+                if self.path == "/webhook":
+                    self._webhook(received_at, body)
+                    return
+                form = urllib.parse.parse_qs(body.decode("ascii"), encoding="cp1252")
+                command = form.get("c", [""])[0]
+                with fake.lock:
+                    fake.commands.append((received_at, self.path.strip("/").split("/")[0], command))
+                self._reply(200, f"<html><textarea name=out>Command executed.\n{command}</textarea></html>")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="FakePP2")
+
+    def admin_url(self, server: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{server}/Admin.html"
+
+    @property
+    def webhook_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/webhook"
+
+    def add_player(self, server: str, name: str):
+        """Put a player on the roster, a full server gives away an occupied slot"""
+        with self.lock:
+            roster = self.rosters.setdefault(server, [])
+            if len(roster) < self.slots:
+                roster.append(name)
+            else:
+                roster[hash(name) % self.slots] = name
+
+    def start(self) -> "FakePP2Server":
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
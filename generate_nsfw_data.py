@@ -1,103 +1,86 @@
 # VAROITUS, TÄMÄ SISÄLTÖ ON OPETUSDATAA!!!
 # TÄMÄN EI OLE TARKOITUS LOUKATA KETÄÄN
 
-import pandas as pd
+import argparse
 import random
-import os
+from generate_training_data import generate_to_store
 
-def generate_nsfw_dataset():
+# Vocabulary for Finnish NSFW/Suggestive content
+body_parts = ["pillu", "kulli", "muna", "perse", "tissi", "pylly", "vittu", "kivekset", "peräreikä", "sääriväli"]
+verbs = ["panna", "naida", "runkkaa", "imeä", "nuolla", "kiksauttaa", "hoidella", "nussia", "kyykkiä"]
+adjectives = ["märkä", "iso", "tiukka", "karvainen", "kiimanen", "huorallinen", "limainen", "kuuma"]
+nouns = ["huora", "lutka", "portto", "runkkari", "nussija", "munanimejä", "pillunpäre", "siitinsankari"]
+
+templates = [
+    "haista {v}",
+    "ime mun {b}",
+    "ootko {adj} {n}",
+    "haluisitko {v} mun {b}?",
+    "{adj} {b} täällä tarjolla",
+    "mun {b} on niin {adj}",
+    "painu {v} sen {b}n kanssa",
+    "vitun {n}",
+    "saatanan {adj} {n}",
+    "kuka haluaa {v}?",
+    "mennään {v} johonkin",
+    "näytä sun {b}",
+    "saako sun {b}a {v}?",
+    "vittu kun tekee mieli {v}",
+    "ootko koskaan {v}massa?"
+]
+
+
+def generate_nsfw_messages(count=2500, rng=random):
     data = []
-    
-    # Vocabulary for Finnish NSFW/Suggestive content
-    body_parts = ["pillu", "kulli", "muna", "perse", "tissi", "pylly", "vittu", "kivekset", "peräreikä", "sääriväli"]
-    verbs = ["panna", "naida", "runkkaa", "imeä", "nuolla", "kiksauttaa", "hoidella", "nussia", "kyykkiä"]
-    adjectives = ["märkä", "iso", "tiukka", "karvainen", "kiimanen", "huorallinen", "limainen", "kuuma"]
-    nouns = ["huora", "lutka", "portto", "runkkari", "nussija", "munanimejä", "pillunpäre", "siitinsankari"]
-    
-    templates = [
-        "haista {v}",
-        "ime mun {b}",
-        "ootko {adj} {n}",
-        "haluisitko {v} mun {b}?",
-        "{adj} {b} täällä tarjolla",
-        "mun {b} on niin {adj}",
-        "painu {v} sen {b}n kanssa",
-        "vitun {n}",
-        "saatanan {adj} {n}",
-        "kuka haluaa {v}?",
-        "mennään {v} johonkin",
-        "näytä sun {b}",
-        "saako sun {b}a {v}?",
-        "vittu kun tekee mieli {v}",
-        "ootko koskaan {v}massa?"
-    ]
+    for _ in range(count):
+        t = rng.choice(templates)
+        b = rng.choice(body_parts)
+        v = rng.choice(verbs)
+        adj = rng.choice(adjectives)
+        n = rng.choice(nouns)
 
-    # Generate messages
-    for _ in range(2500):
-        t = random.choice(templates)
-        b = random.choice(body_parts)
-        v = random.choice(verbs)
-        adj = random.choice(adjectives)
-        n = random.choice(nouns)
-        
         msg = t.format(b=b, v=v, adj=adj, n=n)
-        
+
         # Randomly apply some variation (leetspeak/typos)
-        if random.random() < 0.1:
+        if rng.random() < 0.1:
             msg = msg.replace('u', 'v').replace('i', '1').replace('a', '4')
-            
-        # Sanitize: remove commas
-        msg = msg.replace(",", "")
-        data.append({"text": msg, "label": "SEVERE"})
 
-    # Generate nicknames
-    for _ in range(1500):
-        b = random.choice(body_parts)
-        adj = random.choice(adjectives)
-        n = random.choice(nouns)
-        
+        data.append((msg, "SEVERE"))
+    return data
+
+def generate_nsfw_nicks(count=1500, rng=random):
+    data = []
+    for _ in range(count):
+        b = rng.choice(body_parts)
+        adj = rng.choice(adjectives)
+        n = rng.choice(nouns)
+
         # Nickname formats
         nick_types = [
             f"{adj}_{b}",
             f"{b}_{n}",
             f"{adj}{n}",
-            f"{n}{random.randint(69, 99)}",
+            f"{n}{rng.randint(69, 99)}",
             f"Iso_{b}",
             f"{b}Master",
             f"Hot_{adj}_{b}",
             f"{n}_Official"
         ]
-        
-        nick = random.choice(nick_types)
-        data.append({"text": nick.replace(",", ""), "label": "SEVERE"})
-
-    new_df = pd.DataFrame(data)
-    data_file = "data/training_data.csv"
-
-    if os.path.exists(data_file):
-        try:
-            existing_df = pd.read_csv(data_file, on_bad_lines='skip')
-            # Merge new data with existing
-            df = pd.concat([existing_df, new_df], ignore_index=True)
-            print(f"Merged {len(new_df)} new samples with {len(existing_df)} existing samples.")
-        except Exception as e:
-            print(f"⚠️ Warning: Could not read existing training data: {e}")
-            df = new_df
-    else:
-        df = new_df
 
-    # Remove duplicates - this is CRITICAL to fix previous exponential growth
-    initial_count = len(df)
-    df = df.drop_duplicates(subset=['text', 'label'])
-    removed = initial_count - len(df)
-    if removed > 0:
-        print(f"🗑️ Removed {removed} duplicate rows.")
+        data.append((rng.choice(nick_types), "SEVERE"))
+    return data
 
-    df = df.sample(frac=1).reset_index(drop=True)
-    
-    os.makedirs("data", exist_ok=True)
-    df.to_csv(data_file, index=False)
-    print(f"Generated expanded dataset. Total samples: {len(df)} saved to {data_file}")
+def generate_nsfw_dataset(messages=2500, nicks=1500, seed=42, workers=None, store_path="data/training.db"):
+    plan = [(generate_nsfw_messages, messages), (generate_nsfw_nicks, nicks)]
+    generated, added = generate_to_store(plan, store_path, seed=seed, workers=workers)
+    print(f"Generated {generated} NSFW samples, {added} new distinct samples added to {store_path}.")
 
 if __name__ == "__main__":
-    generate_nsfw_dataset()
+    parser = argparse.ArgumentParser(description="Generate NSFW training data into the training store")
+    parser.add_argument("--messages", type=int, default=2500)
+    parser.add_argument("--nicks", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--store", default="data/training.db")
+    args = parser.parse_args()
+    generate_nsfw_dataset(args.messages, args.nicks, args.seed, args.workers, args.store)
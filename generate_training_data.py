@@ -1,70 +1,80 @@
-import pandas as pd
+import argparse
+import itertools
 import random
 import os
 import string
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from training_store import TrainingStore
 
 # VAROITUS: TÄMÄ TIEDOSTO SISÄLTÄÄ VIHAPUHETTA, KIROILUA JA LOUKKAAVAA TEKSTIÄ
 # TARKOITUS ON OPEAA TEKOÄLYÄ TUNNISTAMAAN NÄMÄ, JOTTA NE VOIDAAN ESTÄÄ.
 
-def get_leet_char(c):
-    leet_map = {
-        'a': ['4', '@'],
-        'e': ['3'],
-        'i': ['1', '!'],
-        'o': ['0'],
-        's': ['5', '$', 'z'],
-        't': ['7', '+'],
-        'b': ['8'],
-        'g': ['6', '9'],
-        'l': ['1', '|'],
-        'k': ['|<', 'k'],
-        'u': ['v']
-    }
-    if c.lower() in leet_map and random.random() < 0.5:
-        return random.choice(leet_map[c.lower()])
+SHARD_SIZE = 10000
+# Generated rows per label: at most this times the smallest label, and at most MAX_PER_LABEL
+MAX_IMBALANCE = 2.0
+MAX_PER_LABEL = 50000
+
+LEET_MAP = {
+    'a': ['4', '@'],
+    'e': ['3'],
+    'i': ['1', '!'],
+    'o': ['0'],
+    's': ['5', '$', 'z'],
+    't': ['7', '+'],
+    'b': ['8'],
+    'g': ['6', '9'],
+    'l': ['1', '|'],
+    'k': ['|<', 'k'],
+    'u': ['v']
+}
+
+def get_leet_char(c, rng=random):
+    options = LEET_MAP.get(c.lower())
+    if options and rng.random() < 0.5:
+        return rng.choice(options)
     return c
 
-def augment_text(text, intensity=0.3):
+def augment_text(text, intensity=0.3, rng=random):
     """
     Applies variations to text: typos, leet speak, repeating characters, case changes.
     intensity: probability of applying a change per character/word
+    rng: random.Random (or the random module) to draw from
     """
-    if random.random() > 0.8: # 20% chance to leave completely clean
+    draw = rng.random
+    if draw() > 0.8: # 20% chance to leave completely clean
         return text
-        
-    chars = list(text)
+
+    # One draw per character decides between the changes:
+    # case flip 10%, otherwise leet speak with `intensity`, otherwise 5% repetition of vowels
+    leet_below = 0.1 + 0.9 * intensity
+    repeat_below = leet_below + (1.0 - leet_below) * 0.05
     new_chars = []
-    
-    for c in chars:
-        # Randomly apply upper/lower case
-        if random.random() < 0.1:
-            if c.isupper():
-                new_chars.append(c.lower())
-            else:
-                new_chars.append(c.upper())
-            continue
-            
-        # Leet speak
-        if random.random() < intensity:
-            new_chars.append(get_leet_char(c))
-            continue
-            
-        # Repetition (e.g. "miiiiitä")
-        if c in "aeiouyäö!?" and random.random() < 0.05:
-            new_chars.append(c * random.randint(2, 4))
-            continue
-            
-        new_chars.append(c)
-        
+
+    for c in text:
+        r = draw()
+        if r < 0.1:
+            # Randomly apply upper/lower case
+            new_chars.append(c.lower() if c.isupper() else c.upper())
+        elif r < leet_below:
+            # Leet speak
+            new_chars.append(get_leet_char(c, rng))
+        elif r < repeat_below and c in "aeiouyäö!?":
+            # Repetition (e.g. "miiiiitä")
+            new_chars.append(c * rng.randint(2, 4))
+        else:
+            new_chars.append(c)
+
     result = "".join(new_chars)
-    
+
     # Randomly append punctuation
-    if random.random() < 0.3:
-        result += random.choice(["!", "!!", "???", "!!!1!", "...", " :D", " :(", " xD"])
-        
+    if draw() < 0.3:
+        result += rng.choice(["!", "!!", "???", "!!!1!", "...", " :D", " :(", " xD"])
+
     return result
 
-def generate_ok_data(count=500):
+def generate_ok_data(count=500, rng=random):
     data = []
     subjects = ["kuha", "ahven", "hauki", "siika", "made", "taimen", "lohi", "särki", "kiiski", "nieriä"]
     adjectives = ["iso", "pieni", "komea", "hyvä", "kaunis", "mahtava", "kiva", "huono", "hieno"]
@@ -92,57 +102,57 @@ def generate_ok_data(count=500):
     ]
     
     for _ in range(count):
-        tmpl = random.choice(templates)
+        tmpl = rng.choice(templates)
         msg = tmpl.format(
-            sub=random.choice(subjects),
-            adj=random.choice(adjectives),
-            verb=random.choice(verbs),
-            place=random.choice(places)
+            sub=rng.choice(subjects),
+            adj=rng.choice(adjectives),
+            verb=rng.choice(verbs),
+            place=rng.choice(places)
         )
         # Small chance of typo in OK messages too
-        if random.random() < 0.05:
-            msg = augment_text(msg, intensity=0.1)
-        data.append({"text": msg, "label": "OK"})
+        if rng.random() < 0.05:
+            msg = augment_text(msg, intensity=0.1, rng=rng)
+        data.append((msg, "OK"))
         
     # Add nicks
     nicks = ["Kalamies", "PilkkiUkko", "IceFisher", "Sanna88", "Matti_M", "ProPilkkijä", "FishingMaster"]
     for _ in range(int(count/5)):
-        nick = random.choice(nicks) + str(random.randint(1, 99))
-        data.append({"text": nick, "label": "OK"})
+        nick = rng.choice(nicks) + str(rng.randint(1, 99))
+        data.append((nick, "OK"))
         
     return data
 
-def generate_minor_data(count=500):
+def generate_minor_data(count=500, rng=random):
     data = []
     complaints = ["lagii", "pätkii", "bugittaa", "ei toimi", "on hidas", "jumittaa", "kaatuu"]
     questions = ["missä admin", "mikä meininki", "miksi tämä ei toimi", "onko täällä ketään", "vastatkaa"]
     boring = ["tylsää", "hiljaista", "huoh", "zzzz", "blaablaa", "väsyttää", "ei jaksa"]
     
     for _ in range(count):
-        r = random.random()
+        r = rng.random()
         if r < 0.4:
-            msg = f"Tämä serveri {random.choice(complaints)}"
+            msg = f"Tämä serveri {rng.choice(complaints)}"
         elif r < 0.7:
-            msg = random.choice(questions)
+            msg = rng.choice(questions)
         else:
-            msg = random.choice(boring)
+            msg = rng.choice(boring)
             
         # Minor violations often have spammy characteristics or caps
-        if random.random() < 0.3:
+        if rng.random() < 0.3:
             msg = msg.upper()
-        if random.random() < 0.4:
-            msg = augment_text(msg, intensity=0.2)
+        if rng.random() < 0.4:
+            msg = augment_text(msg, intensity=0.2, rng=rng)
             
-        data.append({"text": msg, "label": "MINOR"})
+        data.append((msg, "MINOR"))
         
     spam_phrases = ["liity tähän", "ilmainen nitro", "klikkaa tästä", "halpaa kultaa", "seuraa minua somessa"]
     for _ in range(int(count/5)):
-        msg = random.choice(spam_phrases) + " " + "".join(random.choices(string.ascii_letters, k=5))
-        data.append({"text": msg, "label": "MINOR"})
+        msg = rng.choice(spam_phrases) + " " + "".join(rng.choices(string.ascii_letters, k=5))
+        data.append((msg, "MINOR"))
 
     return data
 
-def generate_moderate_data(count=500):
+def generate_moderate_data(count=500, rng=random):
     data = []
     insults = ["nuija", "idiootti", "tyhmä", "pelle", "luuseri", "urpo", "tonttu", "nolife", "bot", "noob", "jonne"]
     adjectives = ["surkea", "huono", "paska", "oksettava", "ärsyttävä", "ruma", "likainen"]
@@ -167,22 +177,22 @@ def generate_moderate_data(count=500):
     ]
     
     for _ in range(count):
-        tmpl = random.choice(templates)
+        tmpl = rng.choice(templates)
         msg = tmpl.format(
-            insult=random.choice(insults),
-            adj=random.choice(adjectives),
-            target=random.choice(targets),
-            pol=random.choice(politics),
-            rel=random.choice(religions)
+            insult=rng.choice(insults),
+            adj=rng.choice(adjectives),
+            target=rng.choice(targets),
+            pol=rng.choice(politics),
+            rel=rng.choice(religions)
         )
         
         # Moderate toxicity often involves cursing
-        msg = augment_text(msg, intensity=0.3)
-        data.append({"text": msg, "label": "MODERATE"})
+        msg = augment_text(msg, intensity=0.3, rng=rng)
+        data.append((msg, "MODERATE"))
         
     return data
 
-def generate_severe_data(count=500):
+def generate_severe_data(count=500, rng=random):
     data = []
     # VERY TOXIC / ILLEGAL / HATE SPEECH / SEXUAL HARASSMENT
     # Keeping these procedural to avoid writing too much specific filth manually,
@@ -209,94 +219,149 @@ def generate_severe_data(count=500):
     ]
     
     for _ in range(count):
-        tmpl = random.choice(templates)
+        tmpl = rng.choice(templates)
         msg = tmpl.format(
-            target=random.choice(targets),
-            action=random.choice(actions),
-            part=random.choice(body_parts),
-            sexual=random.choice(sexual_acts)
+            target=rng.choice(targets),
+            action=rng.choice(actions),
+            part=rng.choice(body_parts),
+            sexual=rng.choice(sexual_acts)
         )
         
         # Severe toxicity often tries to evade filters with heavy Leet Speak
-        msg = augment_text(msg, intensity=0.5)
-        data.append({"text": msg, "label": "SEVERE"})
+        msg = augment_text(msg, intensity=0.5, rng=rng)
+        data.append((msg, "SEVERE"))
         
     return data
 
-def generate_dataset():
-    print("Generating comprehensive dataset (10x scale)...")
-    
-    data = []
-    
-    # Generate larger base amounts to ensure variety
-    print("- Generating OK samples...")
-    data.extend(generate_ok_data(30000))
-    
-    print("- Generating MINOR samples...")
-    data.extend(generate_minor_data(30000))
-    
-    print("- Generating MODERATE samples...")
-    data.extend(generate_moderate_data(30000))
-    
-    print("- Generating SEVERE samples...")
-    data.extend(generate_severe_data(30000))
-    
-    new_df = pd.DataFrame(data)
-    
-    # Load existing to append if available? 
-    # Actually, for "more comprehensive", let's make sure we preserve old reliable data 
-    # but the new generator is powerful enough that we might rely on it.
-    # Let's keep the append logic but make sure we don't just drown in old data.
-    
-    os.makedirs("data", exist_ok=True)
-    data_file = "data/training_data.csv"
-    
-    if os.path.exists(data_file):
-        try:
-            existing_df = pd.read_csv(data_file, on_bad_lines='skip')
-            df = pd.concat([existing_df, new_df], ignore_index=True)
-            print(f"Merged {len(new_df)} new samples with {len(existing_df)} existing samples.")
-        except Exception as e:
-            print(f"Could not read existing data: {e}. Starting fresh.")
-            df = new_df
-    else:
-        df = new_df
+def _run_shard(generator, count, seed):
+    """
+    Worker process entry point: one shard with its own seeded RNG
 
-    # Remove duplicates
-    df = df.drop_duplicates(subset=['text', 'label'])
-    
-    # Balance
-    print("Balancing dataset (25% split)...")
-    counts = df['label'].value_counts()
-    print("Distribution before balancing:")
-    print(counts)
-    
-    target_count = counts.max()
-    # Or set a reasonable cap if it gets too huge
-    if target_count > 50000:
-        target_count = 50000
-        
-    balanced_dfs = []
-    for label in ["OK", "MINOR", "MODERATE", "SEVERE"]:
-        label_df = df[df['label'] == label]
-        if len(label_df) == 0:
-            print(f"Warning: No data for {label}")
-            continue
-            
-        if len(label_df) < target_count:
-            resampled = label_df.sample(target_count, replace=True)
-        else:
-            resampled = label_df.sample(target_count)  # Downsample if above cap
-            
-        balanced_dfs.append(resampled)
-        
-    final_df = pd.concat(balanced_dfs).sample(frac=1).reset_index(drop=True)
-    
-    print("Distribution after balancing:")
-    print(final_df['label'].value_counts())
-    
-    final_df.to_csv(data_file, index=False)
-    print(f"Training data saved to {data_file}. Total rows: {len(final_df)}")
+    Returns:
+        (text, label) tuples, duplicates within the shard dropped
+    """
+    return list(dict.fromkeys(generator(count, rng=random.Random(seed))))
+
+def generate_to_store(plan, store_path="data/training.db", seed=42, workers=None, shard_size=SHARD_SIZE,
+                      progress=print, max_imbalance=MAX_IMBALANCE, max_per_label=MAX_PER_LABEL):
+    """
+    Generate samples in seeded shards across a process pool and stream them
+    into the training store. Every shard gets its seed from (seed, generator,
+    shard index), so the result does not depend on the number of workers.
+    Exact duplicates are dropped within shards and by the store.
+
+    The store keeps each text once, so a label with few distinct templates
+    cannot be padded with copies as the old CSV was. Instead the generated
+    rows of every label are capped at max_imbalance times the smallest label
+    (and at max_per_label), training weights the remaining difference. Only
+    the rows this run inserted are trimmed, rows already in the store stay
+    even when their label is over the cap.
+
+    Args:
+        plan: (generator, count) pairs, generator(count, rng=...) returns (text, label) tuples
+        store_path: Training store
+        seed: Base seed
+        workers: Worker processes (default: CPU count), 1 generates in this process
+        shard_size: Samples per shard, bounds the memory held per shard
+        progress: Receives a line of text per generator
+        max_imbalance: Largest allowed ratio between two labels' generated rows (0 = no ratio cap)
+        max_per_label: Generated rows kept per label at most (0 = no limit)
+
+    Returns:
+        (generated, added): samples generated and the net change in generated rows in the store
+    """
+    shards = []
+    for generator, count in plan:
+        for index, start in enumerate(range(0, count, shard_size)):
+            shards.append((generator, min(shard_size, count - start), f"{seed}:{generator.__name__}:{index}"))
+
+    workers = workers or os.cpu_count() or 1
+    store = TrainingStore(store_path)
+    before = _generated_counts(store)
+    run_started = time.time()
+    generated = 0
+    last_generator = None
+
+    def write(generator, rows):
+        nonlocal generated, last_generator
+        if generator is not last_generator:
+            progress(f"- {generator.__name__}...")
+            last_generator = generator
+        generated += len(rows)
+        store.add_many(rows, source="generated")
+
+    try:
+        with store.bulk():
+            if workers <= 1:
+                for shard in shards:
+                    write(shard[0], _run_shard(*shard))
+            else:
+                # Results are written in shard order, at most 2 shards per worker in flight
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    remaining = iter(shards)
+                    pending = deque()
+                    for shard in itertools.islice(remaining, 2 * workers):
+                        pending.append((shard[0], pool.submit(_run_shard, *shard)))
+                    while pending:
+                        generator, future = pending.popleft()
+                        shard = next(remaining, None)
+                        if shard is not None:
+                            pending.append((shard[0], pool.submit(_run_shard, *shard)))
+                        write(generator, future.result())
+            counts = _balance(store, run_started, max_imbalance, max_per_label, progress)
+    finally:
+        store.close()
+    return generated, sum(counts.values()) - sum(before.values())
+
+def _generated_counts(store, since=None):
+    return {label: n for (source, label), n in store.counts(since).items() if source == "generated"}
+
+def _balance(store, run_started, max_imbalance, max_per_label, progress):
+    """
+    Cap the generated rows per label. Only the rows added since run_started
+    are deleted, a label that is already over the cap keeps its older rows
+    and gets none of the new ones.
+
+    Returns:
+        Generated rows per label afterwards
+    """
+    counts = _generated_counts(store)
+    added = _generated_counts(store, since=run_started)
+    caps = [max_per_label] if max_per_label else []
+    if max_imbalance and counts:
+        caps.append(int(min(counts.values()) * max_imbalance))
+    if caps:
+        cap = min(caps)
+        for label, n in counts.items():
+            new = added.get(label, 0)
+            keep = max(0, min(new, cap - (n - new)))
+            if keep < new:
+                store.trim(label, keep, source="generated", since=run_started)
+                counts[label] = n - new + keep
+    progress("Generated rows per label: " + ", ".join(f"{label} {n}" for label, n in sorted(counts.items())))
+    return counts
+
+def generate_dataset(samples_per_label=30000, seed=42, workers=None, store_path="data/training.db",
+                     max_imbalance=MAX_IMBALANCE):
+    print(f"Generating dataset ({samples_per_label} base samples per label, seed {seed})...")
+    start = time.perf_counter()
+    plan = [
+        (generate_ok_data, samples_per_label),
+        (generate_minor_data, samples_per_label),
+        (generate_moderate_data, samples_per_label),
+        (generate_severe_data, samples_per_label)
+    ]
+    generated, added = generate_to_store(plan, store_path, seed=seed, workers=workers, max_imbalance=max_imbalance)
+    print(f"Generated {generated} samples in {time.perf_counter() - start:.1f} s, "
+          f"{added:+d} distinct generated samples in {store_path}.")
 
 if __name__ == "__main__":
-    generate_dataset()
+    parser = argparse.ArgumentParser(description="Generate training data into the training store")
+    parser.add_argument("--samples", type=int, default=30000, help="Base samples per label")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--store", default="data/training.db")
+    parser.add_argument("--max-imbalance", type=float, default=MAX_IMBALANCE,
+                        help="Cap each label at this times the smallest label (0 = no cap)")
+    args = parser.parse_args()
+    generate_dataset(args.samples, args.seed, args.workers, args.store, args.max_imbalance)
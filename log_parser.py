@@ -5,7 +5,7 @@ Parses PP2 host log files (chatlog.txt and playlog.txt) to extract player messag
 
 import re
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 
 
@@ -29,6 +29,80 @@ class ChatMessage:
     message: str
 
 
+class ChatStreamParser:
+    """
+    Incremental chatlog parser: feed lines one at a time as they are tailed.
+
+    A message starts with a header line ("Pelaaja:        [25.01.2026 07:30]")
+    and continues until the next header, a blank line or flush(). Multi-line
+    messages are joined with newlines.
+    """
+
+    HEADER_PATTERN = re.compile(r'^(.+?):\s+\[(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2})\]$')
+
+    def __init__(self):
+        self._player_name: Optional[str] = None
+        self._timestamp: Optional[str] = None
+        self._lines: List[str] = []
+        self._offset: Optional[int] = None
+
+    def _is_header(self, line: str) -> Optional[re.Match]:
+        # Cheap prefix/suffix check before running the regex
+        if not line.endswith(']') or ':' not in line:
+            return None
+        return self.HEADER_PATTERN.match(line)
+
+    def _complete(self) -> List[ChatMessage]:
+        if self._player_name is None or not self._lines:
+            return []
+        message = ChatMessage(
+            timestamp=self._timestamp,
+            player_name=self._player_name,
+            message='\n'.join(self._lines)
+        )
+        self._player_name = None
+        self._timestamp = None
+        self._lines = []
+        return [message]
+
+    @property
+    def pending_offset(self) -> Optional[int]:
+        """File offset of the header of the message still being assembled, None if there is none"""
+        return self._offset if self._player_name is not None else None
+
+    def feed(self, line: str, offset: Optional[int] = None) -> List[ChatMessage]:
+        """
+        Feed one raw line, returns the messages completed by it
+
+        Args:
+            line: The line
+            offset: Its position in the file, reported by pending_offset while its message is open
+        """
+        line = line.rstrip()
+        if not line:
+            return self._complete()
+
+        match = self._is_header(line)
+        if match:
+            completed = self._complete()
+            self._player_name = match.group(1).strip()
+            self._timestamp = match.group(2)
+            self._offset = offset
+            return completed
+
+        line = line.strip()
+        if self._player_name is not None and line:
+            self._lines.append(line)
+        return []
+
+    def flush(self) -> List[ChatMessage]:
+        """
+        Complete the pending message, e.g. when the log goes idle.
+        A header without any message line yet is kept waiting.
+        """
+        return self._complete()
+
+
 class LogParser:
     """Parser for PP2 host log files"""
     
@@ -37,6 +111,8 @@ class LogParser:
         r'-->\s+(.+?)\s+joined the game\s+\(ip:\s+([0-9.]+)\)\.\s+\[(.+?)\]\s+\[\s*(/banaddress\s+.+?)\s*\]\s+\[(.+?)\]'
     )
     
+    PLAYER_LEAVE_PATTERN = re.compile(r'<--\s+(.+?)\s+left the game')
+    
     CHAT_MESSAGE_PATTERN = re.compile(
         r'^(.+?):\s+\[(.+?)\]\s*$',
         re.MULTILINE
@@ -44,6 +120,10 @@ class LogParser:
     
     TIMESTAMP_PATTERN = re.compile(r'\[(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2})\]')
     
+    def chat_stream(self) -> ChatStreamParser:
+        """Create an incremental parser for one chatlog stream"""
+        return ChatStreamParser()
+
     def parse_player_join(self, line: str) -> Optional[PlayerJoinEvent]:
         """
         Parse a player join event from playlog.txt
@@ -87,6 +167,18 @@ class LogParser:
             player_id=cmd_parts[-1] if len(cmd_parts) > 3 else ""
         )
     
+    def parse_player_leave(self, line: str) -> Optional[str]:
+        """
+        Parse a player leaving from playlog.txt, returns the player name
+        
+        Example line:
+        <-- Pelaaja left the game.
+        """
+        if not line.startswith('<--'):
+            return None
+        match = self.PLAYER_LEAVE_PATTERN.match(line)
+        return match.group(1).strip() if match else None
+    
     def parse_chat_message(self, content: str, current_timestamp: str) -> Optional[ChatMessage]:
         """
         Parse a chat message from chatlog.txt
@@ -0,0 +1,602 @@
+"""
+Log Tailer
+Follows PP2 host log files and yields new lines as they are written.
+Uses Linux inotify when available and falls back to polling elsewhere.
+"""
+
+import os
+import time
+import asyncio
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Optional, Iterator, AsyncIterator, Dict, List
+from checkpoint_store import Checkpoint, CheckpointStore, FINGERPRINT_SIZE, file_fingerprint, resolve_start_offset
+from logger import log
+
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _parse_events(data: bytes) -> Iterator[tuple]:
+    """Split a buffer read from an inotify fd into (wd, mask, name) tuples"""
+    offset = 0
+    while offset + _EVENT_HEADER.size <= len(data):
+        wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        name = data[offset:offset + name_len].rstrip(b"\0")
+        offset += name_len
+        yield wd, mask, name
+
+
+def _load_libc():
+    """Load libc for inotify syscalls, or None if not available on this platform"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyWatcher:
+    """Waits for changes to a single file using Linux inotify"""
+
+    DIR_MASK = IN_MODIFY | IN_ATTRIB | IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+    FILE_MASK = IN_MODIFY | IN_MOVE_SELF | IN_DELETE_SELF
+
+    def __init__(self, filepath: str):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify ei ole käytettävissä tällä alustalla")
+
+        self.filepath = os.path.abspath(filepath)
+        self.directory = os.path.dirname(self.filepath)
+        self.filename = os.fsencode(os.path.basename(self.filepath))
+
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 epäonnistui")
+
+        self.dir_wd = self._add_watch(self.directory, self.DIR_MASK)
+        if self.dir_wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch epäonnistui: {self.directory}")
+        self.file_wd = -1
+        self.rewatch_file()
+
+    def _add_watch(self, path: str, mask: int) -> int:
+        return self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+
+    def rewatch_file(self):
+        """(Re)attach the watch on the file itself, e.g. after rotation"""
+        old_wd = self.file_wd
+        self.file_wd = self._add_watch(self.filepath, self.FILE_MASK)
+        if old_wd >= 0 and old_wd != self.file_wd:
+            # The rotated file may stay in the directory, stop counting it against max_user_watches
+            self._libc.inotify_rm_watch(self.fd, old_wd)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the file changes or timeout expires. Returns True on a relevant event."""
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+        except InterruptedError:
+            return False
+        if not readable:
+            return False
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        relevant = False
+        for wd, mask, name in _parse_events(data):
+            if mask & IN_Q_OVERFLOW:
+                relevant = True
+            elif wd == self.file_wd:
+                relevant = True
+            elif wd == self.dir_wd and name == self.filename:
+                relevant = True
+        return relevant
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher that simply sleeps for a fixed interval"""
+
+    def __init__(self, filepath: str, interval: float = 1.0):
+        self.filepath = filepath
+        self.interval = interval
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(min(self.interval, timeout))
+        return True
+
+    def rewatch_file(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class InotifyHub:
+    """
+    One inotify instance shared by every tailer on an asyncio loop.
+    The kernel limits inotify instances per user (default 128), so the
+    asyncio monitoring mode registers all logs here instead.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify ei ole käytettävissä tällä alustalla")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 epäonnistui")
+        self.loop = loop
+        # wd -> {filename: [subscriptions]} for directory watches
+        self._dir_subs: Dict[int, Dict[bytes, List["HubSubscription"]]] = {}
+        # wd -> [subscriptions] for watches on the files themselves
+        self._file_subs: Dict[int, List["HubSubscription"]] = {}
+        loop.add_reader(self.fd, self._on_readable)
+
+    def _add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch epäonnistui: {path}")
+        return wd
+
+    def subscribe(self, filepath: str) -> "HubSubscription":
+        filepath = os.path.abspath(filepath)
+        sub = HubSubscription(self, filepath)
+        dir_wd = self._add_watch(os.path.dirname(filepath), InotifyWatcher.DIR_MASK)
+        self._dir_subs.setdefault(dir_wd, {}).setdefault(sub.filename, []).append(sub)
+        sub.dir_wd = dir_wd
+        self.rewatch(sub)
+        return sub
+
+    def _rm_watch(self, wd: int):
+        # Fails with EINVAL if the kernel already dropped the watch (file deleted), that is fine
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def _drop_file_sub(self, sub: "HubSubscription", keep_wd: int = -1):
+        """Remove sub from its file watch, removing the watch when nobody else uses it"""
+        subs = self._file_subs.get(sub.file_wd)
+        if subs is None:
+            return
+        if sub in subs:
+            subs.remove(sub)
+        if not subs and sub.file_wd != keep_wd:
+            del self._file_subs[sub.file_wd]
+            self._rm_watch(sub.file_wd)
+
+    def rewatch(self, sub: "HubSubscription"):
+        try:
+            new_wd = self._add_watch(sub.filepath, InotifyWatcher.FILE_MASK)
+        except OSError:
+            new_wd = -1
+        # The same inode gives back the same wd, which must not be removed
+        self._drop_file_sub(sub, keep_wd=new_wd)
+        sub.file_wd = new_wd
+        if new_wd >= 0:
+            self._file_subs.setdefault(new_wd, []).append(sub)
+
+    def unsubscribe(self, sub: "HubSubscription"):
+        by_name = self._dir_subs.get(sub.dir_wd)
+        if by_name is not None:
+            subs = by_name.get(sub.filename, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                by_name.pop(sub.filename, None)
+            if not by_name:
+                del self._dir_subs[sub.dir_wd]
+                self._rm_watch(sub.dir_wd)
+        self._drop_file_sub(sub)
+        sub.dir_wd = sub.file_wd = -1
+
+    def watch_count(self) -> int:
+        """Number of inotify watches held by the hub"""
+        return len(self._dir_subs) + len(self._file_subs)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return
+        for wd, mask, name in _parse_events(data):
+            if mask & IN_Q_OVERFLOW:
+                targets = [s for subs in self._file_subs.values() for s in subs]
+                targets += [s for by_name in self._dir_subs.values() for subs in by_name.values() for s in subs]
+            elif wd in self._file_subs:
+                targets = self._file_subs[wd]
+            else:
+                targets = self._dir_subs.get(wd, {}).get(name, [])
+            for sub in targets:
+                sub.event.set()
+
+    def close(self):
+        if self.fd >= 0:
+            self.loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = -1
+
+
+class HubSubscription:
+    """A single tailer's registration in an InotifyHub"""
+
+    def __init__(self, hub: InotifyHub, filepath: str):
+        self.hub = hub
+        self.filepath = filepath
+        self.filename = os.fsencode(os.path.basename(filepath))
+        self.dir_wd = -1
+        self.file_wd = -1
+        self.event = asyncio.Event()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.event.clear()
+
+    def rewatch_file(self):
+        self.hub.rewatch(self)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class AsyncPollingWatcher(PollingWatcher):
+    """Polling fallback for the asyncio monitoring mode"""
+
+    async def wait(self, timeout: float) -> bool:
+        await asyncio.sleep(min(self.interval, timeout))
+        return True
+
+
+def create_watcher(filepath: str, backend: str = "auto", poll_interval: float = 1.0):
+    """
+    Create a file watcher for the given backend
+
+    Args:
+        filepath: File to watch
+        backend: "auto", "inotify" or "poll"
+        poll_interval: Sleep interval for the polling backend
+
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(filepath)
+        except OSError as e:
+            if backend == "inotify":
+                log.warning(f"⚠️ inotify ei käytettävissä ({filepath}): {e}. Käytetään pollausta.")
+            else:
+                log.debug(f"ℹ️ inotify ei käytettävissä ({filepath}): {e}. Käytetään pollausta.")
+    return PollingWatcher(filepath, poll_interval)
+
+
+class LogTailer:
+    """Follows a log file, keeping the handle open between change events"""
+
+    HEARTBEAT_INTERVAL = 120
+    READ_SIZE = 256 * 1024
+    # Even with inotify we re-check the file periodically, since events
+    # are not delivered for some mounts (e.g. network shares)
+    SAFETY_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        filepath: str,
+        label: str,
+        server_name: str,
+        start_at_end: bool = True,
+        backend: str = "auto",
+        poll_interval: float = 1.0,
+        checkpoints: Optional[CheckpointStore] = None
+    ):
+        """
+        Initialize the tailer
+
+        Args:
+            filepath: Path to the log file
+            label: Short label used in log output ("chat" / "play")
+            server_name: Name of the monitored server, for log output
+            start_at_end: Skip existing content and only yield new lines
+            backend: Watcher backend: "auto", "inotify" or "poll"
+            poll_interval: Sleep interval when polling
+            checkpoints: Store for resuming from the last processed offset (optional)
+        """
+        self.filepath = filepath
+        self.label = label
+        self.server_name = server_name
+        self.start_at_end = start_at_end
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.checkpoints = checkpoints
+        self.checkpoint_key = CheckpointStore.key(server_name, label)
+
+        self.pos = 0
+        # Offset the checkpoint must not pass yet (start of an unfinished multi-line entry)
+        self._hold: Optional[int] = None
+        self._file = None
+        self._inode = None
+        self._fingerprint = None
+        self._fingerprint_len = 0
+        self._stat_seen = None
+        self._encoding = None
+        self._buffer = bytearray()
+        self._chunk = bytearray(self.READ_SIZE)
+        self._watcher = None
+        self._closed = False
+        self._last_heartbeat = time.time()
+
+    def _open(self, pos: int):
+        self._close_file()
+        self._file = open(self.filepath, 'rb', buffering=0)
+        inode = os.fstat(self._file.fileno()).st_ino
+        if inode != self._inode:
+            # Encoding is decided per file, a rotated file may differ
+            self._encoding = None
+        self._inode = inode
+        self._fingerprint, self._fingerprint_len = file_fingerprint(self._file.fileno())
+        self._stat_seen = None
+        self._file.seek(pos)
+        self._buffer.clear()
+        self.pos = pos
+        self._hold = None
+        self._record_position()
+
+    def _initial_offset(self) -> int:
+        """Start position for the first open: saved checkpoint, else end/start of file"""
+        default = os.path.getsize(self.filepath) if self.start_at_end else 0
+        if not self.checkpoints:
+            return default
+
+        checkpoint = self.checkpoints.get(self.checkpoint_key)
+        with open(self.filepath, 'rb') as f:
+            offset = resolve_start_offset(checkpoint, f.fileno())
+        if offset is None:
+            return default
+        if offset == 0 and checkpoint.offset > 0:
+            log.info(f"🔄 Tiedosto vaihtunut tai katkaistu tauon aikana [{self.server_name}] ({self.label}), luetaan alusta.")
+        else:
+            log.info(f"📍 Jatketaan tallennetusta kohdasta [{self.server_name}] ({self.label}): {offset}")
+        return offset
+
+    def _refresh_fingerprint(self):
+        # A short head grows with the file, hash it again until it is full length
+        if self._fingerprint_len < FINGERPRINT_SIZE and self.pos > self._fingerprint_len:
+            self._fingerprint, self._fingerprint_len = file_fingerprint(self._file.fileno())
+
+    def _record_position(self):
+        """Store the current offset in the checkpoint store (flushed to disk in batches)"""
+        if not self.checkpoints or self._file is None:
+            return
+        self._refresh_fingerprint()
+        offset = self.pos if self._hold is None else min(self._hold, self.pos)
+        self.checkpoints.update(self.checkpoint_key, offset, self._inode,
+                                self._fingerprint, self._fingerprint_len)
+
+    def hold(self, offset: Optional[int]):
+        """
+        Keep the saved checkpoint at offset until released with None, so an entry
+        the consumer has only partly read (a chat message waiting for its next
+        line) is read again from its start after a restart
+
+        Args:
+            offset: Start of the unfinished entry in the current file, or None
+        """
+        self._hold = offset if offset is None or offset <= self.pos else None
+
+    def position(self) -> Optional[Checkpoint]:
+        """Start of the line being processed, as a checkpoint. None before the file is opened."""
+        if self._file is None:
+            return None
+        self._refresh_fingerprint()
+        return Checkpoint(self.pos, self._inode, self._fingerprint, self._fingerprint_len, time.time())
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _decode(self, raw: bytes) -> str:
+        """Decode one complete line, fixing the file encoding on the first non-ASCII line"""
+        if self._encoding is None:
+            if raw.isascii():
+                return raw.decode('ascii')
+            try:
+                line = raw.decode('utf-8')
+                self._encoding = 'utf-8'
+                return line
+            except UnicodeDecodeError:
+                self._encoding = 'cp1252'
+            log.debug(f"ℹ️ Tiedoston merkistö [{self.server_name}] ({self.label}): {self._encoding}")
+        return raw.decode(self._encoding, errors='replace')
+
+    def _read_available(self) -> Iterator[str]:
+        """Yield all complete lines currently in the file. Partial lines wait in the buffer."""
+        chunk_view = memoryview(self._chunk)
+        while True:
+            n = self._file.readinto(self._chunk)
+            if not n:
+                return
+            self._buffer += chunk_view[:n]
+
+            last_newline = self._buffer.rfind(b'\n')
+            if last_newline < 0:
+                continue
+            block = bytes(self._buffer[:last_newline + 1])
+            del self._buffer[:last_newline + 1]
+
+            raw_lines = block.split(b'\n')
+            raw_lines.pop()  # empty remainder after the final newline
+            for raw in raw_lines:
+                yield self._decode(raw) + '\n'
+                self.pos += len(raw) + 1
+                self._record_position()
+
+    def _check_truncation(self):
+        """
+        Start over if the open file was truncated. Besides a size below the
+        offset, the head is compared whenever size or mtime changed, since a
+        file truncated and rewritten between two polls may already be longer again.
+        """
+        st = os.fstat(self._file.fileno())
+        seen = (st.st_size, st.st_mtime_ns)
+        if seen == self._stat_seen:
+            return
+        self._stat_seen = seen
+        if st.st_size < self.pos or (
+            self._fingerprint_len and file_fingerprint(self._file.fileno(), self._fingerprint_len)[0] != self._fingerprint
+        ):
+            log.info(f"🔄 Tiedosto muuttunut merkittävästi [{self.server_name}] ({self.label}), resetoidaan indeksi.")
+            self._open(0)
+
+    def _check_rotation(self):
+        """Reopen the file if it was replaced"""
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode:
+            log.info(f"🔄 Tiedosto vaihtunut [{self.server_name}] ({self.label}), avataan uudelleen.")
+            self._open(0)
+            self._watcher.rewatch_file()
+
+    def _ensure_open(self) -> bool:
+        """Open the file if needed. Returns False if it does not exist right now."""
+        if self._file is not None:
+            return True
+        if not os.path.exists(self.filepath):
+            return False
+        size = os.path.getsize(self.filepath)
+        if self._inode is None:
+            self._open(self._initial_offset())
+        else:
+            self._open(self.pos if self.pos <= size else 0)
+        return True
+
+    def _poll_once(self, yield_idle: bool = False) -> Iterator[Optional[str]]:
+        """Yield every line available now and handle rotation / housekeeping"""
+        if not self._ensure_open():
+            return
+        # Before reading, so no line of rewritten content is read from the old offset
+        self._check_truncation()
+        got_lines = False
+        for line in self._read_available():
+            yield line
+            got_lines = True
+            self._last_heartbeat = time.time()
+        if got_lines and yield_idle:
+            # Marks the end of a burst, lets the consumer complete pending multi-line entries
+            yield None
+
+        self._check_rotation()
+        if self.checkpoints:
+            self.checkpoints.maybe_flush()
+
+        if time.time() - self._last_heartbeat > self.HEARTBEAT_INTERVAL:
+            log.debug(f"💓 Seuranta käynnissä [{self.server_name}] ({self.label}) - Pos: {self.pos}")
+            self._last_heartbeat = time.time()
+
+    def _start(self, mode: str) -> bool:
+        if not os.path.exists(self.filepath):
+            log.error(f"🛑 Tiedostoa ei löydy ({self.server_name}): {self.filepath}")
+            return False
+        log.info(f"📖 Aloitetaan seuranta [{self.server_name}] ({self.label}): {self.filepath} "
+                 f"(alusta: {not self.start_at_end}, tila: {mode})")
+        self._last_heartbeat = time.time()
+        return True
+
+    def _finish(self):
+        if self.checkpoints:
+            self.checkpoints.flush()
+        self._close_file()
+        if self._watcher:
+            self._watcher.close()
+
+    def lines(self, yield_idle: bool = False) -> Iterator[Optional[str]]:
+        """
+        Yield new lines forever (until close() is called)
+
+        Args:
+            yield_idle: Yield None after each burst of lines once the file has no more data
+        """
+        self._watcher = create_watcher(self.filepath, self.backend, self.poll_interval)
+        if not self._start("inotify" if isinstance(self._watcher, InotifyWatcher) else "poll"):
+            self._watcher.close()
+            return
+
+        try:
+            while not self._closed:
+                try:
+                    yield from self._poll_once(yield_idle)
+                    self._watcher.wait(self.SAFETY_INTERVAL)
+                except Exception as e:
+                    log.error(f"❌ Virhe tiedoston {self.label} luvussa [{self.server_name}]: {e}")
+                    self._close_file()
+                    time.sleep(5)
+        finally:
+            self._finish()
+
+    async def alines(self, hub: Optional[InotifyHub] = None, yield_idle: bool = False) -> AsyncIterator[Optional[str]]:
+        """
+        Async variant of lines() for the asyncio monitoring mode
+
+        Args:
+            hub: Shared inotify instance; polling is used when None or when
+                 the backend is "poll"
+            yield_idle: Yield None after each burst of lines, as in lines()
+        """
+        if hub is not None and self.backend != "poll":
+            self._watcher = hub.subscribe(self.filepath)
+            mode = "inotify"
+        else:
+            self._watcher = AsyncPollingWatcher(self.filepath, self.poll_interval)
+            mode = "poll"
+        if not self._start(mode):
+            self._watcher.close()
+            return
+
+        try:
+            while not self._closed:
+                try:
+                    for line in self._poll_once(yield_idle):
+                        yield line
+                    await self._watcher.wait(self.SAFETY_INTERVAL)
+                except Exception as e:
+                    log.error(f"❌ Virhe tiedoston {self.label} luvussa [{self.server_name}]: {e}")
+                    self._close_file()
+                    await asyncio.sleep(5)
+        finally:
+            self._finish()
+
+    def close(self):
+        """Stop iteration after the current wait"""
+        self._closed = True
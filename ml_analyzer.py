@@ -1,7 +1,16 @@
 import joblib
 import os
+import re
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Callable, List, Sequence, Optional
+from bounded_cache import SessionCache
+from compiled_model import CompiledModel
+from model_registry import read_manifest
+from logger import log
 
 ViolationLevel = Literal["SEVERE", "MODERATE", "MINOR", "OK"]
 
@@ -12,69 +21,340 @@ class AnalysisResult:
     reason: str
     suggested_action: str
 
+class BatchPredictor:
+    """
+    Collects predictions requested from many threads and runs them as one
+    model call. A batch is flushed when it reaches max_batch messages or
+    max_wait_ms after its first message arrived.
+    """
+    
+    def __init__(self, predict_fn: Callable[[List[str]], Sequence[str]], max_batch: int = 64, max_wait_ms: float = 2.0):
+        """
+        Args:
+            predict_fn: Function mapping a list of texts to a list of labels
+            max_batch: Maximum number of texts per model call
+            max_wait_ms: Maximum time the first text of a batch waits for company
+        """
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._closed = False
+        # submit() and close() must not interleave, or a text could be queued after the final drain
+        self._close_lock = threading.Lock()
+        self.batches = 0
+        self.predictions = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MLBatcher")
+        self._thread.start()
+    
+    def predict(self, text: str) -> str:
+        """Queue a text and block until its label is available"""
+        return self.submit(text).result()
+    
+    def submit(self, text: str) -> Future:
+        """Queue a text, returns a Future resolving to its label"""
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                future.set_exception(RuntimeError("BatchPredictor on suljettu"))
+            else:
+                self._queue.put((text, future))
+        return future
+    
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while not self._closed:
+            batch = self._collect()
+            batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                labels = self.predict_fn(texts)
+                for (_, future), label in zip(batch, labels):
+                    future.set_result(label)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self.batches += 1
+            self.predictions += len(batch)
+        self._fail_pending()
+    
+    def _fail_pending(self):
+        """Fail the texts still queued after close, their callers are blocked in predict()"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(RuntimeError("BatchPredictor on suljettu"))
+    
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the batcher. The batch being predicted is finished, texts still
+        waiting in the queue fail with RuntimeError.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+_REPEAT_PATTERN = re.compile(r'(.)\1{2,}')
+_SPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key for a text: case-folded, whitespace squeezed and runs of three
+    or more identical characters collapsed to two ("LAGIIIII" -> "lagii").
+    Double letters are kept since they carry meaning in Finnish.
+    """
+    text = _SPACE_PATTERN.sub(' ', text.casefold()).strip()
+    return _REPEAT_PATTERN.sub(r'\1\1', text)
+
 class MLAnalyzer:
     """Analyzes text using local ML model for PP2 rule violations"""
     
-    def __init__(self, model_path: str = "models/violation_model.joblib"):
+    MESSAGE_REASONS = {
+        "SEVERE": "Vakava sääntörikkomus havaittu (esim. vihapuhe tai suora solvaus).",
+        "MODERATE": "Keskivakava rikkomus havaittu (esim. kiroilu tai epäkohtelias käytös).",
+        "MINOR": "Lievä huomautus sääntöjen noudattamisesta.",
+        "OK": "Viesti on asiallinen."
+    }
+    
+    NICKNAME_REASONS = {
+        "SEVERE": "Sopimaton tai sääntöjen vastainen nimimerkki.",
+        "MODERATE": "Huomautus nimimerkistä (sisältää mahdollisesti kirosanoja tms).",
+        "MINOR": "Nimimerkki saattaa vaatia tarkistusta.",
+        "OK": "Nimimerkki on asiallinen."
+    }
+    
+    ACTIONS = {
+        "SEVERE": "/banaddress {ip} 9999999 {full_name}",
+        "MODERATE": "/kick {index}",
+        "MINOR": "Varoitus",
+        "OK": "Ei toimenpiteitä"
+    }
+    
+    def __init__(
+        self,
+        model_path: str = "models/violation_model.joblib",
+        batch_size: int = 1,
+        batch_wait_ms: float = 2.0,
+        cache_size: int = 0,
+        engine: str = "sklearn",
+        reload_interval: float = 0.0
+    ):
         """
         Initialize the ML analyzer
         
         Args:
-            model_path: Path to the trained joblib model
+            model_path: Path to the trained joblib model (its manifest, if any, selects the version)
+            batch_size: Batch predictions from concurrent callers up to this size (1 = no batching)
+            batch_wait_ms: Maximum time a prediction waits for a batch to fill
+            cache_size: Number of normalized texts whose prediction is cached (0 = no cache)
+            engine: "sklearn" for the joblib pipeline, "numpy" for the compiled .npz
+                    exported next to it (falls back to sklearn if it is missing)
+            reload_interval: Seconds between checks for a new model version in a
+                             background thread (0 = only on reload_now())
         """
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Model file not found at {model_path}. Run train_model.py first.")
+        self.base_path = model_path
+        self.engine = engine
+        self._cache_size = cache_size
+        self._cache = SessionCache(max_size=cache_size, ttl=float('inf')) if cache_size > 0 else None
+        self._stats_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        self._warned_no_compiled = False
+        version, path, engine = self._resolve_model()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found at {path}. Run train_model.py first.")
+        
+        self._reload_lock = threading.Lock()
+        self.model_version = None
+        self.model_path = None
+        self.model_load_ms = 0.0
+        self._model_signature = None
+        self._swap_model(version, path, engine)
+        
+        self._batcher = BatchPredictor(self.predict_batch, batch_size, batch_wait_ms) if batch_size > 1 else None
         
-        self.model = joblib.load(model_path)
+        self._reload_wakeup = threading.Event()
+        self._stopped = False
+        if reload_interval > 0:
+            threading.Thread(
+                target=self._watch, args=(reload_interval,), name="ModelWatcher", daemon=True
+            ).start()
     
-    def analyze_message(self, player_name: str, message: str) -> AnalysisResult:
-        """
-        Analyze a chat message for rule violations
+    def _resolve_model(self) -> tuple:
+        """(version, path, engine) of the model that should be active"""
+        manifest = read_manifest(self.base_path)
+        version = manifest['version'] if manifest else None
+        joblib_path = manifest['joblib'] if manifest else self.base_path
+        compiled_path = manifest['npz'] if manifest else os.path.splitext(self.base_path)[0] + ".npz"
+        
+        if self.engine == "numpy":
+            if compiled_path and os.path.exists(compiled_path):
+                return version, compiled_path, "numpy"
+            if not self._warned_no_compiled:
+                log.warning(f"⚠️ Käännettyä mallia ei löydy ({compiled_path}), käytetään sklearn-mallia")
+                self._warned_no_compiled = True
+        return version, joblib_path, "sklearn"
+    
+    @staticmethod
+    def _file_signature(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+            return (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    def _swap_model(self, version: Optional[str], path: str, engine: str):
+        """Load a model file and make it the active one, the old model serves until then"""
+        signature = self._file_signature(path)
+        start = time.perf_counter()
+        model = CompiledModel.load(path) if engine == "numpy" else joblib.load(path)
+        self._install(model, version, path, signature, (time.perf_counter() - start) * 1000)
+    
+    def _install(self, model, version: Optional[str], path: Optional[str], signature: Optional[tuple], load_ms: float):
+        # A single reference assignment, predictions in flight keep the old model
+        self.model = model
+        self.model_version = version
+        self.model_path = path
+        self.model_load_ms = load_ms
+        self._model_signature = signature
+        if self._cache is not None:
+            # New object instead of clear(), see _predict
+            self._cache = SessionCache(max_size=self._cache_size, ttl=float('inf'))
+    
+    def set_model(self, model, version: str):
+        """Swap in an in-memory model (used by the online learner)"""
+        with self._reload_lock:
+            self._install(model, version, None, None, 0.0)
+    
+    def check_for_update(self) -> bool:
         """
-        prediction = self.model.predict([message])[0]
+        Load a newer model version if one was published
         
-        reasons = {
-            "SEVERE": "Vakava sääntörikkomus havaittu (esim. vihapuhe tai suora solvaus).",
-            "MODERATE": "Keskivakava rikkomus havaittu (esim. kiroilu tai epäkohtelias käytös).",
-            "MINOR": "Lievä huomautus sääntöjen noudattamisesta.",
-            "OK": "Viesti on asiallinen."
+        Returns:
+            True if the model was swapped
+        """
+        with self._reload_lock:
+            version, path, engine = self._resolve_model()
+            signature = self._file_signature(path)
+            if signature is None or (signature == self._model_signature and version == self.model_version):
+                return False
+            try:
+                self._swap_model(version, path, engine)
+            except Exception as e:
+                log.error(f"❌ ML-mallin lataus epäonnistui ({path}): {e}")
+                return False
+        log.info(f"🔄 ML-malli vaihdettu: versio {self.model_version or 'tuntematon'} "
+                 f"({os.path.basename(path)}, ladattu {self.model_load_ms:.0f} ms)")
+        return True
+    
+    def reload_now(self) -> dict:
+        """Check for a new model version immediately (e.g. after !train) and report the active one"""
+        self.check_for_update()
+        return self.model_info()
+    
+    def model_info(self) -> dict:
+        """Active model version, file and load time"""
+        return {
+            "version": self.model_version,
+            "path": self.model_path,
+            "engine": "numpy" if isinstance(self.model, CompiledModel) else "sklearn",
+            "load_ms": self.model_load_ms
         }
-        
-        actions = {
-            "SEVERE": "/banaddress {ip} 9999999 {full_name}",
-            "MODERATE": "/kick {index}",
-            "MINOR": "Varoitus",
-            "OK": "Ei toimenpiteitä"
+    
+    def _watch(self, interval: float):
+        while not self._stopped:
+            self._reload_wakeup.wait(interval)
+            self._reload_wakeup.clear()
+            if self._stopped:
+                break
+            try:
+                self.check_for_update()
+            except Exception as e:
+                log.error(f"❌ Virhe ML-mallin päivitystarkistuksessa: {e}")
+    
+    def close(self):
+        """Stop the reload watcher and the batching thread"""
+        self._stopped = True
+        self._reload_wakeup.set()
+        if self._batcher:
+            self._batcher.close()
+    
+    def cache_stats(self) -> dict:
+        """Prediction cache counters"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._cache) if self._cache is not None else 0,
+            "hit_rate": self.cache_hits / total if total else 0.0
         }
+    
+    def predict_batch(self, texts: List[str]) -> List[str]:
+        """Predict labels for many texts with a single model call"""
+        return list(self.model.predict(texts))
+    
+    def _predict_uncached(self, text: str) -> str:
+        if self._batcher:
+            return self._batcher.predict(text)
+        return self.model.predict([text])[0]
+    
+    def _predict(self, text: str) -> str:
+        # Taken once: after a model swap the old cache only receives stale results
+        cache = self._cache
+        if cache is None:
+            return self._predict_uncached(text)
+        
+        key = normalize_text(text)
+        label = cache.get(key)
+        if label is not None:
+            with self._stats_lock:
+                self.cache_hits += 1
+            return label
         
+        with self._stats_lock:
+            self.cache_misses += 1
+        label = self._predict_uncached(text)
+        cache[key] = label
+        return label
+    
+    def _result(self, prediction: str, reasons: dict) -> AnalysisResult:
         return AnalysisResult(
             level=prediction,
             reason=reasons.get(prediction, "Tuntematon rikkomus"),
-            suggested_action=actions.get(prediction, "Ei toimenpiteitä")
+            suggested_action=self.ACTIONS.get(prediction, "Ei toimenpiteitä")
         )
+    
+    def analyze_message(self, player_name: str, message: str) -> AnalysisResult:
+        """
+        Analyze a chat message for rule violations
+        """
+        return self._result(self._predict(message), self.MESSAGE_REASONS)
 
     def analyze_nickname(self, nickname: str) -> AnalysisResult:
         """
         Analyze a player nickname for rule violations
         """
-        prediction = self.model.predict([nickname])[0]
-        
-        reasons = {
-            "SEVERE": "Sopimaton tai sääntöjen vastainen nimimerkki.",
-            "MODERATE": "Huomautus nimimerkistä (sisältää mahdollisesti kirosanoja tms).",
-            "MINOR": "Nimimerkki saattaa vaatia tarkistusta.",
-            "OK": "Nimimerkki on asiallinen."
-        }
-        
-        actions = {
-            "SEVERE": "/banaddress {ip} 9999999 {full_name}",
-            "MODERATE": "/kick {index}",
-            "MINOR": "Varoitus",
-            "OK": "Ei toimenpiteitä"
-        }
-        
-        return AnalysisResult(
-            level=prediction,
-            reason=reasons.get(prediction, "Tuntematon rikkomus"),
-            suggested_action=actions.get(prediction, "Ei toimenpiteitä")
-        )
+        return self._result(self._predict(nickname), self.NICKNAME_REASONS)
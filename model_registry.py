@@ -0,0 +1,168 @@
+"""
+Model Registry
+Versioned model files in models/. Every training run publishes
+violation_model-<version>.joblib (+ .npz) and then atomically replaces the
+manifest violation_model.json that points to the active version, so a
+reader never sees a half-written model.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Optional, Dict, Any
+
+import joblib
+
+from compiled_model import export_pipeline
+
+
+def _fsync_replace(tmp_path: str, path: str):
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def manifest_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def read_manifest(model_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the manifest next to model_path
+
+    Returns:
+        Manifest with absolute 'joblib'/'npz' paths, or None if there is none
+    """
+    path = manifest_path(model_path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    directory = os.path.dirname(path)
+    for key in ('joblib', 'npz'):
+        if manifest.get(key):
+            manifest[key] = os.path.join(directory, manifest[key])
+    return manifest
+
+
+def _version_key(version: str) -> tuple:
+    """Sort key of "<timestamp>[-<n>]": "...-10" of the same second is newer than "...-2" """
+    date, _, rest = version.partition("-")
+    clock, _, n = rest.partition("-")
+    return (date, clock, int(n) if n.isdigit() else 1)
+
+
+def _new_version(directory: str, base: str) -> str:
+    """
+    Pick a version newer than every one on disk and reserve it by creating
+    its .joblib, so parallel publishers differ. A pruned name is never reused.
+    """
+    version = time.strftime("%Y%m%d-%H%M%S")
+    prefix = f"{base}-"
+    same_second = [_version_key(os.path.splitext(name)[0][len(prefix):])[2]
+                   for name in os.listdir(directory)
+                   if name.startswith(f"{prefix}{version}") and name.endswith(".joblib")]
+    n = max(same_second, default=0) + 1
+    while True:
+        candidate = version if n == 1 else f"{version}-{n}"
+        try:
+            os.close(os.open(os.path.join(directory, f"{base}-{candidate}.joblib"),
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            n += 1
+
+
+def _temp_path(directory: str, base: str) -> str:
+    """A new unique temporary name in directory (the file itself is not kept)"""
+    fd, path = tempfile.mkstemp(dir=directory, prefix=f".{base}-", suffix=".tmp")
+    os.close(fd)
+    os.remove(path)
+    return path
+
+
+def publish_model(pipeline, model_path: str = "models/violation_model.joblib",
+                  accuracy: Optional[float] = None, keep: int = 3, compiled: bool = True) -> str:
+    """
+    Write a new model version and make it the active one
+
+    Args:
+        pipeline: Fitted TF-IDF + LogisticRegression pipeline
+        model_path: Unversioned model path, kept as a copy of the active version
+        accuracy: Test accuracy stored in the manifest
+        keep: How many versions to keep on disk
+        compiled: Also write the .npz. Without it the "numpy" engine falls back to the joblib model.
+
+    Returns:
+        The published version string
+    """
+    directory = os.path.dirname(model_path) or "."
+    base = os.path.splitext(os.path.basename(model_path))[0]
+    os.makedirs(directory, exist_ok=True)
+    version = _new_version(directory, base)
+
+    joblib_name = f"{base}-{version}.joblib"
+    npz_name = f"{base}-{version}.npz"
+    # Unique per call: two publishers (detector and the CLI) may run at once
+    tmp = _temp_path(directory, base)
+
+    try:
+        joblib.dump(pipeline, tmp)
+        _fsync_replace(tmp, os.path.join(directory, joblib_name))
+        if compiled:
+            with open(tmp, 'wb') as f:
+                export_pipeline(pipeline, f)
+            _fsync_replace(tmp, os.path.join(directory, npz_name))
+        else:
+            npz_name = None
+            # An older unversioned .npz must not pass for this version
+            try:
+                os.remove(os.path.join(directory, base + ".npz"))
+            except FileNotFoundError:
+                pass
+
+        # Unversioned copies for tools that load models/violation_model.joblib directly
+        for name, ext in ((joblib_name, ".joblib"), (npz_name, ".npz")):
+            if name is None:
+                continue
+            os.link(os.path.join(directory, name), tmp)
+            os.replace(tmp, os.path.join(directory, base + ext))
+
+        manifest = {
+            'version': version,
+            'joblib': joblib_name,
+            'npz': npz_name,
+            'published_at': time.time(),
+            'accuracy': accuracy
+        }
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        _fsync_replace(tmp, manifest_path(model_path))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        reserved = os.path.join(directory, joblib_name)
+        if os.path.exists(reserved) and os.path.getsize(reserved) == 0:
+            os.remove(reserved)
+        raise
+
+    _prune(directory, base, keep)
+    return version
+
+
+def _prune(directory: str, base: str, keep: int):
+    """Delete all but the newest `keep` versions"""
+    prefix = f"{base}-"
+    versions = sorted({
+        os.path.splitext(name)[0][len(prefix):]
+        for name in os.listdir(directory)
+        if name.startswith(prefix) and name.endswith(".joblib")
+    }, key=_version_key)
+    for version in versions[:-keep] if keep > 0 else []:
+        for ext in (".joblib", ".npz"):
+            try:
+                os.remove(os.path.join(directory, f"{prefix}{version}{ext}"))
+            except OSError:
+                pass
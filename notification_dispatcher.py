@@ -0,0 +1,227 @@
+"""
+Notification Dispatcher
+Queues Discord webhook posts and sends them from a worker thread, so the
+log monitors never wait on the network. Honours Discord rate limits (429
+retry_after and the X-RateLimit-Remaining / Reset-After headers), retries
+server and connection errors with exponential backoff and keeps counters
+for queue depth and delivery.
+"""
+
+import queue
+import random
+import threading
+import time
+from typing import Callable
+
+import requests
+
+from logger import log
+
+
+MIN_RATE_LIMIT_WAIT = 0.1
+
+
+class NotificationDispatcher:
+    """Bounded outbound queue for webhook payloads"""
+
+    def __init__(
+        self,
+        session: Callable[[], requests.Session],
+        max_queue: int = 1000,
+        workers: int = 1,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 10.0,
+        max_rate_limit_wait: float = 60.0
+    ):
+        """
+        Args:
+            session: Returns the (pooled) session to post with
+            max_queue: Payloads waiting at most, newer ones are dropped when full
+            workers: Sending threads, they share the rate limit
+            max_retries: Attempts after a 5xx answer or a connection error before giving up
+            backoff: Base delay (s) of the exponential backoff
+            timeout: HTTP timeout (s) of one post
+            max_rate_limit_wait: Total time (s) one payload may wait on 429 answers before it is given up,
+                every 429 counts at least MIN_RATE_LIMIT_WAIT
+        """
+        self._session = session
+        self.max_queue = max_queue
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_rate_limit_wait = max_rate_limit_wait
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._rate_lock = threading.Lock()
+        self._blocked_until = 0.0
+        self._warned_at = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.max_depth = 0
+        self.last_latency_ms = 0.0
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, daemon=True, name=f"Notifier-{i}")
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, url: str, payload: dict) -> bool:
+        """
+        Queue a payload for the webhook, never blocks
+
+        Returns:
+            False if the queue was full and the payload was dropped
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((url, payload, time.monotonic()))
+        except queue.Full:
+            self.dropped += 1
+            log.error(f"❌ Ilmoitusjono täynnä ({self.max_queue}), Discord-ilmoitus hylätty")
+            return False
+        depth = self._queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        if depth >= 0.8 * self.max_queue and time.monotonic() - self._warned_at > 60:
+            self._warned_at = time.monotonic()
+            log.warning(f"⚠️ Ilmoitusjonossa {depth} viestiä, Discord ei ehdi perässä")
+        return True
+
+    def stats(self) -> dict:
+        """Queue depth and delivery counters"""
+        return {
+            'depth': self._queue.qsize(),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'last_latency_ms': self.last_latency_ms,
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None or self._stop.is_set():
+                    return
+                self._deliver(*item)
+            except Exception as e:
+                self.failed += 1
+                log.error(f"❌ Virhe Discord-ilmoituksen lähetyksessä: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _wait_rate_limit(self) -> bool:
+        """Sleep until the shared rate limit allows a post, False when stopping"""
+        while True:
+            with self._rate_lock:
+                delay = self._blocked_until - time.monotonic()
+            if delay <= 0:
+                return True
+            if self._stop.wait(delay):
+                return False
+
+    def _block_for(self, seconds: float):
+        with self._rate_lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        try:
+            return float(response.json().get('retry_after'))
+        except Exception:
+            pass
+        try:
+            return float(response.headers.get('Retry-After', 1.0))
+        except ValueError:
+            return 1.0
+
+    def _deliver(self, url: str, payload: dict, enqueued_at: float):
+        attempt = 0
+        rate_limit_waited = 0.0
+        while True:
+            if not self._wait_rate_limit():
+                self.failed += 1
+                return
+            try:
+                response = self._session().post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                response = None
+                error = str(e)
+            else:
+                error = f"HTTP {response.status_code}"
+
+                # Bucket empty after this post: wait for the reset before the next one
+                if response.headers.get('X-RateLimit-Remaining') == "0":
+                    try:
+                        self._block_for(float(response.headers.get('X-RateLimit-Reset-After', 0)))
+                    except ValueError:
+                        pass
+
+                if response.status_code == 429:
+                    retry_after = self._retry_after(response)
+                    self.rate_limited += 1
+                    # 429s do not use up max_retries, but they share a budget of their own
+                    rate_limit_waited += max(retry_after, MIN_RATE_LIMIT_WAIT)
+                    if rate_limit_waited > self.max_rate_limit_wait:
+                        self.failed += 1
+                        log.error(f"❌ Discord-ilmoitus hylätty, rajoitusta odotettu yli {self.max_rate_limit_wait:.0f} s")
+                        return
+                    log.warning(f"⏳ Discord rajoittaa ilmoituksia, odotetaan {retry_after:.1f} s")
+                    self._block_for(retry_after)
+                    continue
+                if response.status_code < 400:
+                    self.sent += 1
+                    self.last_latency_ms = (time.monotonic() - enqueued_at) * 1000
+                    return
+                if response.status_code < 500:
+                    self.failed += 1
+                    log.error(f"❌ Discord hylkäsi ilmoituksen: {error} {response.text[:200]}")
+                    return
+
+            if attempt >= self.max_retries:
+                self.failed += 1
+                log.error(f"❌ Discord-ilmoitus epäonnistui {attempt + 1} yrityksen jälkeen: {error}")
+                return
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            self.retries += 1
+            if self._stop.wait(delay):
+                self.failed += 1
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Send what is queued (for at most `timeout` seconds) and stop the workers"""
+        if not self._threads:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        pending = self._queue.qsize()
+        if pending:
+            log.warning(f"⚠️ {pending} Discord-ilmoitusta jäi lähettämättä")
+        self._stop.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
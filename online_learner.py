@@ -0,0 +1,296 @@
+"""
+Online Learner
+Incremental training mode: a hashed char n-gram SGD classifier that folds
+moderator decisions into the live model within seconds (partial_fit) and is
+periodically refit from the whole training data.
+"""
+
+import copy
+import os
+import random
+from collections import Counter
+import threading
+import time
+from typing import Callable, Dict, List, Tuple, Optional
+
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from logger import log
+from training_store import open_store
+
+
+CLASSES = ["MINOR", "MODERATE", "OK", "SEVERE"]
+
+
+def make_vectorizer(n_features: int = 2 ** 18) -> HashingVectorizer:
+    """Stateless counterpart of train_model.py's TfidfVectorizer(char_wb, 2-5)"""
+    return HashingVectorizer(analyzer='char_wb', ngram_range=(2, 5), n_features=n_features, alternate_sign=False)
+
+
+def make_classifier() -> SGDClassifier:
+    return SGDClassifier(loss='log_loss', alpha=1e-6, max_iter=10, tol=None, random_state=42)
+
+
+def balanced_class_weights(labels: List[str]) -> Dict[str, float]:
+    """n_samples / (n_classes * n_label) per label, as sklearn's class_weight='balanced'"""
+    counts = Counter(labels)
+    return {label: len(labels) / (len(counts) * n) for label, n in counts.items()}
+
+
+def load_training_data(store_path: str) -> Tuple[List[str], List[str]]:
+    store = open_store(store_path)
+    try:
+        return store.load()
+    finally:
+        store.close()
+
+
+class OnlineLearner:
+    """Keeps MLAnalyzer's model current with moderator decisions"""
+
+    def __init__(
+        self,
+        analyzer,
+        store_path: str = "data/training.db",
+        state_path: str = "models/online_model.joblib",
+        update_interval: float = 5.0,
+        full_retrain_hours: float = 24.0,
+        new_sample_weight: float = 5.0,
+        replay_size: int = 2000,
+        replay_per_update: int = 64,
+        n_features: int = 2 ** 18
+    ):
+        """
+        Args:
+            analyzer: MLAnalyzer whose model is replaced after every update
+            store_path: Training store used for full retrains
+            state_path: Where the classifier is saved between restarts
+            update_interval: Seconds between folding pending samples into the model
+            full_retrain_hours: Hours between full refits (0 = never)
+            new_sample_weight: Weight of a moderator decision relative to old data
+            replay_size: Old samples kept to mix into each update against drift
+            replay_per_update: Replayed samples per update
+            n_features: Hashing space size
+        """
+        self.analyzer = analyzer
+        self.store_path = store_path
+        self.state_path = state_path
+        self.update_interval = update_interval
+        self.full_retrain_hours = full_retrain_hours
+        self.new_sample_weight = new_sample_weight
+        self.replay_size = replay_size
+        self.replay_per_update = replay_per_update
+
+        self.vectorizer = make_vectorizer(n_features)
+        self.classifier: Optional[SGDClassifier] = None
+        self.generation = 0
+        self.samples_learned = 0
+        self.last_full_retrain = 0.0
+        self.last_update_ms = 0.0
+        # Per-label weights of the last full retrain, partial_fit cannot use class_weight='balanced'
+        self.class_weights: Dict[str, float] = {}
+
+        self._pending: List[Tuple[str, str]] = []
+        self._replay: List[Tuple[str, str]] = []
+        self._replay_seen = 0
+        self._rng = random.Random(42)
+        self._lock = threading.Lock()
+        # Serialises incremental updates and full retrains
+        self._model_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Load or build the model and start folding in samples in the background"""
+        self._thread = threading.Thread(target=self._run, name="OnlineLearner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def learn(self, text: str, label: str):
+        """Queue a labelled sample (called for every moderator decision)"""
+        if label not in CLASSES:
+            return
+        with self._lock:
+            self._pending.append((text, label))
+
+    def _run(self):
+        try:
+            if not self.load():
+                self.full_retrain()
+        except Exception as e:
+            log.error(f"❌ Online-mallin alustus epäonnistui: {e}")
+            return
+
+        while not self._stopped:
+            self._wakeup.wait(self.update_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            try:
+                self.apply_pending()
+                due = self.last_full_retrain + self.full_retrain_hours * 3600
+                if self.full_retrain_hours > 0 and time.time() >= due:
+                    self.full_retrain()
+            except Exception as e:
+                log.error(f"❌ Virhe online-oppimisessa: {e}")
+
+    def _remember(self, samples: List[Tuple[str, str]]):
+        """Reservoir sampling, the replay buffer stays a uniform sample of everything seen"""
+        for sample in samples:
+            self._replay_seen += 1
+            if len(self._replay) < self.replay_size:
+                self._replay.append(sample)
+            else:
+                j = self._rng.randrange(self._replay_seen)
+                if j < self.replay_size:
+                    self._replay[j] = sample
+
+    def apply_pending(self) -> int:
+        """
+        Fold queued samples into a copy of the classifier and swap it in
+
+        Returns:
+            Number of new samples learned
+        """
+        if self.classifier is None:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        with self._model_lock:
+            return self._apply(pending)
+
+    def _apply(self, pending: List[Tuple[str, str]]) -> int:
+        start = time.perf_counter()
+        replay = self._rng.sample(self._replay, min(self.replay_per_update, len(self._replay)))
+        texts = [t for t, _ in pending] + [t for t, _ in replay]
+        labels = [l for _, l in pending] + [l for _, l in replay]
+        weights = ([self.new_sample_weight * self.class_weights.get(l, 1.0) for l in labels[:len(pending)]] +
+                   [self.class_weights.get(l, 1.0) for l in labels[len(pending):]])
+
+        # The live classifier is never mutated, predictions keep using it until the swap
+        classifier = copy.deepcopy(self.classifier)
+        classifier.partial_fit(self.vectorizer.transform(texts), labels, classes=CLASSES, sample_weight=weights)
+        self.classifier = classifier
+        self._remember(pending)
+        self.samples_learned += len(pending)
+        self.last_update_ms = (time.perf_counter() - start) * 1000
+        self._publish()
+
+        log.info(f"🧠 Online-malli päivitetty {len(pending)} uudella näytteellä ({self.last_update_ms:.0f} ms)")
+        return len(pending)
+
+    def full_retrain(
+        self,
+        min_accuracy: Optional[float] = None,
+        progress: Callable[[str], None] = lambda line: None
+    ) -> Optional[dict]:
+        """
+        Refit from the whole training data, pending samples are applied on top afterwards
+
+        Args:
+            min_accuracy: If given, fit on 80 % of the data and install the model only
+                if it reaches this accuracy on the other 20 % (as train_model.py does)
+            progress: Receives a line of text after every step
+
+        Returns:
+            rows, fit_seconds, accuracy, published and version, or None without data
+        """
+        with self._model_lock:
+            start = time.perf_counter()
+            texts, labels = load_training_data(self.store_path)
+            if not texts:
+                progress("Training data not found. Run generate_training_data.py first.")
+                return None
+            progress(f"Loaded {len(texts)} rows from {self.store_path} in {time.perf_counter() - start:.2f} s")
+
+            train_texts, train_labels = texts, labels
+            if min_accuracy is not None:
+                train_texts, test_texts, train_labels, test_labels = train_test_split(
+                    texts, labels, test_size=0.2, random_state=42
+                )
+            progress(f"Training online model on {len(train_texts)} rows...")
+            fit_start = time.perf_counter()
+            class_weights = balanced_class_weights(train_labels)
+            classifier = make_classifier()
+            classifier.fit(self.vectorizer.transform(train_texts), train_labels,
+                           sample_weight=[class_weights[l] for l in train_labels])
+            fit_seconds = time.perf_counter() - fit_start
+            progress(f"Model trained in {fit_seconds:.1f} s")
+
+            result = {'rows': len(texts), 'fit_seconds': fit_seconds, 'accuracy': None,
+                      'published': False, 'version': None}
+            if min_accuracy is not None:
+                accuracy = classifier.score(self.vectorizer.transform(test_texts), test_labels)
+                result['accuracy'] = accuracy
+                progress(f"Model accuracy on test set: {accuracy:.4f}")
+                if accuracy < min_accuracy:
+                    progress(f"Accuracy below the threshold {min_accuracy:.4f}, model not published")
+                    return result
+
+            self.classifier = classifier
+            self.class_weights = class_weights
+            self._replay, self._replay_seen = [], 0
+            self._remember(list(zip(train_texts, train_labels)))
+            self.last_full_retrain = time.time()
+            self._publish()
+            self.save()
+            result.update(published=True, version=f"online-{self.generation}")
+        log.info(f"🧠 Online-malli opetettu alusta: {len(texts)} riviä ({time.perf_counter() - start:.1f} s)")
+        return result
+
+    def _publish(self):
+        self.generation += 1
+        pipeline = Pipeline([('hash', self.vectorizer), ('clf', self.classifier)])
+        self.analyzer.set_model(pipeline, version=f"online-{self.generation}")
+
+    def load(self) -> bool:
+        """Restore the classifier saved by a previous run"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            state = joblib.load(self.state_path)
+            self.classifier = state['classifier']
+            self._replay = state['replay']
+            self._replay_seen = state['replay_seen']
+            self.samples_learned = state['samples_learned']
+            self.last_full_retrain = state['last_full_retrain']
+            self.class_weights = state.get('class_weights', {})
+        except Exception as e:
+            log.warning(f"⚠️ Online-mallin lataus epäonnistui ({self.state_path}): {e}")
+            return False
+        self._publish()
+        log.info(f"🧠 Online-malli ladattu ({self.samples_learned} opittua näytettä)")
+        return True
+
+    def save(self):
+        """Atomically save the classifier and replay buffer"""
+        if not self.state_path or self.classifier is None:
+            return
+        state = {
+            'classifier': self.classifier,
+            'replay': list(self._replay),
+            'replay_seen': self._replay_seen,
+            'samples_learned': self.samples_learned,
+            'last_full_retrain': self.last_full_retrain,
+            'class_weights': self.class_weights
+        }
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            joblib.dump(state, tmp_path)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            log.error(f"❌ Virhe online-mallin tallennuksessa: {e}")
@@ -0,0 +1,231 @@
+"""
+Retention
+Keeps violations.db to the last `keep_days` days. A low-priority background
+thread copies older rows to compressed monthly files
+(data/violations_archive/violations-YYYY-MM.jsonl.gz), deletes them from the
+database in small writer transactions (full-text entries and rollups are
+adjusted in the same transaction) and gives the freed pages back with an
+incremental vacuum. Each chunk is queued behind the inserts on the writer
+thread, so a monitor never waits more than one chunk for its commit.
+
+Rows are written to the archive and synced before they are deleted. A crash
+between the two repeats that chunk on the next pass; read_archive() skips
+the repeated ids.
+
+Usage:
+    python retention.py run --days 90
+    python retention.py vacuum      # once, with the detector stopped
+    python retention.py read data/violations_archive/violations-2026-01.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+from database import Database
+from logger import log
+
+
+def _month(epoch: int) -> str:
+    return time.strftime("%Y-%m", time.localtime(epoch))
+
+
+def write_archive(path: str, rows: List[dict]):
+    """Append rows to a monthly file as one gzip member and sync it to disk"""
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+            gz.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def read_archive(path: str) -> Iterator[dict]:
+    """Rows of a monthly archive file, each id once"""
+    seen = set()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                yield row
+
+
+class RetentionJob:
+    """Moves violations older than keep_days to monthly archive files"""
+
+    def __init__(
+        self,
+        db: Database,
+        keep_days: int = 90,
+        archive_dir: str = "data/violations_archive",
+        interval: float = 3600.0,
+        chunk_size: int = 500,
+        pause: float = 0.05,
+        vacuum_pages: int = 1000
+    ):
+        """
+        Args:
+            db: Database to trim
+            keep_days: Days of violations kept in the database
+            archive_dir: Directory of the monthly .jsonl.gz files
+            interval: Seconds between passes
+            chunk_size: Rows archived and deleted per writer transaction
+            pause: Seconds between chunks, longer while inserts are queued
+            vacuum_pages: Pages freed per incremental vacuum step
+        """
+        self.db = db
+        self.keep_days = keep_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warned_vacuum = False
+
+        self.archived = 0
+        self.passes = 0
+        self.last_pass: Optional[dict] = None
+
+    def start(self):
+        """Run a pass now and then every `interval` seconds on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="Retention")
+            self._thread.start()
+
+    def _loop(self):
+        try:
+            # Linux nices single threads; archiving may take its time, the monitors may not
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                log.error(f"❌ Virhe rikkomusten arkistoinnissa: {e}")
+            self._stop.wait(self.interval)
+
+    def _yield_to_writer(self) -> bool:
+        """Sleep between chunks, longer while inserts are waiting. False when stopping."""
+        delay = self.pause
+        while not self._stop.wait(delay):
+            if self.db.pending_writes() < self.db.batch_size:
+                return True
+            delay = max(self.pause, 0.1)
+        return False
+
+    def run_once(self) -> dict:
+        """
+        Archive and delete every row older than keep_days, then vacuum
+
+        Returns:
+            archived rows, files written, free pages left (None without incremental auto_vacuum), seconds
+        """
+        start = time.perf_counter()
+        cutoff = int(time.time()) - self.keep_days * 86400
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived = 0
+        files = set()
+        while not self._stop.is_set():
+            rows = self.db.get_violations_before(cutoff, self.chunk_size)
+            if not rows:
+                break
+            by_month: Dict[str, List[dict]] = defaultdict(list)
+            for row in rows:
+                by_month[_month(row["event_time"])].append(row)
+            for month, month_rows in by_month.items():
+                path = os.path.join(self.archive_dir, f"violations-{month}.jsonl.gz")
+                write_archive(path, month_rows)
+                files.add(path)
+            deleted = self.db.delete_violations([row["id"] for row in rows])
+            archived += deleted
+            self.archived += deleted
+            if deleted == 0 or not self._yield_to_writer():
+                break
+
+        free_pages = self.db.incremental_vacuum(self.vacuum_pages)
+        while free_pages and not self._stop.is_set() and self._yield_to_writer():
+            left = self.db.incremental_vacuum(self.vacuum_pages)
+            if left >= free_pages:
+                break
+            free_pages = left
+        if free_pages is None and archived and not self._warned_vacuum:
+            self._warned_vacuum = True
+            log.warning("⚠️ violations.db ei ole incremental auto_vacuum -tilassa, vapautuneet sivut käytetään "
+                        "uudelleen mutta tiedosto ei pienene. Aja kerran: python retention.py vacuum")
+
+        self.passes += 1
+        self.last_pass = {
+            'archived': archived,
+            'files': sorted(files),
+            'free_pages': free_pages,
+            'seconds': time.perf_counter() - start,
+        }
+        if archived:
+            log.info(f"🗄️ Arkistoitiin {archived} yli {self.keep_days} päivää vanhaa rikkomusta "
+                     f"({len(files)} tiedostoa, {self.last_pass['seconds']:.1f} s)")
+        return self.last_pass
+
+    def close(self, timeout: float = 5.0):
+        """Stop after the current chunk"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+def vacuum_offline(db_path: str):
+    """Full VACUUM that switches an existing file to auto_vacuum=INCREMENTAL. Rewrites the whole file."""
+    conn = sqlite3.connect(db_path)
+    try:
+        before = os.path.getsize(db_path)
+        start = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{db_path}: {before / 1e6:.1f} MB -> {os.path.getsize(db_path) / 1e6:.1f} MB "
+              f"in {time.perf_counter() - start:.1f} s, auto_vacuum={conn.execute('PRAGMA auto_vacuum').fetchone()[0]}")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="violations.db retention")
+    parser.add_argument("--db", default="data/violations.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Archive and delete old rows once")
+    run.add_argument("--days", type=int, default=90)
+    run.add_argument("--archive-dir", default="data/violations_archive")
+    sub.add_parser("vacuum", help="Switch to incremental auto_vacuum (detector stopped)")
+    read = sub.add_parser("read", help="Print an archive file as JSON lines")
+    read.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        db = Database(args.db)
+        try:
+            result = RetentionJob(db, args.days, args.archive_dir).run_once()
+        finally:
+            db.close()
+        print(f"{result['archived']} rows archived in {result['seconds']:.1f} s, free pages {result['free_pages']}")
+        for path in result["files"]:
+            print(f"  {path}")
+    elif args.command == "vacuum":
+        vacuum_offline(args.db)
+    else:
+        for row in read_archive(args.path):
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
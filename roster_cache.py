@@ -0,0 +1,141 @@
+"""
+Roster Cache
+Live player slots (name -> "[index]" on Admin.html) per PP2 admin server.
+One Admin.html download serves every lookup until the roster is older than
+the refresh interval or the playlog shows a join or leave. Concurrent
+lookups of a stale roster share a single download.
+"""
+
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+ROW_PATTERN = re.compile(r"\[(\d+)\]\s+([^<\r\n]+)")
+
+
+class RosterSnapshot(NamedTuple):
+    """One parsed Admin.html page"""
+    names: Dict[str, str]           # lower-cased name -> index
+    rows: List[Tuple[str, str]]     # (index, lower-cased row text) in page order
+    loaded_at: float
+    version: int
+
+
+def parse_roster(html: str, version: int = 0) -> RosterSnapshot:
+    """
+    Index every "[n] text" row of an admin page. A row is reachable by each
+    whitespace-delimited prefix of its text ("[3] Kalamies (0 kills)" by
+    "kalamies", "kalamies (0" ...), the first row in page order wins.
+    """
+    names: Dict[str, str] = {}
+    rows: List[Tuple[str, str]] = []
+    for match in ROW_PATTERN.finditer(html):
+        index = match.group(1)
+        text = match.group(2).strip().lower()
+        rows.append((index, text))
+        words = text.split()
+        for end in range(1, len(words) + 1):
+            names.setdefault(" ".join(words[:end]), index)
+    return RosterSnapshot(names, rows, time.monotonic(), version)
+
+
+class _ServerRoster:
+    def __init__(self):
+        self.snapshot: Optional[RosterSnapshot] = None
+        self.version = 0
+        self.fetch_lock = threading.Lock()
+
+
+class RosterCache:
+    """Cached name -> slot index lookups for every admin server"""
+
+    def __init__(
+        self,
+        fetch: Callable[[dict], Optional[str]],
+        refresh_interval: float = 30.0,
+        miss_refresh: float = 1.0
+    ):
+        """
+        Args:
+            fetch: Downloads the admin page of a server_config, None on failure
+            refresh_interval: Maximum age (s) of a roster before it is downloaded again
+            miss_refresh: A name not found in a roster older than this (s) triggers one re-download
+        """
+        self._fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.miss_refresh = miss_refresh
+        self._servers: Dict[str, _ServerRoster] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.hits = 0
+
+    def _server(self, server_config: dict) -> _ServerRoster:
+        key = server_config.get('admin_url') or ""
+        server = self._servers.get(key)
+        if server is None:
+            with self._lock:
+                server = self._servers.setdefault(key, _ServerRoster())
+        return server
+
+    def _valid(self, server: _ServerRoster, max_age: float) -> bool:
+        snapshot = server.snapshot
+        return (snapshot is not None and snapshot.version == server.version
+                and time.monotonic() - snapshot.loaded_at < max_age)
+
+    def _roster(self, server_config: dict, max_age: float) -> Optional[RosterSnapshot]:
+        server = self._server(server_config)
+        if self._valid(server, max_age):
+            return server.snapshot
+        with server.fetch_lock:
+            # Whoever held the lock may have downloaded a roster for us
+            if self._valid(server, max_age):
+                return server.snapshot
+            version = server.version
+            html = self._fetch(server_config)
+            self.fetches += 1
+            if html is None:
+                return None
+            server.snapshot = parse_roster(html, version)
+            return server.snapshot
+
+    def lookup(self, player_name: str, server_config: dict, max_age: Optional[float] = None) -> Optional[str]:
+        """
+        Slot index of a player on the server
+
+        Args:
+            max_age: Oldest roster (s) to use, default refresh_interval, 0 always downloads it
+
+        Returns:
+            The index as a string, or None if the player is not listed or the page could not be loaded
+        """
+        key = player_name.strip().lower()
+        if not key:
+            return None
+        roster = self._roster(server_config, self.refresh_interval if max_age is None else max_age)
+        if roster is None:
+            return None
+        index = self._find(roster, key)
+        if index is None and time.monotonic() - roster.loaded_at >= self.miss_refresh:
+            roster = self._roster(server_config, self.miss_refresh)
+            index = self._find(roster, key) if roster else None
+        if index is not None:
+            self.hits += 1
+        return index
+
+    @staticmethod
+    def _find(roster: RosterSnapshot, key: str) -> Optional[str]:
+        index = roster.names.get(key)
+        if index is None:
+            # Name inside the row text (clan tags etc.), at most one row per slot
+            for row_index, text in roster.rows:
+                if key in text:
+                    return row_index
+        return index
+
+    def invalidate(self, server_config: dict):
+        """The roster changed (join / leave), the next lookup downloads it again"""
+        server = self._server(server_config)
+        with self._lock:
+            server.version += 1
@@ -0,0 +1,194 @@
+"""
+Player Session Index
+Maps player name -> latest join session (IP, ban command, name with IDs)
+for one server. Built once from playlog.txt with a memory-mapped scan,
+kept current by the playlog monitor and persisted between restarts.
+Only the players who joined most recently are kept (max_players).
+"""
+
+import os
+import re
+import json
+import mmap
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Optional, Dict, Tuple
+from checkpoint_store import Checkpoint, file_fingerprint, resolve_start_offset
+from log_parser import LogParser, PlayerJoinEvent
+from logger import log
+
+
+# Only the join lines are decoded and parsed, the rest of the file stays bytes
+JOIN_LINE_PATTERN = re.compile(rb'-->\s+([^\n]+?)\s+joined the game\s+\(ip:[^\n]*')
+
+
+def _decode(raw: bytes) -> str:
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='replace')
+
+
+class PlayerSessionIndex:
+    """name -> latest session lookup for a single playlog"""
+
+    def __init__(self, playlog_path: str, persist_path: Optional[str] = None, save_every: int = 100,
+                 max_players: int = 50000):
+        """
+        Initialize the index (call load_or_build() before use)
+
+        Args:
+            playlog_path: Path to playlog.txt
+            persist_path: JSON file the index is saved to (optional)
+            save_every: Save after this many incremental updates
+            max_players: Players kept, the one whose last join is oldest is dropped first
+        """
+        self.playlog_path = playlog_path
+        self.persist_path = persist_path
+        self.save_every = save_every
+        self.max_players = max_players
+        self.parser = LogParser()
+
+        # Ordered by last join, oldest first
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._scanned: Optional[Checkpoint] = None
+        # (inode, offset) of the playlog saved by the previous run, joins up to it were handled then
+        self._handled: Optional[Tuple[int, int]] = None
+        self._pending = 0
+
+    @staticmethod
+    def session_from_event(join_event: PlayerJoinEvent) -> dict:
+        return {
+            'ip': join_event.ip_address,
+            'ban_command': join_event.ban_command,
+            'name_with_ids': join_event.name_with_ids
+        }
+
+    def get(self, player_name: str) -> Optional[dict]:
+        """O(1) lookup of the latest known session"""
+        return self._sessions.get(player_name)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _put(self, player_name: str, session: dict):
+        # Caller holds the lock
+        self._sessions[player_name] = session
+        self._sessions.move_to_end(player_name)
+        while len(self._sessions) > self.max_players:
+            self._sessions.popitem(last=False)
+
+    def record(self, join_event: PlayerJoinEvent, position: Optional[Checkpoint] = None) -> bool:
+        """
+        Apply a join seen by the live playlog monitor
+
+        Args:
+            join_event: The join
+            position: Playlog position of the join line (LogTailer.position()). Saved with
+                the sessions, so the next start scans only what came after it.
+
+        Returns:
+            False if the join is at or before the position saved by the previous run,
+            i.e. a line read again after a restart that was already handled
+        """
+        with self._lock:
+            if position is not None and self._handled is not None:
+                inode, offset = self._handled
+                if position.inode == inode and position.offset <= offset:
+                    return False
+                self._handled = None
+            self._put(join_event.player_name, self.session_from_event(join_event))
+            if position is not None:
+                self._scanned = position
+            self._pending += 1
+            due = self._pending >= self.save_every
+        if due:
+            self.save()
+        return True
+
+    def _scan(self, start: int) -> int:
+        """Scan playlog.txt from `start` and apply every join. Returns the end offset."""
+        with open(self.playlog_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > start:
+                with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                    # Remember only the last line per name in order of last join, parse just those
+                    latest: Dict[bytes, bytes] = {}
+                    for match in JOIN_LINE_PATTERN.finditer(mm, start):
+                        name = match.group(1)
+                        latest.pop(name, None)
+                        latest[name] = match.group(0)
+
+                found = []
+                for raw_line in list(latest.values())[-self.max_players:]:
+                    je = self.parser.parse_player_join(_decode(raw_line))
+                    if je:
+                        found.append((je.player_name, self.session_from_event(je)))
+                with self._lock:
+                    for player_name, session in found:
+                        self._put(player_name, session)
+
+            fingerprint, fingerprint_len = file_fingerprint(f.fileno())
+            self._scanned = Checkpoint(size, os.fstat(f.fileno()).st_ino, fingerprint, fingerprint_len, time.time())
+            return size
+
+    def load_or_build(self):
+        """Load the persisted index and catch up with the playlog, or build it from scratch"""
+        if not self.playlog_path or not os.path.exists(self.playlog_path):
+            return
+
+        start_time = time.perf_counter()
+        start = 0
+        if self.persist_path and os.path.exists(self.persist_path):
+            try:
+                with open(self.persist_path, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+                saved = Checkpoint(**raw['playlog'])
+                with open(self.playlog_path, 'rb') as f:
+                    offset = resolve_start_offset(saved, f.fileno())
+                    inode = os.fstat(f.fileno()).st_ino
+                if offset is not None:
+                    # Keep known sessions even if the playlog was rotated
+                    with self._lock:
+                        for player_name, session in raw['sessions'].items():
+                            self._put(player_name, session)
+                    start = offset
+                    if offset:
+                        self._handled = (inode, offset)
+            except Exception as e:
+                log.warning(f"⚠️ Pelaajaindeksin lataus epäonnistui ({self.persist_path}): {e}")
+
+        try:
+            end = self._scan(start)
+        except Exception as e:
+            log.error(f"❌ Virhe pelaajaindeksin rakentamisessa ({self.playlog_path}): {e}")
+            return
+
+        elapsed = time.perf_counter() - start_time
+        log.info(f"🗂️ Pelaajaindeksi valmis: {len(self._sessions)} pelaajaa, "
+                 f"luettu {end - start} tavua ({elapsed:.2f} s)")
+        self.save()
+
+    def save(self):
+        """Atomically write the index to persist_path"""
+        if not self.persist_path or self._scanned is None:
+            return
+        with self._lock:
+            snapshot = {
+                'playlog': asdict(self._scanned),
+                'sessions': dict(self._sessions)
+            }
+            self._pending = 0
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            log.error(f"❌ Virhe pelaajaindeksin tallennuksessa: {e}")
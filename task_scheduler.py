@@ -0,0 +1,166 @@
+"""
+Task Scheduler
+Runs delayed work (welcome messages after a join) on a small fixed pool of
+worker threads. Pending tasks sit in one heap ordered by due time, so a
+burst of joins neither sleeps on the playlog thread nor starts a thread
+per player. Tasks scheduled with a key are coalesced: while one with the
+same key is pending, scheduling it again is a no-op.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from logger import log
+
+
+class DelayedTaskScheduler:
+    """Heap of (due time, task) drained by a bounded worker pool"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 10000, name: str = "Scheduler"):
+        """
+        Args:
+            workers: Threads running due tasks
+            max_pending: Tasks waiting at most, new ones are refused when full
+            name: Thread name prefix
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.name = name
+
+        self._heap: List[Tuple[float, int, Optional[Hashable], Callable, tuple]] = []
+        self._keys: Dict[Hashable, int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._closed = False
+
+        self.scheduled = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        # Called with self._cond held
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, daemon=True, name=f"{self.name}-{i}")
+            thread.start()
+            self._threads.append(thread)
+
+    def schedule(self, delay: float, fn: Callable, *args: Any, key: Optional[Hashable] = None) -> bool:
+        """
+        Run fn(*args) on a worker after `delay` seconds
+
+        Args:
+            delay: Seconds from now, 0 runs as soon as a worker is free
+            key: Coalescing key, the task is dropped if one with the same key is still pending
+
+        Returns:
+            False if the task was coalesced into a pending one or refused
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if key is not None and key in self._keys:
+                self.coalesced += 1
+                return False
+            if len(self._heap) >= self.max_pending:
+                self.rejected += 1
+                log.error(f"❌ Ajastettuja tehtäviä liikaa ({self.max_pending}), tehtävä hylätty")
+                return False
+            self._ensure_started()
+            seq = next(self._seq)
+            heapq.heappush(self._heap, (time.monotonic() + max(delay, 0.0), seq, key, fn, args))
+            if key is not None:
+                self._keys[key] = seq
+            self.scheduled += 1
+            self._cond.notify()
+            return True
+
+    def _next_task(self) -> Optional[Tuple[Callable, tuple]]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._heap:
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        _, seq, key, fn, args = heapq.heappop(self._heap)
+                        if key is not None and self._keys.get(key) == seq:
+                            del self._keys[key]
+                        self._running += 1
+                        return fn, args
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            fn, args = task
+            try:
+                fn(*args)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                log.error(f"❌ Virhe ajastetussa tehtävässä {getattr(fn, '__name__', fn)}: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def pending(self) -> int:
+        """Tasks waiting for their due time or a free worker"""
+        with self._cond:
+            return len(self._heap)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no task is pending or running, including tasks those tasks schedule
+
+        Returns:
+            False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Workers notify when a task finishes, the timeout covers tasks still waiting for their due time
+                self._cond.wait(0.05 if remaining is None else min(remaining, 0.05))
+            return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'pending': len(self._heap),
+                'running': self._running,
+                'scheduled': self.scheduled,
+                'coalesced': self.coalesced,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+    def close(self, timeout: float = 2.0):
+        """Drop pending tasks and stop the workers, running tasks get `timeout` seconds to finish"""
+        with self._cond:
+            self._closed = True
+            dropped = len(self._heap)
+            self._heap.clear()
+            self._keys.clear()
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        if dropped:
+            log.info(f"ℹ️ {dropped} ajastettua tehtävää peruttiin sammutettaessa")
+        for thread in threads:
+            thread.join(timeout=timeout)
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from action_handler import ActionHandler
+from fake_pp2 import FakePP2Server
+from ml_analyzer import AnalysisResult
+from training_store import TrainingStore
+
+
+def server_config(fake, name="srv"):
+    return {"admin_url": fake.admin_url(name), "admin_user": "admin", "admin_password": "pw"}
+
+
+def test_commands_and_roster_share_one_connection():
+    fake = FakePP2Server().start()
+    fake.add_player("srv", "Kalamies")
+    handler = ActionHandler()
+    try:
+        config = server_config(fake)
+        assert handler.get_live_player_index("Kalamies", config) == "0"
+        for i in range(5):
+            assert handler.execute_command(f"/0 Moi ääkköset {i}", config).startswith("/0 Moi ääkköset")
+        assert handler.get_live_player_index("Kalamies", config) == "0"
+        assert fake.requests == 6  # the second lookup uses the cached player list
+        fake.add_player("srv", "Toinen")
+        handler.invalidate_roster(config)
+        assert handler.get_live_player_index("Toinen", config) == "1"
+        assert fake.requests == 7
+        assert fake.connections == 1
+        assert fake.commands[0][2] == "/0 Moi ääkköset 0"
+    finally:
+        handler.close()
+        fake.close()
+
+
+def test_session_per_admin_url():
+    fake = FakePP2Server().start()
+    handler = ActionHandler()
+    try:
+        handler.execute_command("/a", server_config(fake, "one"))
+        handler.execute_command("/b", server_config(fake, "two"))
+        handler.execute_command("/c", server_config(fake, "one"))
+        assert len(handler._admin_sessions) == 2
+        handler.close()
+        assert handler._admin_sessions == {}
+    finally:
+        fake.close()
+
+
+def test_unreachable_server_gives_error_text():
+    fake = FakePP2Server()
+    config = server_config(fake)
+    fake.httpd.server_close()  # nothing listens on the port any more
+    handler = ActionHandler(http_retries=1, http_backoff=0.0)
+    assert handler.get_live_player_index("Kalamies", config) is None
+    assert handler.execute_command("/kick 1", config).startswith("Virhe:")
+    handler.close()
+
+
+class CapturingBot:
+    """Discord bot stand-in, keeps the confirm callback of the last moderation request"""
+    def __init__(self, loop):
+        self.bot = SimpleNamespace(loop=loop)
+        self.confirm = None
+
+    async def send_interaction(self, embed_data, confirm_callback, reject_callback):
+        self.confirm = confirm_callback
+
+
+def test_kick_and_ban_resolve_the_slot_from_a_fresh_roster(tmp_path):
+    fake = FakePP2Server().start()
+    fake.add_player("srv", "Kalamies")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    bot = CapturingBot(loop)
+    handler = ActionHandler(discord_bot=bot, training_store=TrainingStore(str(tmp_path / "training.db")))
+    try:
+        config = server_config(fake)
+        assert handler.get_live_player_index("Kalamies", config) == "0"
+        # Kalamies reconnected to another slot, no join was seen yet and the cached list is stale
+        with fake.lock:
+            fake.rosters["srv"] = ["Toinen", "Kalamies"]
+        analysis = AnalysisResult(level="MODERATE", reason="Kiroilu", suggested_action="kick")
+        for severity in ("MODERATE", "SEVERE"):
+            handler._send_interactive_notification(
+                "srv", config, "Kalamies", "chat", "perkele", analysis, "10.0.0.1", None, "Kalamies"
+            )
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result(5)
+            asyncio.run(bot.confirm(severity))
+        assert [command for _, _, command in fake.commands] == [
+            "/kick 1 0", "/banaddress 10.0.0.1 9999999 Kalamies", "/kick 1"
+        ]
+    finally:
+        handler.close()
+        handler.training_store.close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        fake.close()
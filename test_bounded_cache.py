@@ -0,0 +1,72 @@
+import json
+import time
+import unittest
+
+from bounded_cache import TimeWindowDeduplicator, SessionCache, log_minute
+
+
+class TestTimeWindowDeduplicator(unittest.TestCase):
+    def test_duplicate_within_window(self):
+        dedup = TimeWindowDeduplicator(window_minutes=10)
+        self.assertFalse(dedup.seen("25.01.2026 07:30", "Pelaaja", "moi"))
+        self.assertTrue(dedup.seen("25.01.2026 07:30", "Pelaaja", "moi"))
+        self.assertFalse(dedup.seen("25.01.2026 07:30", "Pelaaja", "moi taas"))
+        self.assertFalse(dedup.seen("25.01.2026 07:31", "Pelaaja", "moi"))
+
+    def test_old_buckets_are_evicted(self):
+        dedup = TimeWindowDeduplicator(window_minutes=5)
+        for minute in range(60):
+            for n in range(100):
+                dedup.seen(f"25.01.2026 07:{minute:02d}", "Pelaaja", str(n))
+        # Only the last 5 minutes are kept
+        self.assertEqual(len(dedup), 5 * 100)
+
+    def test_unparseable_timestamp(self):
+        dedup = TimeWindowDeduplicator()
+        self.assertFalse(dedup.seen("rikki", "Pelaaja", "moi"))
+        self.assertTrue(dedup.seen("rikki", "Pelaaja", "moi"))
+
+    def test_snapshot_is_recognised_after_restart(self):
+        dedup = TimeWindowDeduplicator(window_minutes=5)
+        for minute in range(10):
+            dedup.seen(f"25.01.2026 07:{minute:02d}", "Pelaaja", "moi")
+        snapshot = json.loads(json.dumps(dedup.snapshot()))
+
+        restored = TimeWindowDeduplicator(window_minutes=5)
+        restored.restore(snapshot)
+        self.assertEqual(len(restored), 5)
+        self.assertTrue(restored.seen("25.01.2026 07:09", "Pelaaja", "moi"))
+        self.assertFalse(restored.seen("25.01.2026 07:09", "Pelaaja", "hei"))
+        # Minutes that had left the window stay out of it
+        self.assertFalse(restored.seen("25.01.2026 07:01", "Pelaaja", "moi"))
+
+    def test_log_minute(self):
+        self.assertEqual(log_minute("25.01.2026 07:31") - log_minute("25.01.2026 07:30"), 1)
+        self.assertIsNone(log_minute("2026-01-25"))
+
+
+class TestSessionCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = SessionCache(max_size=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl_expiry(self):
+        cache = SessionCache(ttl=0.05)
+        cache["a"] = {"ip": "1.1.1.1"}
+        self.assertIn("a", cache)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        cache["b"] = 1
+        time.sleep(0.1)
+        cache.purge_expired()
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
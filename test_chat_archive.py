@@ -0,0 +1,94 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from chat_archive import ChatArchive, FRAME_HEADER, _read_frames, replay
+from log_parser import ChatMessage, PlayerJoinEvent
+
+
+def stamp(day, hour, minute=0):
+    return f"{day:02d}.01.2026 {hour:02d}:{minute:02d}"
+
+def epoch(day, hour, minute=0):
+    return int(datetime(2026, 1, day, hour, minute).timestamp())
+
+def fill(archive, server="Main Server", days=(1, 2, 3)):
+    for day in days:
+        for hour in range(24):
+            archive.append_message(server, ChatMessage(stamp(day, hour), "Kalamies", f"moi {day} {hour}"))
+
+def test_scan_returns_records_in_range(tmp_path):
+    archive = ChatArchive(str(tmp_path), frame_records=4, flush_interval=0)
+    fill(archive)
+    archive.append_join("Main Server", PlayerJoinEvent(
+        stamp(2, 12, 30), "Uusi", "10.0.0.1", "2.9", "ban 5", "Uusi#5", "5"))
+    archive.close()
+
+    records = list(archive.scan(epoch(2, 10), epoch(2, 14)))
+    assert [r["message"] for r in records if r["kind"] == "chat"] == [f"moi 2 {h}" for h in range(10, 14)]
+    join = [r for r in records if r["kind"] == "join"]
+    assert join[0]["player_name"] == "Uusi" and join[0]["ip_address"] == "10.0.0.1"
+    assert join[0]["server"] == "Main_Server" and join[0]["t"] == epoch(2, 12, 30)
+    assert len(list(archive.scan(kinds=["chat"]))) == 72
+    assert sorted(os.listdir(tmp_path / "Main_Server")) == [
+        f"2026-01-0{d}.{ext}" for d in (1, 2, 3) for ext in ("idx", "seg")]
+
+def test_servers_are_merged_by_time(tmp_path):
+    archive = ChatArchive(str(tmp_path), flush_interval=0)
+    fill(archive, "A", days=(1,))
+    fill(archive, "B", days=(1,))
+    archive.close()
+    records = list(archive.scan(servers=["A", "B"]))
+    assert [r["t"] for r in records] == sorted(r["t"] for r in records)
+    assert [r["server"] for r in records[:2]] == ["A", "B"]
+    assert len(list(archive.scan(servers=["B"]))) == 24
+
+def test_appends_continue_after_reopen(tmp_path):
+    archive = ChatArchive(str(tmp_path), frame_records=5, flush_interval=0)
+    fill(archive, days=(1,))
+    archive.close()
+    archive = ChatArchive(str(tmp_path), frame_records=5, flush_interval=0)
+    archive.append_message("Main Server", ChatMessage(stamp(1, 23, 59), "Kalamies", "viimeinen"))
+    archive.close()
+    stats = archive.stats()["Main_Server"]
+    assert stats["records"] == 25 and stats["days"] == 1
+    assert list(archive.scan(epoch(1, 23, 30)))[-1]["message"] == "viimeinen"
+
+def test_partial_frame_is_truncated_and_index_rebuilt(tmp_path):
+    archive = ChatArchive(str(tmp_path), frame_records=6, flush_interval=0)
+    fill(archive, days=(1,))
+    archive.close()
+    seg = str(tmp_path / "Main_Server" / "2026-01-01.seg")
+    frames, end = _read_frames(seg)
+    assert len(frames) == 4 and end == os.path.getsize(seg)
+
+    # Crash in the middle of the last frame, and before its index entry
+    os.truncate(seg, frames[-1].offset + FRAME_HEADER.size + 3)
+    os.remove(seg[:-4] + ".idx")
+    assert len(list(archive.scan())) == 18
+
+    archive = ChatArchive(str(tmp_path), frame_records=6, flush_interval=0)
+    archive.append_message("Main Server", ChatMessage(stamp(1, 23, 59), "Kalamies", "jatkuu"))
+    archive.close()
+    assert [r["message"] for r in archive.scan()][-2:] == ["moi 1 17", "jatkuu"]
+    assert archive.stats()["Main_Server"]["frames"] == 4
+
+def test_background_flush_writes_buffered_records(tmp_path):
+    archive = ChatArchive(str(tmp_path), flush_interval=0.1)
+    try:
+        archive.append_message("Main Server", ChatMessage(stamp(1, 12), "Kalamies", "moi"))
+        assert list(archive.scan()) == []
+        deadline = time.monotonic() + 5
+        while not list(archive.scan()) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert [r["message"] for r in archive.scan()] == ["moi"]
+    finally:
+        archive.close()
+
+def test_replay_writes_the_store_only_with_the_flag(tmp_path):
+    archive = ChatArchive(str(tmp_path / "archive"), flush_interval=0)
+    with pytest.raises(ValueError):
+        replay(archive, str(tmp_path / "model.joblib"), store_path=str(tmp_path / "training.db"))
+    assert not os.path.exists(tmp_path / "training.db")
@@ -0,0 +1,45 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from compiled_model import export_pipeline, compile_pipeline, CompiledModel, char_wb_hashes, ngram_hash
+
+TEXTS = [
+    "moi kaikille", "kiitos pelistä", "sain ison ahvenen", "nähdään huomenna",
+    "vitun idiootti", "haista paska", "painu helvettiin", "senkin ääliö",
+    "perkele", "saatana tätä lagia", "voi vittu", "jumalauta",
+    "lagii", "mitä", "ok", "ÄLÄ HUUDA",
+]
+LABELS = ["OK"] * 4 + ["SEVERE"] * 4 + ["MODERATE"] * 4 + ["MINOR"] * 4
+
+def _fit():
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5))),
+        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000))
+    ])
+    return pipeline.fit(TEXTS, LABELS)
+
+def test_hashes_match_sklearn_ngrams():
+    analyzer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5)).build_analyzer()
+    for text in TEXTS + ["a", "  välit\tja   rivit\n", "😀 x", ""]:
+        hashes, docs = char_wb_hashes([text], 2, 5)
+        assert sorted(int(h) for h in hashes) == sorted(ngram_hash(g) for g in analyzer(text))
+        assert set(docs) <= {0}
+
+def test_compiled_model_matches_pipeline(tmp_path):
+    pipeline = _fit()
+    path = str(tmp_path / "model.npz")
+    export_pipeline(pipeline, path)
+    compiled = CompiledModel.load(path)
+    
+    queries = TEXTS + ["moi moi", "idiootti", "PERKELE!!!", "", "tuntematon"]
+    assert list(compiled.predict(queries)) == list(pipeline.predict(queries))
+    diff = abs(compiled.decision_function(queries) - pipeline.decision_function(queries)).max()
+    assert diff < 1e-5
+
+def test_compile_in_memory():
+    pipeline = _fit()
+    queries = TEXTS + ["moi moi", "idiootti"]
+    assert list(compile_pipeline(pipeline).predict(queries)) == list(pipeline.predict(queries))
+
+if __name__ == "__main__":
+    test_hashes_match_sklearn_ngrams()
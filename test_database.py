@@ -0,0 +1,259 @@
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from database import Database, MIGRATIONS
+
+
+def add(db, player="Kalamies", content="perkele", level="MODERATE"):
+    return db.add_violation(
+        timestamp="2024-01-31 12:00", player_name=player, violation_type="message",
+        content=content, level=level, reason="test", suggested_action="warn", ip_address="10.0.0.1"
+    )
+
+def test_rows_are_readable_after_add(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), flush_ms=1000)
+    try:
+        ids = [add(db, content=f"viesti {i}") for i in range(5)]
+        assert ids == [1, 2, 3, 4, 5]
+        # Reads wait for the queued rows instead of the 1 s flush interval
+        rows = db.get_player_violations("Kalamies", limit=10)
+        assert sorted(r["id"] for r in rows) == ids
+        assert db.get_stats()["total"] == 5
+        assert db.get_recent_violations(level="SEVERE") == []
+    finally:
+        db.close()
+
+def test_inserts_are_group_committed(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), batch_size=100, flush_ms=200)
+    try:
+        for i in range(250):
+            add(db, content=f"viesti {i}")
+        assert db.flush(timeout=5)
+        assert db.commits <= 5
+        assert db.get_stats()["total"] == 250
+    finally:
+        db.close()
+
+def test_add_does_not_wait_for_commit(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), flush_ms=500)
+    try:
+        start = time.perf_counter()
+        add(db)
+        assert time.perf_counter() - start < 0.1
+    finally:
+        db.close()
+
+def test_ids_continue_after_reopen_and_close_commits(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path, flush_ms=10000)
+    add(db)
+    add(db)
+    db.close()
+    db = Database(path)
+    try:
+        assert add(db) == 3
+        assert db.get_stats()["by_level"] == {"MODERATE": 3}
+    finally:
+        db.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+def test_concurrent_writers_and_readers(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), flush_ms=5)
+    errors = []
+
+    def writer(n):
+        for i in range(100):
+            add(db, player=f"Pelaaja{n}", content=f"viesti {i}")
+
+    def reader():
+        try:
+            for _ in range(20):
+                db.get_stats()
+                db.get_recent_violations(limit=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        assert errors == []
+        stats = db.get_stats()
+        assert stats["total"] == 400
+        assert len(db.get_player_violations("Pelaaja2", limit=1000)) == 100
+    finally:
+        db.close()
+
+def test_server_filter_and_time_order(tmp_path):
+    db = Database(str(tmp_path / "violations.db"))
+    try:
+        db.add_violation("25.01.2026 07:31", "Kalamies", "message", "b", "MINOR", "r", "a", server_name="Yksi")
+        db.add_violation("25.01.2026 07:29", "Kalamies", "message", "a", "SEVERE", "r", "a", server_name="Kaksi")
+        db.add_violation("25.01.2026 07:35", "Kalamies", "message", "c", "MINOR", "r", "a", server_name="Yksi")
+        assert [r["content"] for r in db.get_player_violations("Kalamies")] == ["c", "b", "a"]
+        assert [r["content"] for r in db.get_player_violations("Kalamies", server_name="Yksi")] == ["c", "b"]
+        start = db.get_player_violations("Kalamies")[1]["event_time"]
+        assert [r["content"] for r in db.get_recent_violations(since=start)] == ["c", "b"]
+        assert [r["content"] for r in db.get_recent_violations(until=start)] == ["a"]
+        assert [r["content"] for r in db.get_recent_violations(level="MINOR", limit=1)] == ["c"]
+    finally:
+        db.close()
+
+def test_old_database_is_migrated_in_place(tmp_path):
+    path = str(tmp_path / "violations.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE violations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, player_name TEXT NOT NULL,
+            ip_address TEXT, violation_type TEXT NOT NULL, content TEXT NOT NULL, level TEXT NOT NULL,
+            reason TEXT NOT NULL, suggested_action TEXT NOT NULL, created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_player_name ON violations(player_name)")
+    conn.execute("CREATE INDEX idx_level ON violations(level)")
+    conn.executemany(
+        "INSERT INTO violations (timestamp, player_name, violation_type, content, level, reason, suggested_action, created_at) "
+        "VALUES (?, 'Kalamies', 'message', ?, 'MINOR', 'r', 'a', ?)",
+        [("25.01.2026 07:29", "vanha", "2026-01-25T07:29:10"), ("huono aika", "outo", "2026-01-25T08:00:00")]
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        assert db.get_stats()["by_level"] == {"MINOR": 2}
+        rows = db.get_player_violations("Kalamies")
+        assert [r["content"] for r in rows] == ["outo", "vanha"]
+        assert rows[1]["event_time"] == int(datetime(2026, 1, 25, 7, 29).timestamp())
+        # Unparseable log time falls back to when the row was recorded
+        assert rows[0]["event_time"] == int(datetime(2026, 1, 25, 8, 0).timestamp())
+        assert rows[0]["server_name"] == ""
+        assert db.add_violation("25.01.2026 09:00", "Kalamies", "message", "uusi", "MINOR", "r", "a") == 3
+    finally:
+        db.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_server_player_time", "idx_level_time", "idx_event_time"} <= indexes
+    assert "idx_level" not in indexes
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM violations WHERE level = 'MINOR' "
+                        "ORDER BY event_time DESC, id DESC LIMIT 5").fetchall()
+    assert not any("TEMP B-TREE" in row[3] for row in plan)
+    conn.close()
+    # Opening again neither re-runs the migration nor brings the dropped indexes back
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    assert "idx_level" not in {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+
+def test_stats_come_from_rollups(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), batch_size=7)
+    rng = random.Random(3)
+    try:
+        for i in range(300):
+            db.add_violation(f"25.01.2026 {rng.randrange(6, 9):02d}:{rng.randrange(60):02d}", f"P{rng.randrange(20)}",
+                             "message", "x", rng.choice(["MINOR", "MODERATE", "SEVERE"]), "r", "a",
+                             server_name=rng.choice(["Yksi", "Kaksi"]))
+        stats = db.get_stats(top=3)
+        conn = sqlite3.connect(str(tmp_path / "violations.db"))
+        assert stats["total"] == 300
+        assert stats["by_level"] == dict(conn.execute("SELECT level, COUNT(*) FROM violations GROUP BY level"))
+        assert stats["by_server"] == dict(conn.execute("SELECT server_name, COUNT(*) FROM violations GROUP BY server_name"))
+        expected_top = conn.execute(
+            "SELECT COUNT(*) FROM violations GROUP BY player_name ORDER BY COUNT(*) DESC LIMIT 3").fetchall()
+        assert [t["count"] for t in stats["top_violators"]] == [c for (c,) in expected_top]
+
+        hourly = db.get_hourly_counts(since=int(datetime(2026, 1, 25, 7).timestamp()), server_name="Yksi")
+        expected = conn.execute("""
+            SELECT event_time / 3600 * 3600, level, COUNT(*) FROM violations
+            WHERE server_name = 'Yksi' AND event_time >= ? GROUP BY 1, 2 ORDER BY 1, 2
+        """, (int(datetime(2026, 1, 25, 7).timestamp()),)).fetchall()
+        assert [(h["hour"], h["level"], h["count"]) for h in hourly] == expected
+        assert {h["hour"] for h in hourly} == {int(datetime(2026, 1, 25, h).timestamp()) for h in (7, 8)}
+        conn.close()
+    finally:
+        db.close()
+
+def test_locked_database_is_retried_not_dropped(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path, flush_ms=5)
+    try:
+        # Fail fast on the lock instead of connect()'s 5 s busy wait
+        db._writer.execute("PRAGMA busy_timeout=20")
+        other = sqlite3.connect(path)
+        other.execute("BEGIN IMMEDIATE")
+        ids = [add(db, content=f"lukittu {i}") for i in range(3)]
+        time.sleep(0.3)
+        other.rollback()
+        other.close()
+        assert db.flush(timeout=10)
+        assert sorted(r["id"] for r in db.get_player_violations("Kalamies", limit=10)) == ids
+        assert db.write_errors == 0
+    finally:
+        db.close()
+
+def test_permanent_error_loses_only_the_broken_row(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path, flush_ms=200)
+    try:
+        add(db)
+        assert db.flush(timeout=5)
+        # Someone else took the next id, that one insert can never succeed
+        other = sqlite3.connect(path)
+        other.execute("INSERT INTO violations (id, timestamp, player_name, violation_type, content, level, "
+                      "reason, suggested_action, created_at) VALUES (2, 'x', 'Muu', 'message', 'x', 'OK', 'x', 'x', 'x')")
+        other.commit()
+        other.close()
+        ids = [add(db, player="Uusi", content=f"viesti {i}") for i in range(4)]
+        assert db.flush(timeout=5)
+        assert sorted(r["id"] for r in db.get_player_violations("Uusi", limit=10)) == ids[1:]
+        assert db.write_errors == 1
+    finally:
+        db.close()
+
+def test_writer_survives_unexpected_errors(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), flush_ms=5)
+    try:
+        commit = db._commit
+        calls = []
+        def broken_once(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise ValueError("rikki")
+            commit(batch)
+        db._commit = broken_once
+        add(db, content="eka")
+        assert db.flush(timeout=5)
+        add(db, content="toka")
+        assert db.flush(timeout=5)
+        assert db._thread.is_alive()
+        assert [r["content"] for r in db.get_player_violations("Kalamies", limit=10)] == ["toka"]
+    finally:
+        db.close()
+
+def test_waits_end_when_the_writer_is_gone(tmp_path):
+    db = Database(str(tmp_path / "violations.db"))
+    try:
+        db._queue.put(None)
+        db._thread.join(5)
+        add(db)
+        start = time.perf_counter()
+        assert not db.flush()
+        try:
+            db.delete_violations([1])
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        assert time.perf_counter() - start < 2
+    finally:
+        db._closed = True
+        db._writer.close()
@@ -0,0 +1,80 @@
+import random
+
+from generate_training_data import augment_text, generate_ok_data, generate_severe_data, generate_to_store
+from generate_nsfw_data import generate_nsfw_dataset, generate_nsfw_messages, generate_nsfw_nicks
+from training_store import TrainingStore
+
+PLAN = [(generate_severe_data, 700), (generate_nsfw_messages, 300), (generate_nsfw_nicks, 200)]
+
+
+def generate(tmp_path, name, **kwargs):
+    db_path = str(tmp_path / f"{name}.db")
+    generated, added = generate_to_store(PLAN, db_path, shard_size=250, progress=lambda line: None, **kwargs)
+    store = TrainingStore(db_path)
+    rows = store.load()
+    assert len(store) == added
+    store.close()
+    return generated, added, rows
+
+
+def test_same_seed_same_corpus_regardless_of_workers(tmp_path):
+    one = generate(tmp_path, "one", seed=7, workers=1)
+    two = generate(tmp_path, "two", seed=7, workers=2)
+    assert one == two
+    assert one[1] > 0
+
+
+def test_different_seed_different_corpus(tmp_path):
+    assert generate(tmp_path, "a", seed=1, workers=1)[2] != generate(tmp_path, "b", seed=2, workers=1)[2]
+
+
+def test_duplicates_dropped(tmp_path):
+    generated, added, (texts, _) = generate(tmp_path, "dups", seed=3, workers=1)
+    # Nicknames repeat a lot, only distinct texts reach the store
+    assert added < generated
+    assert len(set(texts)) == len(texts)
+
+    db_path = str(tmp_path / "dups.db")
+    assert generate_to_store(PLAN, db_path, seed=3, workers=1, shard_size=250, progress=lambda line: None)[1] == 0
+
+
+def test_labels_are_capped_against_the_smallest(tmp_path):
+    db_path = str(tmp_path / "balanced.db")
+    store = TrainingStore(db_path)
+    store.add("moderaattorin päätös", "SEVERE", source="moderator")
+    store.close()
+    plan = [(generate_severe_data, 2000), (generate_ok_data, 100)]
+    generate_to_store(plan, db_path, seed=5, workers=1, progress=lambda line: None, max_imbalance=2.0)
+    store = TrainingStore(db_path)
+    counts = store.counts()
+    store.close()
+    assert counts[("generated", "SEVERE")] == 2 * counts[("generated", "OK")]
+    assert counts[("moderator", "SEVERE")] == 1
+    # The same run again keeps the same rows
+    assert generate_to_store(plan, db_path, seed=5, workers=1, progress=lambda line: None, max_imbalance=2.0)[1] == 0
+
+
+def test_later_run_never_trims_existing_rows(tmp_path):
+    db_path = str(tmp_path / "corpus.db")
+    base = [(f"tavallinen viesti {i}", "OK") for i in range(100)] + \
+           [(f"törkeä viesti {i}", "SEVERE") for i in range(1000)]
+    store = TrainingStore(db_path)
+    store.add_many(base, source="generated")
+    store.add_many([("vanha rivi", "SEVERE")], source="imported")
+    store.close()
+
+    generate_nsfw_dataset(messages=2000, nicks=300, seed=9, workers=1, store_path=db_path)
+    store = TrainingStore(db_path)
+    texts, labels = store.load()
+    counts = store.counts()
+    store.close()
+    rows = dict(zip(texts, labels))
+    assert all(rows.get(text) == label for text, label in base)
+    assert rows["vanha rivi"] == "SEVERE"
+    # SEVERE was already over the cap, the run only adds to the labels below it
+    assert counts[("generated", "SEVERE")] == 1000
+
+
+def test_augment_text_uses_given_rng():
+    text = "Vitun pelle, mene pois!"
+    assert augment_text(text, 0.5, rng=random.Random(5)) == augment_text(text, 0.5, rng=random.Random(5))
@@ -0,0 +1,389 @@
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import logging
+
+logging.basicConfig(level=logging.CRITICAL)
+
+from log_tailer import LogTailer, InotifyWatcher, InotifyHub, PollingWatcher, create_watcher
+from checkpoint_store import CheckpointStore
+
+
+class TailCollector:
+    """Runs a tailer on a background thread and collects the lines"""
+    def __init__(self, tailer: LogTailer):
+        self.tailer = tailer
+        self.lines = []
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        for line in self.tailer.lines():
+            self.lines.append(line)
+
+    def wait_for(self, count: int, timeout: float = 5.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if len(self.lines) >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self):
+        self.tailer.close()
+        self.thread.join(timeout=10)
+
+
+class TestLogTailer(unittest.TestCase):
+    backend = "auto"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "chatlog.txt")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("vanha rivi\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _append(self, text: str, path: str = None):
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def _tailer(self, start_at_end=True):
+        tailer = LogTailer(self.path, "chat", "Test", start_at_end=start_at_end,
+                           backend=self.backend, poll_interval=0.05)
+        tailer.SAFETY_INTERVAL = 0.2
+        return tailer
+
+    def test_start_at_end_skips_existing(self):
+        collector = TailCollector(self._tailer())
+        time.sleep(0.2)
+        self._append("uusi rivi\n")
+        self.assertTrue(collector.wait_for(1))
+        collector.stop()
+        self.assertEqual(collector.lines, ["uusi rivi\n"])
+
+    def test_start_from_beginning(self):
+        collector = TailCollector(self._tailer(start_at_end=False))
+        self.assertTrue(collector.wait_for(1))
+        self._append("toinen\n")
+        self.assertTrue(collector.wait_for(2))
+        collector.stop()
+        self.assertEqual(collector.lines, ["vanha rivi\n", "toinen\n"])
+
+    def test_truncation_resets_position(self):
+        collector = TailCollector(self._tailer())
+        time.sleep(0.2)
+        self._append("a\n")
+        self.assertTrue(collector.wait_for(1))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("")
+        time.sleep(0.3)
+        self._append("b\n")
+        self.assertTrue(collector.wait_for(2))
+        collector.stop()
+        self.assertEqual(collector.lines, ["a\n", "b\n"])
+
+    def test_truncated_file_that_grew_back_is_read_from_start(self):
+        tailer = self._tailer(start_at_end=False)
+        tailer._watcher = PollingWatcher(self.path)
+        self.assertEqual(list(tailer._poll_once()), ["vanha rivi\n"])
+        # Truncated and rewritten past the old offset between two polls
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("uusi pidempi rivi\ntoinen\n")
+        self.assertEqual(list(tailer._poll_once()), ["uusi pidempi rivi\n", "toinen\n"])
+        tailer._close_file()
+
+    def test_rotation_follows_new_file(self):
+        collector = TailCollector(self._tailer())
+        time.sleep(0.2)
+        self._append("ennen\n")
+        self.assertTrue(collector.wait_for(1))
+        os.rename(self.path, self.path + ".1")
+        self._append("uusi tiedosto\n")
+        self.assertTrue(collector.wait_for(2))
+        collector.stop()
+        self.assertEqual(collector.lines, ["ennen\n", "uusi tiedosto\n"])
+
+
+    def test_idle_marker_after_burst(self):
+        tailer = self._tailer(start_at_end=False)
+        lines = tailer.lines(yield_idle=True)
+        self._append("b\n")
+        self.assertEqual([next(lines), next(lines), next(lines)], ["vanha rivi\n", "b\n", None])
+        tailer.close()
+        lines.close()
+
+    def test_partial_line_waits_for_newline(self):
+        collector = TailCollector(self._tailer())
+        time.sleep(0.2)
+        self._append("puoli")
+        time.sleep(0.4)
+        self.assertEqual(collector.lines, [])
+        self._append("rivi\n")
+        self.assertTrue(collector.wait_for(1))
+        collector.stop()
+        self.assertEqual(collector.lines, ["puolirivi\n"])
+
+    def test_cp1252_file_is_decoded_once(self):
+        with open(self.path, "wb") as f:
+            f.write("Pelaaja:  [25.01.2026 07:30]\n".encode("cp1252"))
+            f.write("hyvää päivää\n".encode("cp1252"))
+            f.write("öljyä\n".encode("cp1252"))
+        tailer = self._tailer(start_at_end=False)
+        collector = TailCollector(tailer)
+        self.assertTrue(collector.wait_for(3))
+        collector.stop()
+        self.assertEqual(collector.lines[1:], ["hyvää päivää\n", "öljyä\n"])
+        self.assertEqual(tailer.pos, os.path.getsize(self.path))
+
+    def test_utf8_offsets_are_byte_positions(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("ääliö\n")
+        tailer = self._tailer(start_at_end=False)
+        collector = TailCollector(tailer)
+        self.assertTrue(collector.wait_for(1))
+        collector.stop()
+        self.assertEqual(collector.lines, ["ääliö\n"])
+        self.assertEqual(tailer.pos, len("ääliö\n".encode("utf-8")))
+
+
+class TestLogTailerPolling(TestLogTailer):
+    backend = "poll"
+
+
+class TestCheckpointResume(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "chatlog.txt")
+        self.store_path = os.path.join(self.tmpdir, "checkpoints.json")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("eka\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _run_once(self, expected: int) -> list:
+        store = CheckpointStore(self.store_path)
+        tailer = LogTailer(self.path, "chat", "Test", start_at_end=True, checkpoints=store)
+        tailer.SAFETY_INTERVAL = 0.1
+        collector = TailCollector(tailer)
+        if expected:
+            self.assertTrue(collector.wait_for(expected))
+        else:
+            time.sleep(0.3)
+        collector.stop()
+        return collector.lines
+
+    def _append(self, text: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_resume_reads_lines_written_while_stopped(self):
+        self.assertEqual(self._run_once(0), [])
+        # Nothing processed yet, but the position at the end of the file is saved on stop
+        self._append("toka\nkolmas\n")
+        self.assertEqual(self._run_once(2), ["toka\n", "kolmas\n"])
+        self._append("neljäs\n")
+        self.assertEqual(self._run_once(1), ["neljäs\n"])
+
+    def test_rotated_file_is_read_from_start(self):
+        self._run_once(0)
+        self._append("toka\n")
+        self._run_once(1)
+        os.rename(self.path, self.path + ".1")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("uusi\n")
+        self.assertEqual(self._run_once(1), ["uusi\n"])
+
+    def test_truncated_file_is_read_from_start(self):
+        self._append("toka\nkolmas\n")
+        self._run_once(0)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("eka\n")
+        self._append("x\n")
+        self.assertEqual(self._run_once(1), ["eka\n", "x\n"])
+
+    def test_updates_are_batched(self):
+        store = CheckpointStore(self.store_path, flush_every=100, flush_interval=3600)
+        for i in range(99):
+            store.update("a|chat", i, 1, "f", 1)
+        self.assertFalse(os.path.exists(self.store_path))
+        store.update("a|chat", 99, 1, "f", 1)
+        self.assertEqual(CheckpointStore(self.store_path).get("a|chat").offset, 99)
+
+    def test_attached_state_is_saved_with_the_offsets(self):
+        store = CheckpointStore(self.store_path)
+        self.assertIsNone(store.attach_state("dedup|a|chat", lambda: {"1": [2]}))
+        store.update("a|chat", 5, 1, "f", 1)
+        store.flush()
+        # A forced flush saves the latest state even without new offsets
+        store.attach_state("dedup|a|chat", lambda: {"1": [2, 3]})
+        store.flush(force=True)
+        loaded = CheckpointStore(self.store_path)
+        self.assertEqual(loaded.get("a|chat").offset, 5)
+        self.assertEqual(loaded.attach_state("dedup|a|chat", dict), {"1": [2, 3]})
+
+    def _chat_monitor(self, store):
+        from unittest.mock import MagicMock
+        from detector import ServerMonitor, PP2Detector
+        detector = MagicMock(spec=PP2Detector)
+        detector.config = {'monitor': {'tail_backend': 'poll', 'poll_interval': 0.05}}
+        detector.checkpoints = store
+        monitor = ServerMonitor({'name': 'Test', 'chatlog_path': self.path, 'admin_password': 'x'}, detector)
+        messages = []
+        monitor.process_chat_message = messages.append
+        monitor.start()
+        return monitor, messages
+
+    def _wait(self, condition, timeout=5.0):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_message_in_progress_is_read_again_after_a_kill(self):
+        store = CheckpointStore(self.store_path, flush_interval=0)
+        monitor, messages = self._chat_monitor(store)
+        self._wait(lambda: monitor._tailers and monitor._tailers[0].pos > 0)
+        self._append("Vanha:        [25.01.2026 07:29]\nmoi\n\nKalamies:        [25.01.2026 07:30]\n")
+        self._wait(lambda: len(messages) == 1)
+        time.sleep(0.2)
+        # Killed here: only what the periodic flush wrote survives, the header is still in the parser
+        store.flush(force=True)
+        with open(self.store_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        monitor._tailers[0].checkpoints = None
+        monitor.stop()
+
+        self._append("tuli perille\n\n")
+        with open(self.store_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        monitor, messages = self._chat_monitor(CheckpointStore(self.store_path))
+        try:
+            self._wait(lambda: len(messages) == 1)
+            time.sleep(0.2)
+            self.assertEqual([(m.player_name, m.message) for m in messages], [("Kalamies", "tuli perille")])
+        finally:
+            monitor.stop()
+
+    def test_old_checkpoint_file_loads(self):
+        with open(self.store_path, "w", encoding="utf-8") as f:
+            json.dump({"a|chat": {"offset": 7, "inode": 1, "fingerprint": "f", "fingerprint_len": 1}}, f)
+        store = CheckpointStore(self.store_path)
+        self.assertEqual(store.get("a|chat").offset, 7)
+        self.assertIsNone(store.attach_state("dedup|a|chat", dict))
+
+
+class TestAsyncTailer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.tmpdir, f"chatlog{i}.txt") for i in range(3)]
+        for path in self.paths:
+            open(path, "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    async def _tail_all(self, use_hub: bool) -> dict:
+        loop = asyncio.get_running_loop()
+        hub = InotifyHub(loop) if use_hub else None
+        received = {path: [] for path in self.paths}
+        tailers = []
+
+        async def consume(path):
+            tailer = LogTailer(path, "chat", "Test", start_at_end=True, poll_interval=0.05)
+            tailer.SAFETY_INTERVAL = 0.2
+            tailers.append(tailer)
+            async for line in tailer.alines(hub):
+                received[path].append(line)
+
+        tasks = [asyncio.create_task(consume(p)) for p in self.paths]
+        await asyncio.sleep(0.2)
+        for i, path in enumerate(self.paths):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"rivi {i}\n")
+
+        deadline = loop.time() + 5
+        while loop.time() < deadline and not all(received.values()):
+            await asyncio.sleep(0.01)
+        for tailer in tailers:
+            tailer.close()
+        await asyncio.wait(tasks, timeout=2)
+        if hub:
+            hub.close()
+        return received
+
+    def _check(self, use_hub: bool):
+        received = asyncio.run(self._tail_all(use_hub))
+        for i, path in enumerate(self.paths):
+            self.assertEqual(received[path], [f"rivi {i}\n"])
+
+    def test_polling(self):
+        self._check(use_hub=False)
+
+    def test_shared_inotify_hub(self):
+        try:
+            InotifyWatcher(__file__).close()
+        except OSError:
+            self.skipTest("inotify not available")
+        self._check(use_hub=True)
+
+    def test_hub_removes_old_watches(self):
+        try:
+            InotifyWatcher(__file__).close()
+        except OSError:
+            self.skipTest("inotify not available")
+
+        def kernel_watches(hub):
+            with open(f"/proc/self/fdinfo/{hub.fd}") as f:
+                return sum(line.startswith("inotify wd:") for line in f)
+
+        async def run():
+            hub = InotifyHub(asyncio.get_running_loop())
+            try:
+                subs = [hub.subscribe(path) for path in self.paths]
+                self.assertEqual(kernel_watches(hub), 1 + 3)
+                for n in range(5):
+                    # Rotated files stay in the directory
+                    os.rename(self.paths[0], f"{self.paths[0]}.{n}")
+                    open(self.paths[0], "w").close()
+                    subs[0].rewatch_file()
+                self.assertEqual(hub.watch_count(), 1 + 3)
+                self.assertEqual(kernel_watches(hub), 1 + 3)
+                for sub in subs:
+                    sub.close()
+                self.assertEqual(hub.watch_count(), 0)
+                self.assertEqual(kernel_watches(hub), 0)
+            finally:
+                hub.close()
+
+        asyncio.run(run())
+
+
+class TestWatcherSelection(unittest.TestCase):
+    def test_poll_backend(self):
+        watcher = create_watcher(__file__, backend="poll")
+        self.assertIsInstance(watcher, PollingWatcher)
+
+    def test_auto_backend_prefers_inotify(self):
+        watcher = create_watcher(__file__, backend="auto")
+        try:
+            try:
+                InotifyWatcher(__file__).close()
+            except OSError:
+                self.assertIsInstance(watcher, PollingWatcher)
+            else:
+                self.assertIsInstance(watcher, InotifyWatcher)
+        finally:
+            watcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,19 @@
-from ml_analyzer import MLAnalyzer
+import os
+import threading
+import time
+import joblib
+from ml_analyzer import MLAnalyzer, BatchPredictor, normalize_text
+from model_registry import publish_model, read_manifest
+
+class CountingModel:
+    """Stand-in for the sklearn pipeline, labels every text with a fixed value"""
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+    
+    def predict(self, texts):
+        self.calls += len(texts)
+        return [self.label] * len(texts)
 
 def test_analyzer():
     try:
@@ -31,5 +46,164 @@ def test_analyzer():
     except Exception as e:
         print(f"Error during verification: {e}")
 
+def test_batch_predictor_groups_concurrent_calls():
+    calls = []
+    def predict_fn(texts):
+        calls.append(len(texts))
+        return [t.upper() for t in texts]
+    
+    batcher = BatchPredictor(predict_fn, max_batch=16, max_wait_ms=50)
+    results = {}
+    def caller(i):
+        results[i] = batcher.predict(f"viesti {i}")
+    
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    batcher.close()
+    
+    assert results == {i: f"VIESTI {i}" for i in range(16)}
+    assert sum(calls) == 16
+    assert len(calls) < 16
+
+def test_batch_predictor_propagates_errors():
+    def predict_fn(texts):
+        raise ValueError("rikki")
+    
+    batcher = BatchPredictor(predict_fn, max_batch=4, max_wait_ms=1)
+    try:
+        batcher.predict("moi")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    finally:
+        batcher.close()
+
+def test_batch_predictor_close_releases_waiting_callers():
+    started = threading.Event()
+    release = threading.Event()
+    def predict_fn(texts):
+        started.set()
+        release.wait(5)
+        return [t.upper() for t in texts]
+    
+    batcher = BatchPredictor(predict_fn, max_batch=1, max_wait_ms=0)
+    running = batcher.submit("eka")
+    assert started.wait(5)
+    waiting = [batcher.submit(f"viesti {i}") for i in range(3)]
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    release.set()
+    closer.join(5)
+    # The batch in progress finishes, the queued texts fail instead of blocking forever
+    assert running.result(timeout=1) == "EKA"
+    for future in waiting:
+        assert isinstance(future.exception(timeout=1), RuntimeError)
+    assert isinstance(batcher.submit("myöhässä").exception(timeout=1), RuntimeError)
+
+def test_normalize_text():
+    assert normalize_text("  LAGIIIIII   pls ") == "lagii pls"
+    assert normalize_text("Kiitos") == "kiitos"
+    assert normalize_text("pakkasta") == "pakkasta"
+
+def test_prediction_cache_hits_and_eviction(tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(CountingModel("OK"), model_path)
+    analyzer = MLAnalyzer(model_path, cache_size=2)
+    
+    analyzer.analyze_message("Pelaaja", "moiiii")
+    analyzer.analyze_message("Pelaaja", "MOIIIIIII")
+    assert analyzer.model.calls == 1
+    assert analyzer.cache_stats()["hits"] == 1
+    assert analyzer.cache_stats()["misses"] == 1
+    
+    analyzer.analyze_message("Pelaaja", "toinen")
+    analyzer.analyze_message("Pelaaja", "kolmas")
+    assert analyzer.cache_stats()["size"] == 2
+
+def test_prediction_cache_invalidated_on_model_change(tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(CountingModel("OK"), model_path)
+    analyzer = MLAnalyzer(model_path, cache_size=100)
+    assert analyzer.analyze_message("Pelaaja", "perkele").level == "OK"
+    
+    joblib.dump(CountingModel("MODERATE"), model_path)
+    st = os.stat(model_path)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert analyzer.check_for_update()
+    assert analyzer.analyze_message("Pelaaja", "perkele").level == "MODERATE"
+
+def test_published_version_is_swapped_in(tmp_path):
+    from test_compiled_model import _fit
+    model_path = str(tmp_path / "violation_model.joblib")
+    first = publish_model(_fit(), model_path)
+    analyzer = MLAnalyzer(model_path, engine="numpy")
+    assert analyzer.model_info()["version"] == first
+    assert analyzer.model_info()["engine"] == "numpy"
+    assert not analyzer.check_for_update()
+    
+    second = publish_model(_fit(), model_path, keep=1)
+    assert second != first
+    info = analyzer.reload_now()
+    assert info["version"] == second
+    assert info["path"].endswith(f"violation_model-{second}.npz")
+    assert not os.path.exists(str(tmp_path / f"violation_model-{first}.joblib"))
+    assert analyzer.analyze_message("Pelaaja", "moi kaikille").level == "OK"
+
+def test_parallel_publishes_get_their_own_versions(tmp_path):
+    from test_compiled_model import _fit
+    model_path = str(tmp_path / "violation_model.joblib")
+    pipeline = _fit()
+    versions = []
+    threads = [threading.Thread(target=lambda: versions.append(publish_model(pipeline, model_path, keep=10)))
+               for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(set(versions)) == 4
+    assert read_manifest(model_path)["version"] in versions
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    for version in versions:
+        assert joblib.load(str(tmp_path / f"violation_model-{version}.joblib")).predict(["moi"])
+
+def test_prune_keeps_newest_of_the_same_second(tmp_path, monkeypatch):
+    import model_registry
+    from test_compiled_model import _fit
+    model_path = str(tmp_path / "violation_model.joblib")
+    pipeline = _fit()
+    monkeypatch.setattr(model_registry.time, "strftime", lambda fmt: "20260125-073000")
+    versions = [publish_model(pipeline, model_path, keep=3, compiled=False) for _ in range(12)]
+    assert versions[-1] == "20260125-073000-12"
+    kept = sorted(name for name in os.listdir(tmp_path) if name.startswith("violation_model-"))
+    assert kept == [f"violation_model-{v}.joblib" for v in sorted(versions[-3:])]
+    assert read_manifest(model_path)["version"] == versions[-1]
+
+def test_version_without_compiled_model_uses_sklearn(tmp_path):
+    from test_compiled_model import _fit
+    model_path = str(tmp_path / "violation_model.joblib")
+    publish_model(_fit(), model_path)
+    version = publish_model(_fit(), model_path, compiled=False)
+    assert read_manifest(model_path)["npz"] is None
+    # The unversioned copy of the previous version is gone too
+    assert not os.path.exists(str(tmp_path / "violation_model.npz"))
+    info = MLAnalyzer(model_path, engine="numpy").model_info()
+    assert info["version"] == version and info["engine"] == "sklearn"
+
+def test_background_watcher_picks_up_new_version(tmp_path):
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(CountingModel("OK"), model_path)
+    analyzer = MLAnalyzer(model_path, reload_interval=0.05)
+    try:
+        joblib.dump(CountingModel("MINOR"), str(tmp_path / "new.joblib"))
+        os.replace(str(tmp_path / "new.joblib"), model_path)
+        deadline = time.time() + 5
+        while analyzer.analyze_message("Pelaaja", "moi").level != "MINOR" and time.time() < deadline:
+            time.sleep(0.02)
+        assert analyzer.analyze_message("Pelaaja", "moi").level == "MINOR"
+    finally:
+        analyzer.close()
+
 if __name__ == "__main__":
     test_analyzer()
+    test_batch_predictor_groups_concurrent_calls()
+    test_batch_predictor_propagates_errors()
+    test_normalize_text()
@@ -0,0 +1,145 @@
+import time
+
+import requests
+
+from fake_pp2 import FakePP2Server
+from notification_dispatcher import NotificationDispatcher
+
+
+def wait_idle(dispatcher, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while dispatcher._queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_submit_does_not_wait_for_the_webhook():
+    fake = FakePP2Server(rtt=0.2).start()
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session)
+    try:
+        start = time.perf_counter()
+        for i in range(5):
+            assert dispatcher.submit(fake.webhook_url, {"content": f"viesti {i}"})
+        assert time.perf_counter() - start < 0.1
+        wait_idle(dispatcher)
+        assert [payload["content"] for _, payload in fake.webhooks] == [f"viesti {i}" for i in range(5)]
+        assert dispatcher.stats()["sent"] == 5
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_rate_limit_is_honoured():
+    fake = FakePP2Server(webhook_limit=3, webhook_window=0.3).start()
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session)
+    try:
+        for i in range(10):
+            dispatcher.submit(fake.webhook_url, {"content": str(i)})
+        wait_idle(dispatcher)
+        assert [payload["content"] for _, payload in fake.webhooks] == [str(i) for i in range(10)]
+        # The Remaining/Reset-After headers keep the sender inside the bucket
+        assert fake.rate_limited == 0
+        assert dispatcher.stats()["failed"] == 0
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_429_is_retried_after_retry_after():
+    fake = FakePP2Server().start()
+    fake.webhook_responses = [429]
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session)
+    try:
+        dispatcher.submit(fake.webhook_url, {"content": "x"})
+        wait_idle(dispatcher)
+        stats = dispatcher.stats()
+        assert stats["sent"] == 1 and stats["rate_limited"] == 1 and stats["retries"] == 0
+        assert len(fake.webhooks) == 1
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_endless_429_gives_up_after_the_wait_budget():
+    fake = FakePP2Server().start()
+    fake.webhook_responses = [429] * 4
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session, max_rate_limit_wait=0.3)
+    try:
+        dispatcher.submit(fake.webhook_url, {"content": "eka"})
+        dispatcher.submit(fake.webhook_url, {"content": "toka"})
+        wait_idle(dispatcher)
+        stats = dispatcher.stats()
+        # Every 429 counts at least 0.1 s, the fourth one goes over the budget
+        assert stats["failed"] == 1 and stats["sent"] == 1 and stats["rate_limited"] == 4
+        assert stats["retries"] == 0
+        assert [payload["content"] for _, payload in fake.webhooks] == ["toka"]
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_webhook_session_leaves_status_retries_to_the_dispatcher():
+    from action_handler import ActionHandler
+    fake = FakePP2Server().start()
+    fake.webhook_responses = [503]
+    handler = ActionHandler(discord_webhook_url=fake.webhook_url, webhook_max_retries=0)
+    try:
+        retry = handler._webhook().get_adapter(fake.webhook_url).max_retries
+        assert retry.status == 0 and not retry.status_forcelist and not retry.respect_retry_after_header
+        handler.notifier.submit(fake.webhook_url, {"content": "x"})
+        wait_idle(handler.notifier)
+        assert fake.requests == 1
+        assert handler.notifier.stats()["failed"] == 1
+    finally:
+        handler.close()
+        fake.close()
+
+
+def test_server_errors_back_off_then_give_up():
+    fake = FakePP2Server().start()
+    fake.webhook_responses = [503, 500, 502, 503]
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session, max_retries=2, backoff=0.01)
+    try:
+        dispatcher.submit(fake.webhook_url, {"content": "eka"})
+        wait_idle(dispatcher)
+        dispatcher.submit(fake.webhook_url, {"content": "toka"})
+        wait_idle(dispatcher)
+        stats = dispatcher.stats()
+        assert stats["failed"] == 1 and stats["sent"] == 1 and stats["retries"] == 3
+        assert [payload["content"] for _, payload in fake.webhooks] == ["toka"]
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_client_error_is_not_retried():
+    fake = FakePP2Server().start()
+    fake.webhook_responses = [400]
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session, backoff=0.01)
+    try:
+        dispatcher.submit(fake.webhook_url, {"content": "x"})
+        wait_idle(dispatcher)
+        assert dispatcher.stats()["failed"] == 1
+        assert dispatcher.stats()["retries"] == 0
+    finally:
+        dispatcher.close()
+        fake.close()
+
+
+def test_full_queue_drops_newest():
+    fake = FakePP2Server(rtt=0.2).start()
+    session = requests.Session()
+    dispatcher = NotificationDispatcher(lambda: session, max_queue=2)
+    try:
+        results = [dispatcher.submit(fake.webhook_url, {"content": str(i)}) for i in range(6)]
+        assert results[:2] == [True, True]
+        assert results.count(False) >= 3
+        assert dispatcher.stats()["dropped"] == results.count(False)
+    finally:
+        dispatcher.close()
+        fake.close()
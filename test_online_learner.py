@@ -0,0 +1,47 @@
+import joblib
+from ml_analyzer import MLAnalyzer
+from online_learner import OnlineLearner
+from test_ml_analyzer import CountingModel
+from test_training_store import make_store
+
+def _setup(tmp_path):
+    store_path = make_store(tmp_path)
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(CountingModel("OK"), model_path)
+    analyzer = MLAnalyzer(model_path, cache_size=100)
+    learner = OnlineLearner(analyzer, store_path=store_path, state_path=str(tmp_path / "online.joblib"))
+    return analyzer, learner
+
+def test_full_retrain_installs_online_model(tmp_path):
+    analyzer, learner = _setup(tmp_path)
+    learner.full_retrain()
+    assert analyzer.model_info()["version"] == "online-1"
+    assert analyzer.analyze_message("Pelaaja", "vitun idiootti").level == "SEVERE"
+    assert analyzer.analyze_message("Pelaaja", "kiitos pelistä").level == "OK"
+
+def test_moderator_decisions_are_learned(tmp_path):
+    analyzer, learner = _setup(tmp_path)
+    learner.full_retrain()
+    text = "qwzx qwzx gorbax"
+    before = analyzer.analyze_message("Pelaaja", text).level
+    assert before != "SEVERE"
+    
+    for _ in range(3):
+        learner.learn(text, "SEVERE")
+    learner.learn("jotain", "EI_LUOKKA")
+    assert learner.apply_pending() == 3
+    assert analyzer.analyze_message("Pelaaja", text).level == "SEVERE"
+    # Old knowledge is kept
+    assert analyzer.analyze_message("Pelaaja", "kiitos pelistä").level == "OK"
+
+def test_state_survives_restart(tmp_path):
+    analyzer, learner = _setup(tmp_path)
+    learner.full_retrain()
+    learner.learn("uusi sana", "MINOR")
+    learner.apply_pending()
+    learner.save()
+    
+    _, restored = _setup(tmp_path)
+    assert restored.load()
+    assert restored.samples_learned == 1
+    assert restored.analyzer.model_info()["version"] == "online-1"
@@ -41,7 +41,76 @@ def test_chat_message():
     else:
         print("\n❌ Failed to parse chat message")
 
+def test_chat_stream_single_line():
+    stream = LogParser().chat_stream()
+    
+    assert stream.feed("Pelaaja:        [25.01.2026 07:30]\n") == []
+    assert stream.feed("moro mitä ääliöt\n") == []
+    messages = stream.flush()
+    
+    assert len(messages) == 1
+    assert messages[0].player_name == "Pelaaja"
+    assert messages[0].timestamp == "25.01.2026 07:30"
+    assert messages[0].message == "moro mitä ääliöt"
+
+def test_chat_stream_multi_line():
+    stream = LogParser().chat_stream()
+    lines = [
+        "Pelaaja:        [25.01.2026 07:30]",
+        "eka rivi",
+        "toka rivi",
+        "Toinen:  [25.01.2026 07:31]",
+        "moi",
+        "",
+    ]
+    
+    messages = []
+    for line in lines:
+        messages.extend(stream.feed(line))
+    
+    assert [(m.player_name, m.message) for m in messages] == [
+        ("Pelaaja", "eka rivi\ntoka rivi"),
+        ("Toinen", "moi"),
+    ]
+
+def test_chat_stream_header_waits_for_message():
+    stream = LogParser().chat_stream()
+    
+    stream.feed("Pelaaja:        [25.01.2026 07:30]")
+    # Log went idle between the header and the message line
+    assert stream.flush() == []
+    stream.feed("viesti")
+    
+    assert [m.message for m in stream.flush()] == ["viesti"]
+
+def test_chat_stream_reports_start_of_open_message():
+    stream = LogParser().chat_stream()
+    
+    stream.feed("Pelaaja:        [25.01.2026 07:30]", 100)
+    stream.feed("viesti", 136)
+    assert stream.pending_offset == 100
+    stream.flush()
+    assert stream.pending_offset is None
+
+def test_chat_stream_ignores_lines_without_header():
+    stream = LogParser().chat_stream()
+    
+    assert stream.feed("orpo rivi") == []
+    assert stream.flush() == []
+
+def test_player_leave():
+    parser = LogParser()
+    
+    assert parser.parse_player_leave("<-- Pelaaja Kaksi left the game.") == "Pelaaja Kaksi"
+    assert parser.parse_player_leave("--> Pelaaja joined the game (ip: 1.2.3.4).") is None
+
 if __name__ == "__main__":
     print("Testing Log Parser\n")
     test_player_join()
     test_chat_message()
+    test_chat_stream_single_line()
+    test_chat_stream_multi_line()
+    test_chat_stream_header_waits_for_message()
+    test_chat_stream_ignores_lines_without_header()
+    test_player_leave()
+    print("\n✅ Chat stream parsing OK")
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+from retention import RetentionJob, read_archive, write_archive
+
+
+def add(db, days_ago, player="Kalamies", content="perkele", level="MODERATE", server="Main Server"):
+    when = datetime.now() - timedelta(days=days_ago)
+    return db.add_violation(
+        timestamp=when.strftime("%d.%m.%Y %H:%M"), player_name=player, violation_type="message",
+        content=content, level=level, reason="test", suggested_action="warn", server_name=server
+    )
+
+def fts_ok(path):
+    conn = sqlite3.connect(path)
+    try:
+        # rank = 1 also compares the index with the external content table
+        conn.execute("INSERT INTO violations_fts(violations_fts, rank) VALUES('integrity-check', 1)")
+        return True
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+
+def test_old_rows_are_archived_and_deleted(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path)
+    try:
+        old = [add(db, 100 + i, player=f"Vanha{i % 3}", content=f"vanha kalapuikko {i}") for i in range(50)]
+        new = [add(db, 1, player="Vanha0", content="uusi kalapuikko", level="SEVERE") for _ in range(5)]
+        job = RetentionJob(db, keep_days=90, archive_dir=str(tmp_path / "archive"), chunk_size=7, pause=0)
+        result = job.run_once()
+        assert result["archived"] == 50
+
+        archived = [row for f in result["files"] for row in read_archive(f)]
+        assert sorted(row["id"] for row in archived) == old
+        assert {row["content"] for row in archived} == {f"vanha kalapuikko {i}" for i in range(50)}
+        assert all(os.path.basename(f).startswith("violations-") for f in result["files"])
+
+        # Rows, full-text index and rollups agree after the deletes
+        assert sorted(r["id"] for r in db.search("kalapuikko", limit=100)) == new
+        stats = db.get_stats()
+        assert stats["total"] == 5
+        assert stats["by_level"] == {"SEVERE": 5}
+        assert stats["by_server"] == {"Main Server": 5}
+        assert stats["top_violators"] == [{"player": "Vanha0", "count": 5}]
+        assert sum(h["count"] for h in db.get_hourly_counts(since=0)) == 5
+        assert fts_ok(path)
+
+        assert job.run_once()["archived"] == 0
+    finally:
+        db.close()
+
+def test_new_database_shrinks_with_incremental_vacuum(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path, batch_size=1000)
+    try:
+        for i in range(3000):
+            add(db, 200, content=f"pitkä viesti {i} " + "x" * 300)
+        db.flush()
+        with db._reader() as conn:
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        job = RetentionJob(db, keep_days=90, archive_dir=str(tmp_path / "archive"), chunk_size=3000,
+                           pause=0, vacuum_pages=pages)
+        job._yield_to_writer = lambda: False    # one chunk and one vacuum step
+        result = job.run_once()
+        assert result["archived"] == 3000 and result["free_pages"] == 0
+        with db._reader() as conn:
+            assert conn.execute("PRAGMA page_count").fetchone()[0] < pages / 4
+    finally:
+        db.close()
+
+def test_inserts_keep_flowing_during_retention(tmp_path):
+    db = Database(str(tmp_path / "violations.db"), batch_size=500, flush_ms=5)
+    try:
+        for i in range(5000):
+            add(db, 120, content=f"vanha {i}")
+        db.flush()
+        job = RetentionJob(db, keep_days=90, archive_dir=str(tmp_path / "archive"), chunk_size=200, pause=0.001)
+        thread = threading.Thread(target=job.run_once)
+        thread.start()
+        waits = []
+        while thread.is_alive():
+            add(db, 0, content="uusi")
+            start = time.perf_counter()
+            db.flush()
+            waits.append(time.perf_counter() - start)
+        thread.join()
+        assert job.archived == 5000
+        assert db.get_stats()["total"] == len(waits)
+        # A commit waits for at most one chunk, not for the whole pass
+        assert max(waits) < 1.0
+    finally:
+        db.close()
+
+def test_repeated_chunk_is_read_once(tmp_path):
+    path = str(tmp_path / "violations-2026-01.jsonl.gz")
+    rows = [{"id": i, "content": f"viesti {i}"} for i in range(3)]
+    write_archive(path, rows)
+    # A crash after the write and before the delete archives the chunk again
+    write_archive(path, rows + [{"id": 3, "content": "viesti 3"}])
+    assert [row["id"] for row in read_archive(path)] == [0, 1, 2, 3]
+
+def test_existing_file_without_auto_vacuum_still_deletes(tmp_path):
+    path = str(tmp_path / "violations.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE placeholder (x)")
+    conn.commit()
+    conn.close()
+    db = Database(path)
+    try:
+        add(db, 100)
+        add(db, 1)
+        result = RetentionJob(db, keep_days=90, archive_dir=str(tmp_path / "archive"), pause=0).run_once()
+        assert result["archived"] == 1 and result["free_pages"] is None
+        assert db.get_stats()["total"] == 1
+    finally:
+        db.close()
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from roster_cache import RosterCache, parse_roster
+
+PAGE = """<html><pre>Players:
+[0] Kalamies (12 kills)
+[1] [FI]PilkkiUkko (3 kills)
+[2] Sanna 88 (0 kills)
+</pre><textarea>[0] topias [162.159.134.234] (9999990 min left)</textarea></html>"""
+
+CONFIG = {"admin_url": "http://pp2/Admin.html", "admin_password": "pw"}
+
+
+class Fetcher:
+    def __init__(self, page=PAGE, delay=0.0):
+        self.page = page
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, server_config):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.page
+
+
+def test_parse_roster():
+    roster = parse_roster(PAGE)
+    assert roster.names["kalamies"] == "0"
+    assert roster.names["sanna 88"] == "2"
+    assert [index for index, _ in roster.rows] == ["0", "1", "2", "0"]
+
+
+def test_lookups_share_one_download():
+    fetch = Fetcher()
+    cache = RosterCache(fetch)
+    assert cache.lookup("Kalamies", CONFIG) == "0"
+    assert cache.lookup("kalamies", CONFIG) == "0"
+    assert cache.lookup("Sanna 88", CONFIG) == "2"
+    assert cache.lookup("PilkkiUkko", CONFIG) == "1"  # inside the row text
+    assert fetch.calls == 1
+
+
+def test_invalidate_and_expiry_reload():
+    fetch = Fetcher()
+    cache = RosterCache(fetch, refresh_interval=0.05)
+    cache.lookup("Kalamies", CONFIG)
+    cache.invalidate(CONFIG)
+    fetch.page = PAGE.replace("Kalamies", "Uusi")
+    assert cache.lookup("Uusi", CONFIG) == "0"
+    assert fetch.calls == 2
+    time.sleep(0.06)
+    cache.lookup("Uusi", CONFIG)
+    assert fetch.calls == 3
+
+
+def test_miss_reloads_old_roster_once():
+    fetch = Fetcher()
+    cache = RosterCache(fetch, miss_refresh=0.02)
+    assert cache.lookup("Tuntematon", CONFIG) is None
+    assert fetch.calls == 1  # just downloaded, no second try
+    time.sleep(0.03)
+    assert cache.lookup("Tuntematon", CONFIG) is None
+    assert fetch.calls == 2
+
+
+def test_concurrent_lookups_single_flight():
+    fetch = Fetcher(delay=0.1)
+    cache = RosterCache(fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.lookup("Kalamies", CONFIG)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["0"] * 8
+    assert fetch.calls == 1
+
+
+def test_failed_download_is_not_cached():
+    fetch = Fetcher(page=None)
+    cache = RosterCache(fetch)
+    assert cache.lookup("Kalamies", CONFIG) is None
+    fetch.page = PAGE
+    assert cache.lookup("Kalamies", CONFIG) == "0"
+    assert fetch.calls == 2
@@ -0,0 +1,115 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from database import Database, fts_query
+from discord_bot import parse_search_args
+
+
+def make_db(tmp_path):
+    db = Database(str(tmp_path / "violations.db"))
+    rows = [
+        ("20.01.2026 10:00", "Kalamies", "Yksi", "sinä olet ihan paska pelaaja"),
+        ("24.01.2026 12:00", "Kalamies", "Kaksi", "paska peli, paska serveri"),
+        ("25.01.2026 07:29", "Möröläinen", "Yksi", "tule käymään osoitteessa example.com"),
+        ("25.01.2026 07:30", "Pelaaja2", "Yksi", "ihan paska"),
+        ("25.01.2026 07:31", "Pelaaja2", "Yksi", "pelaaja on hyvä"),
+    ]
+    for timestamp, player, server, content in rows:
+        db.add_violation(timestamp, player, "message", content, "MINOR", "r", "a", server_name=server)
+    return db
+
+
+def test_fts_query_quotes_user_input():
+    assert fts_query('paska "ihan paska" pel*') == '"paska" "ihan paska" "pel"*'
+    assert fts_query('NOT OR ( x"y') == '"NOT" "OR" "x""y"'
+    assert fts_query("  * ") is None
+    assert fts_query('??? "!!" ☆') is None
+
+
+def test_search_ranks_and_filters(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        # Two hits in a short message rank first
+        results = db.search("paska")
+        assert [r["content"] for r in results][0] == "paska peli, paska serveri"
+        assert len(results) == 3
+        assert "**paska**" in results[0]["snippet"]
+
+        assert {r["content"] for r in db.search('"ihan paska"')} == {"ihan paska", "sinä olet ihan paska pelaaja"}
+        assert db.search('"paska ihan"') == []
+        assert [r["player_name"] for r in db.search("paska", player_name="Pelaaja2")] == ["Pelaaja2"]
+        assert {r["server_name"] for r in db.search("paska", server_name="Kaksi")} == {"Kaksi"}
+        since = int(datetime(2026, 1, 24).timestamp())
+        assert {r["content"] for r in db.search("paska", since=since)} == {"paska peli, paska serveri", "ihan paska"}
+        assert [r["content"] for r in db.search("paska", until=since)] == ["sinä olet ihan paska pelaaja"]
+        # Prefixes, diacritics and punctuation
+        assert {r["content"] for r in db.search("pelaaja*")} >= {"pelaaja on hyvä", "sinä olet ihan paska pelaaja"}
+        assert [r["player_name"] for r in db.search("kaymaan")] == ["Möröläinen"]
+        assert [r["player_name"] for r in db.search("example.com")] == ["Möröläinen"]
+        assert db.search("AND OR NOT (") == []
+    finally:
+        db.close()
+
+
+def test_search_pages(tmp_path):
+    db = make_db(tmp_path)
+    try:
+        everything = [r["id"] for r in db.search("paska", limit=10)]
+        pages = [r["id"] for offset in range(0, 3) for r in db.search("paska", limit=1, offset=offset)]
+        assert pages == everything
+        assert db.search("paska", limit=1, offset=3) == []
+    finally:
+        db.close()
+
+
+def test_symbol_names_use_the_exact_filter(tmp_path):
+    db = Database(str(tmp_path / "violations.db"))
+    try:
+        db.add_violation("25.01.2026 07:29", "☆☆", "message", "hello there", "MINOR", "r", "a", server_name="★")
+        db.add_violation("25.01.2026 07:30", "☆", "message", "hello again", "MINOR", "r", "a", server_name="★")
+        assert [r["content"] for r in db.search("hello", player_name="☆☆")] == ["hello there"]
+        assert len(db.search("hello", server_name="★")) == 2
+        assert db.search("hello ???") != []
+    finally:
+        db.close()
+
+
+def test_existing_rows_are_indexed_on_migration(tmp_path):
+    path = str(tmp_path / "violations.db")
+    db = Database(path)
+    db.add_violation("25.01.2026 07:29", "Kalamies", "message", "vanha viesti", "MINOR", "r", "a")
+    db.close()
+    db = Database(path)
+    try:
+        db._writer.execute("INSERT INTO violations_fts(violations_fts) VALUES('integrity-check')")
+        assert [r["content"] for r in db.search("viesti")] == ["vanha viesti"]
+    finally:
+        db.close()
+
+
+def test_parse_search_args():
+    options = parse_search_args('"ihan paska" pelaaja:Kalamies palvelin:"Main Server" sivu:2 klo:12')
+    assert options == {"text": '"ihan paska" klo:12', "player_name": "Kalamies", "server_name": "Main Server", "page": 2}
+    options = parse_search_args("paska päivät:7")
+    assert options["text"] == "paska"
+    assert abs(options["since"] - (time.time() - 7 * 86400)) < 5
+    with pytest.raises(ValueError):
+        parse_search_args("paska sivu:0")
+    with pytest.raises(ValueError, match="haettavia sanoja"):
+        parse_search_args("??? pelaaja:Kalamies")
+
+
+def test_only_newest_matches_are_ranked(tmp_path):
+    db = Database(str(tmp_path / "violations.db"))
+    try:
+        # The best match (shortest text) is the oldest row
+        db.add_violation("20.01.2026 10:00", "Vanha", "message", "paska", "MINOR", "r", "a")
+        for i in range(5):
+            db.add_violation("25.01.2026 10:00", f"P{i}", "message", f"paska viesti numero {i}", "MINOR", "r", "a")
+        assert db.search("paska", limit=1)[0]["player_name"] == "Vanha"
+        results = db.search("paska", max_ranked=3)
+        assert {r["player_name"] for r in results} == {"P2", "P3", "P4"}
+    finally:
+        db.close()
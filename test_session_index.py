@@ -0,0 +1,132 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import logging
+
+logging.basicConfig(level=logging.CRITICAL)
+
+from checkpoint_store import Checkpoint, file_fingerprint
+from log_parser import LogParser
+from session_index import PlayerSessionIndex
+
+
+def join_line(name: str, ip: str, minute: int) -> str:
+    return (f"--> {name} joined the game (ip: {ip}). [25.01.2026 07:{minute:02d}] "
+            f"[/banaddress {ip} 60 {name} 1124073472 ] [v2.0.7]\n")
+
+
+class TestPlayerSessionIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.playlog = os.path.join(self.tmpdir, "playlog.txt")
+        self.persist = os.path.join(self.tmpdir, "sessions", "test.json")
+        with open(self.playlog, "w", encoding="utf-8") as f:
+            f.write(join_line("Pelaaja", "1.1.1.1", 1))
+            f.write("<-- Pelaaja left the game.\n")
+            f.write(join_line("Toinen", "2.2.2.2", 2))
+            f.write(join_line("Pelaaja", "3.3.3.3", 3))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_latest_session_wins(self):
+        index = PlayerSessionIndex(self.playlog)
+        index.load_or_build()
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get("Pelaaja")["ip"], "3.3.3.3")
+        self.assertEqual(index.get("Pelaaja")["ban_command"], "/banaddress 3.3.3.3 9999999 Pelaaja 1124073472")
+        self.assertIsNone(index.get("Tuntematon"))
+
+    def test_record_updates_index(self):
+        index = PlayerSessionIndex(self.playlog)
+        index.load_or_build()
+        je = LogParser().parse_player_join(join_line("Toinen", "4.4.4.4", 5))
+        index.record(je)
+        self.assertEqual(index.get("Toinen")["ip"], "4.4.4.4")
+
+    def test_persisted_index_catches_up(self):
+        index = PlayerSessionIndex(self.playlog, persist_path=self.persist)
+        index.load_or_build()
+        self.assertTrue(os.path.exists(self.persist))
+
+        with open(self.playlog, "a", encoding="utf-8") as f:
+            f.write(join_line("Kolmas", "5.5.5.5", 6))
+
+        reloaded = PlayerSessionIndex(self.playlog, persist_path=self.persist)
+        reloaded.load_or_build()
+        self.assertEqual(reloaded.get("Pelaaja")["ip"], "3.3.3.3")
+        self.assertEqual(reloaded.get("Kolmas")["ip"], "5.5.5.5")
+
+    def test_record_advances_saved_offset(self):
+        index = PlayerSessionIndex(self.playlog, persist_path=self.persist, save_every=1)
+        index.load_or_build()
+        parser = LogParser()
+        for n, name in enumerate(["Kolmas", "Neljäs"]):
+            line = join_line(name, f"7.7.7.{n}", 10 + n)
+            start = os.path.getsize(self.playlog)
+            with open(self.playlog, "a", encoding="utf-8") as f:
+                f.write(line)
+            with open(self.playlog, "rb") as f:
+                fingerprint, length = file_fingerprint(f.fileno())
+            index.record(parser.parse_player_join(line), Checkpoint(start, 0, fingerprint, length))
+
+        with open(self.persist, encoding="utf-8") as f:
+            saved = json.load(f)
+        # Only the last join line is scanned again on the next start
+        self.assertEqual(os.path.getsize(self.playlog) - saved["playlog"]["offset"],
+                         len(join_line("Neljäs", "7.7.7.1", 11).encode("utf-8")))
+        self.assertEqual(saved["sessions"]["Kolmas"]["ip"], "7.7.7.0")
+        reloaded = PlayerSessionIndex(self.playlog, persist_path=self.persist)
+        reloaded.load_or_build()
+        self.assertEqual(reloaded.get("Neljäs")["ip"], "7.7.7.1")
+
+    def _position(self, offset):
+        with open(self.playlog, "rb") as f:
+            fingerprint, length = file_fingerprint(f.fileno())
+            return Checkpoint(offset, os.fstat(f.fileno()).st_ino, fingerprint, length)
+
+    def test_joins_handled_before_restart_are_skipped(self):
+        index = PlayerSessionIndex(self.playlog, persist_path=self.persist, save_every=1)
+        index.load_or_build()
+        parser = LogParser()
+        line = join_line("Kolmas", "7.7.7.7", 10)
+        start = os.path.getsize(self.playlog)
+        with open(self.playlog, "a", encoding="utf-8") as f:
+            f.write(line)
+        self.assertTrue(index.record(parser.parse_player_join(line), self._position(start)))
+
+        # The tailer's checkpoint was older, the same line is read again after the restart
+        reloaded = PlayerSessionIndex(self.playlog, persist_path=self.persist)
+        reloaded.load_or_build()
+        self.assertFalse(reloaded.record(parser.parse_player_join(line), self._position(start)))
+        later = join_line("Neljäs", "8.8.8.8", 11)
+        with open(self.playlog, "a", encoding="utf-8") as f:
+            f.write(later)
+        self.assertTrue(reloaded.record(parser.parse_player_join(later), self._position(start + len(line))))
+
+    def test_oldest_joins_are_dropped(self):
+        index = PlayerSessionIndex(self.playlog, persist_path=self.persist, max_players=2)
+        index.load_or_build()
+        # Pelaaja joined again after Toinen, so Toinen is the oldest
+        self.assertEqual(len(index), 2)
+        index.record(LogParser().parse_player_join(join_line("Kolmas", "5.5.5.5", 6)))
+        self.assertIsNone(index.get("Toinen"))
+        self.assertEqual(index.get("Pelaaja")["ip"], "3.3.3.3")
+        index.save()
+        reloaded = PlayerSessionIndex(self.playlog, persist_path=self.persist, max_players=1)
+        reloaded.load_or_build()
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.get("Kolmas")["ip"], "5.5.5.5")
+
+    def test_cp1252_names(self):
+        with open(self.playlog, "ab") as f:
+            f.write(join_line("Äijä", "6.6.6.6", 7).encode("cp1252"))
+        index = PlayerSessionIndex(self.playlog)
+        index.load_or_build()
+        self.assertEqual(index.get("Äijä")["ip"], "6.6.6.6")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from task_scheduler import DelayedTaskScheduler
+
+
+def test_tasks_run_in_due_order():
+    scheduler = DelayedTaskScheduler(workers=1)
+    order = []
+    try:
+        scheduler.schedule(0.15, order.append, "c")
+        scheduler.schedule(0.05, order.append, "a")
+        scheduler.schedule(0.10, order.append, "b")
+        assert scheduler.join(timeout=5)
+        assert order == ["a", "b", "c"]
+    finally:
+        scheduler.close()
+
+
+def test_delay_is_respected():
+    scheduler = DelayedTaskScheduler()
+    ran_at = []
+    try:
+        start = time.monotonic()
+        scheduler.schedule(0.2, lambda: ran_at.append(time.monotonic()))
+        assert scheduler.join(timeout=5)
+        assert ran_at[0] - start >= 0.19
+    finally:
+        scheduler.close()
+
+
+def test_same_key_is_coalesced_while_pending():
+    scheduler = DelayedTaskScheduler()
+    calls = []
+    try:
+        assert scheduler.schedule(0.1, calls.append, 1, key="flush")
+        assert not scheduler.schedule(0.1, calls.append, 2, key="flush")
+        assert scheduler.join(timeout=5)
+        # Once it has run the key is free again
+        assert scheduler.schedule(0, calls.append, 3, key="flush")
+        assert scheduler.join(timeout=5)
+        assert calls == [1, 3]
+        assert scheduler.stats()['coalesced'] == 1
+    finally:
+        scheduler.close()
+
+
+def test_worker_pool_is_bounded():
+    scheduler = DelayedTaskScheduler(workers=2)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def task():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    try:
+        before = threading.active_count()
+        for _ in range(20):
+            scheduler.schedule(0, task)
+        assert threading.active_count() <= before + 2
+        assert scheduler.join(timeout=5)
+        assert peak[0] == 2
+        assert scheduler.stats()['completed'] == 20
+    finally:
+        scheduler.close()
+
+
+def test_failing_task_does_not_stop_the_worker():
+    scheduler = DelayedTaskScheduler(workers=1)
+    done = []
+    try:
+        scheduler.schedule(0, lambda: 1 / 0)
+        scheduler.schedule(0, done.append, True)
+        assert scheduler.join(timeout=5)
+        assert done == [True]
+        assert scheduler.stats()['failed'] == 1
+    finally:
+        scheduler.close()
+
+
+def test_full_scheduler_refuses_and_close_drops_pending():
+    scheduler = DelayedTaskScheduler(max_pending=2)
+    calls = []
+    assert scheduler.schedule(10, calls.append, 1)
+    assert scheduler.schedule(10, calls.append, 2)
+    assert not scheduler.schedule(10, calls.append, 3)
+    assert scheduler.stats()['rejected'] == 1
+    scheduler.close()
+    assert scheduler.pending() == 0
+    assert not scheduler.schedule(0, calls.append, 4)
+    assert calls == []
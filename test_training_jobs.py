@@ -0,0 +1,135 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import read_manifest
+from training_jobs import TrainingJobManager, OnlineTrainingJobManager, TrainingBusyError
+from test_training_store import make_store
+
+class CountingExecutor(ThreadPoolExecutor):
+    """The detector's shared worker pool in asyncio mode, counts what is run on it"""
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+    
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+def train_on_loop(manager, progress):
+    """Run one job with a CountingExecutor as the loop's default executor"""
+    executor = CountingExecutor()
+    
+    async def scenario():
+        asyncio.get_running_loop().set_default_executor(executor)
+        return await manager.train("moderaattori", progress)
+    
+    return asyncio.run(scenario()), executor.submitted
+
+def test_job_streams_progress_and_publishes(tmp_path):
+    model_path = str(tmp_path / "models" / "violation_model.joblib")
+    manager = TrainingJobManager(make_store(tmp_path), model_path, min_accuracy=0.5)
+    lines = []
+    
+    async def progress(line):
+        lines.append(line)
+    
+    try:
+        result, shared_pool_jobs = train_on_loop(manager, progress)
+    finally:
+        manager.close()
+    
+    assert result["published"]
+    # Progress is relayed by a thread of its own, not by polling on the shared pool
+    assert shared_pool_jobs == 0
+    assert read_manifest(model_path)["version"] == result["version"]
+    assert any(line.startswith("Loaded 320 rows") for line in lines)
+    assert any("accuracy" in line for line in lines)
+
+def test_job_below_threshold_is_not_published(tmp_path):
+    model_path = str(tmp_path / "models" / "violation_model.joblib")
+    manager = TrainingJobManager(make_store(tmp_path), model_path, min_accuracy=1.01)
+    
+    async def progress(line):
+        pass
+    
+    try:
+        result = asyncio.run(manager.train("moderaattori", progress))
+    finally:
+        manager.close()
+    
+    assert not result["published"]
+    assert not os.path.exists(model_path)
+
+def test_compiled_mismatch_publishes_joblib_only(tmp_path, monkeypatch):
+    import train_model
+    
+    class WrongModel:
+        def predict(self, texts):
+            return ["OK"] * len(texts)
+    
+    monkeypatch.setattr(train_model, "compile_pipeline", lambda pipeline: WrongModel())
+    model_path = str(tmp_path / "models" / "violation_model.joblib")
+    result = train_model.train_model(make_store(tmp_path), model_path, progress=lambda line: None)
+    assert result["published"] and result["compiled_agreement"] < 1.0
+    manifest = read_manifest(model_path)
+    assert manifest["version"] == result["version"] and manifest["npz"] is None
+
+def test_online_job_retrains_the_live_model(tmp_path):
+    from test_online_learner import _setup
+    analyzer, learner = _setup(tmp_path)
+    lines = []
+    
+    async def progress(line):
+        lines.append(line)
+    
+    manager = OnlineTrainingJobManager(learner, min_accuracy=0.5)
+    result, shared_pool_jobs = train_on_loop(manager, progress)
+    manager.close()
+    assert result["published"] and result["accuracy"] >= 0.5
+    assert shared_pool_jobs == 0
+    assert analyzer.model_info()["version"] == result["version"] == "online-1"
+    assert any(line.startswith("Loaded 320 rows") for line in lines)
+    assert any("accuracy" in line for line in lines)
+    # No TF-IDF model is trained or published in online mode
+    assert not os.path.exists(str(tmp_path / "models"))
+    
+    result = asyncio.run(OnlineTrainingJobManager(learner, min_accuracy=1.01).train("moderaattori", progress))
+    assert not result["published"]
+    assert analyzer.model_info()["version"] == "online-1"
+
+class SlowManager(TrainingJobManager):
+    """Replaces the worker process with a job that waits for a signal"""
+    def __init__(self):
+        super().__init__(max_queued=1)
+        self.release = None
+        self.runs = 0
+    
+    async def _run(self, progress):
+        self.runs += 1
+        await self.release.wait()
+        return {"published": False}
+
+def test_duplicate_jobs_are_queued_then_rejected():
+    manager = SlowManager()
+    messages = []
+    
+    async def progress(line):
+        messages.append(line)
+    
+    async def scenario():
+        manager.release = asyncio.Event()
+        first = asyncio.create_task(manager.train("a", progress))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(manager.train("b", progress))
+        await asyncio.sleep(0)
+        try:
+            await manager.train("c", progress)
+            assert False, "expected TrainingBusyError"
+        except TrainingBusyError:
+            pass
+        manager.release.set()
+        await asyncio.gather(first, second)
+    
+    asyncio.run(scenario())
+    assert manager.runs == 2
+    assert len(messages) == 1 and "jonossa" in messages[0]
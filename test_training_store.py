@@ -0,0 +1,96 @@
+import csv
+from training_store import TrainingStore, open_store, content_hash
+from test_compiled_model import TEXTS, LABELS
+
+def make_store(tmp_path, variants=20):
+    """Store with `variants` distinct copies of every test text"""
+    store_path = str(tmp_path / "training.db")
+    store = TrainingStore(store_path)
+    store.add_many(((f"{t} {i}", l) for i in range(variants) for t, l in zip(TEXTS, LABELS)), "generated")
+    store.close()
+    return store_path
+
+def test_duplicates_are_dropped_and_commas_kept(tmp_path):
+    store = TrainingStore(str(tmp_path / "training.db"))
+    assert store.add_many([("moi, kaikki", "OK"), ("moi, kaikki", "OK"), ("perkele", "MODERATE")]) == 2
+    assert store.add_many([("perkele", "SEVERE"), ("", "OK"), ("x", "HUONO")]) == 0
+    texts, labels = store.load()
+    assert sorted(zip(texts, labels)) == [("moi, kaikki", "OK"), ("perkele", "MODERATE")]
+
+def test_moderator_decision_relabels(tmp_path):
+    store = TrainingStore(str(tmp_path / "training.db"))
+    store.add_many([("perkele", "MODERATE")], "generated")
+    assert store.add("perkele", "OK", source="moderator")
+    assert store.load() == (["perkele"], ["OK"])
+    assert store.counts() == {("moderator", "OK"): 1}
+    assert store.load(sources=["generated"]) == ([], [])
+
+def test_csv_import_later_rows_win_and_keep_moderators(tmp_path):
+    csv_path = tmp_path / "training_data.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerows([["text", "label"], ["perkele", "MODERATE"], ["moi", "OK"], ["huijari", "MINOR"],
+                          ["perkele", "OK"], ["vanha", "OK", "replay"]])
+    store = TrainingStore(str(tmp_path / "training.db"))
+    store.add("huijari", "SEVERE", source="moderator")
+    store.add_many([("moi", "MINOR")], "generated")
+    
+    assert store.import_csv(str(csv_path)) == 3
+    texts, labels = store.load(include_replay=True)
+    assert dict(zip(texts, labels)) == {"perkele": "OK", "moi": "OK", "huijari": "SEVERE", "vanha": "OK"}
+    # A later relabel in the old CSV was a moderator decision, the store's own decision stays
+    assert store.counts() == {("moderator", "OK"): 1, ("imported", "OK"): 1,
+                              ("moderator", "SEVERE"): 1, ("replay", "OK"): 1}
+    assert store.import_csv(str(csv_path)) == 0
+
+def test_imported_rows_are_never_trimmed_or_replaced(tmp_path):
+    import pytest
+    csv_path = tmp_path / "training_data.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["text", "label"], ["uusi päätös", "SEVERE"], ["moi", "OK"]])
+    store = open_store(str(tmp_path / "training.db"), legacy_csv=str(csv_path))
+    assert store.counts() == {("imported", "SEVERE"): 1, ("imported", "OK"): 1}
+    # Generated rows never relabel them and trim() refuses to touch them
+    store.add_many([("uusi päätös", "OK")], "generated")
+    assert store.trim("SEVERE", 0) == 0
+    with pytest.raises(ValueError):
+        store.trim("SEVERE", 0, source="imported")
+    assert dict(zip(*store.load())) == {"uusi päätös": "SEVERE", "moi": "OK"}
+
+def test_replay_rows_are_loaded_only_when_asked(tmp_path):
+    store = TrainingStore(str(tmp_path / "training.db"))
+    store.add_many([("perkele", "MODERATE")], "generated")
+    store.add_many([("moi kaikki", "OK")], "replay")
+    assert store.load() == (["perkele"], ["MODERATE"])
+    assert sorted(store.load(include_replay=True)[0]) == ["moi kaikki", "perkele"]
+    assert store.load(sources=["replay"]) == (["moi kaikki"], ["OK"])
+
+def test_balanced_class_weights_match_sklearn():
+    import numpy as np
+    from sklearn.utils.class_weight import compute_class_weight
+    from online_learner import balanced_class_weights
+    labels = ["OK"] * 30 + ["SEVERE"] * 3 + ["MINOR"] * 7
+    classes = np.unique(labels)
+    expected = dict(zip(classes, compute_class_weight("balanced", classes=classes, y=labels)))
+    weights = balanced_class_weights(labels)
+    assert weights.keys() == expected.keys()
+    assert all(abs(weights[label] - expected[label]) < 1e-12 for label in weights)
+
+def test_legacy_csv_is_imported_once(tmp_path):
+    csv_path = tmp_path / "training_data.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "label"])
+        writer.writerow(["Olipa kiva made, joka nousi!", "OK"])
+        writer.writerow(["liity tähän", "MINOR"])
+        writer.writerow(["liity tähän", "MINOR"])
+        f.write("rikki,rivi,liikaa\n")
+    
+    store = open_store(str(tmp_path / "training.db"))
+    assert len(store) == 2
+    store.add("uusi", "OK")
+    store.close()
+    
+    store = open_store(str(tmp_path / "training.db"))
+    assert len(store) == 3
+    assert content_hash("uusi") != content_hash("uusi ")
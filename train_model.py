@@ -1,22 +1,41 @@
-import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
-import joblib
 import os
+import time
+from typing import Callable, Optional
+from compiled_model import compile_pipeline
+from model_registry import publish_model
+from training_store import open_store
 
-def train_model():
-    # Load data
-    if not os.path.exists("data/training_data.csv"):
-        print("Training data not found. Run generate_training_data.py first.")
-        return
+def train_model(
+    store_path: str = "data/training.db",
+    model_path: str = "models/violation_model.joblib",
+    min_accuracy: float = 0.0,
+    progress: Callable[[str], None] = print
+) -> Optional[dict]:
+    """
+    Train the TF-IDF + LogisticRegression pipeline and publish it as a new version
+
+    Args:
+        store_path: Training store (the old CSV is imported on first use)
+        model_path: Unversioned model path, see model_registry.publish_model
+        min_accuracy: The model is only published if test accuracy reaches this
+        progress: Receives a line of text after every step
 
-    df = pd.read_csv("data/training_data.csv", on_bad_lines='skip')
-    # Cleanup any NaN values if present
-    df = df.dropna(subset=['text', 'label'])
-    X = df["text"]
-    y = df["label"]
+    Returns:
+        rows, fit_seconds, accuracy, published, version and compiled_agreement, or None without data
+    """
+    # Load data
+    store = open_store(store_path)
+    start = time.perf_counter()
+    X, y = store.load()
+    store.close()
+    if not X:
+        progress("Training data not found. Run generate_training_data.py first.")
+        return None
+    progress(f"Loaded {len(X)} rows from {store_path} in {time.perf_counter() - start:.2f} s")
 
     # Split data (though it's small, good practice)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -25,21 +44,50 @@ def train_model():
     # We use char_wb analyzer to better handle nicknames and Finnish suffixes
     pipeline = Pipeline([
         ('tfidf', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5))),
-        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000))
+        # The store keeps each text once, so classes are balanced by weight instead of by copies
+        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000, class_weight='balanced'))
     ])
 
     # Train
-    print("Training model...")
+    progress(f"Training model on {len(X_train)} rows...")
+    start = time.perf_counter()
     pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    progress(f"Model trained in {fit_seconds:.1f} s")
 
     # Evaluate
     score = pipeline.score(X_test, y_test)
-    print(f"Model accuracy on test set: {score:.2f}")
+    progress(f"Model accuracy on test set: {score:.4f}")
+
+    result = {
+        'rows': len(X),
+        'fit_seconds': fit_seconds,
+        'accuracy': score,
+        'published': False,
+        'version': None,
+        'compiled_agreement': None
+    }
+    if score < min_accuracy:
+        progress(f"Accuracy below the threshold {min_accuracy:.4f}, model not published")
+        return result
+
+    # The compact .npz is only published if it labels the test set exactly like sklearn
+    try:
+        compiled = compile_pipeline(pipeline)
+        agreement = float((compiled.predict(list(X_test)) == pipeline.predict(X_test)).mean())
+        progress(f"Compiled model label agreement on test set: {agreement:.2%}")
+    except ValueError as e:
+        agreement = 0.0
+        progress(f"Model could not be compiled: {e}")
+    publish_compiled = agreement == 1.0
+    if not publish_compiled:
+        progress("Compiled model differs from sklearn, publishing the joblib model only")
 
-    # Save model
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(pipeline, "models/violation_model.joblib")
-    print("Model saved to models/violation_model.joblib")
+    # Publish a new version, running detectors pick it up
+    version = publish_model(pipeline, model_path, accuracy=score, compiled=publish_compiled)
+    result.update(published=True, version=version, compiled_agreement=agreement)
+    progress(f"Model version {version} published to {os.path.dirname(model_path) or '.'}/")
+    return result
 
 if __name__ == "__main__":
     train_model()
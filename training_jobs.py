@@ -0,0 +1,180 @@
+"""
+Training Jobs
+Runs train_model.train_model() in a worker process owned by the detector and
+streams its progress lines back to the caller (the !train command). Only one
+job trains at a time, one more may wait, further requests are rejected.
+In online mode OnlineTrainingJobManager runs the online learner's full
+retrain instead, with the same queueing and progress lines.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Awaitable, Optional
+
+from logger import log
+
+
+def _run_job(store_path: str, model_path: str, min_accuracy: float, progress_queue) -> Optional[dict]:
+    """Worker process entry point, imports stay warm between jobs"""
+    from train_model import train_model
+    return train_model(store_path, model_path, min_accuracy, progress=progress_queue.put)
+
+
+class TrainingBusyError(Exception):
+    """A job is already running and the queue is full"""
+
+
+class TrainingJobManager:
+    """Serialises training jobs and runs them in a single-worker process pool"""
+
+    def __init__(
+        self,
+        store_path: str = "data/training.db",
+        model_path: str = "models/violation_model.joblib",
+        min_accuracy: float = 0.95,
+        max_queued: int = 1
+    ):
+        """
+        Args:
+            store_path: Training store
+            model_path: Unversioned model path the versions are published next to
+            min_accuracy: Test accuracy a new model needs to be published
+            max_queued: Jobs allowed to wait behind the running one
+        """
+        self.store_path = store_path
+        self.model_path = model_path
+        self.min_accuracy = min_accuracy
+        self.max_queued = max_queued
+
+        self.running_for: Optional[str] = None
+        self._waiting = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._mp_manager = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the detector process has threads, forking it is not safe
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+            self._mp_manager = context.Manager()
+        return self._executor
+
+    async def train(self, requested_by: str, progress: Callable[[str], Awaitable[None]]) -> Optional[dict]:
+        """
+        Train (or wait for the running job and then train) a new model
+
+        Args:
+            requested_by: Shown to others while the job runs
+            progress: Awaited with every progress line
+
+        Returns:
+            train_model() result
+
+        Raises:
+            TrainingBusyError: if a job is running and the queue is full
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._lock.locked():
+            if self._waiting >= self.max_queued:
+                raise TrainingBusyError(f"Opetus on jo käynnissä ({self.running_for}) ja jonossa on jo seuraava")
+            await progress(f"⏳ Opetus on jonossa, {self.running_for} aloitti edellisen")
+
+        self._waiting += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            self.running_for = requested_by
+            return await self._run(progress)
+        finally:
+            self.running_for = None
+            self._lock.release()
+
+    async def _run(self, progress: Callable[[str], Awaitable[None]]) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        progress_queue = self._mp_manager.Queue()
+        lines: asyncio.Queue = asyncio.Queue()
+
+        def forward():
+            # A thread of its own blocks on the queue, the shared worker pool stays free
+            try:
+                for line in iter(progress_queue.get, None):
+                    loop.call_soon_threadsafe(lines.put_nowait, line)
+            except (EOFError, OSError) as e:
+                log.warning(f"⚠️ Opetuksen edistymisviestien välitys katkesi: {e}")
+            finally:
+                loop.call_soon_threadsafe(lines.put_nowait, None)
+
+        threading.Thread(target=forward, name="TrainingProgress", daemon=True).start()
+        future = loop.run_in_executor(
+            pool, _run_job, self.store_path, self.model_path, self.min_accuracy, progress_queue
+        )
+        # The worker has put all of its lines by the time it returns, None ends the forwarding after them
+        future.add_done_callback(lambda _: progress_queue.put(None))
+
+        while (line := await lines.get()) is not None:
+            await progress(line)
+
+        try:
+            return await future
+        except BrokenProcessPool:
+            log.error("❌ Opetusprosessi kaatui, luodaan uusi seuraavaa opetusta varten")
+            self.close()
+            raise
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
+            self._mp_manager = None
+
+
+class OnlineTrainingJobManager(TrainingJobManager):
+    """!train in online mode: a gated full retrain of the live SGD model on a thread"""
+
+    def __init__(self, learner, min_accuracy: float = 0.95, max_queued: int = 1):
+        """
+        Args:
+            learner: OnlineLearner whose model is retrained
+            min_accuracy: Test accuracy the retrained model needs to be installed
+            max_queued: Jobs allowed to wait behind the running one
+        """
+        super().__init__(store_path=learner.store_path, min_accuracy=min_accuracy, max_queued=max_queued)
+        self.learner = learner
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, progress: Callable[[str], Awaitable[None]]) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+
+        def report(line: Optional[str]):
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+
+        def job() -> Optional[dict]:
+            try:
+                return self.learner.full_retrain(self.min_accuracy, report)
+            finally:
+                report(None)
+
+        # A retrain takes minutes, it must not hold a worker of the shared pool (asyncio mode)
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="OnlineRetrain")
+        future = loop.run_in_executor(self._thread_pool, job)
+        while (line := await lines.get()) is not None:
+            await progress(line)
+        return await future
+
+    def close(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = None
+        super().close()
@@ -0,0 +1,279 @@
+"""
+Training Store
+The labelled corpus in SQLite, one row per distinct text keyed by a 64-bit
+content hash, with label, source (generated / moderator / replay / imported)
+and time. Replaces appending to data/training_data.csv, whose rows are kept
+as "imported".
+
+Usage:
+    python training_store.py import data/training_data.csv
+"""
+
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from hashlib import blake2b
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple, Sequence
+
+from logger import log
+
+
+LABELS = ("OK", "MINOR", "MODERATE", "SEVERE")
+SOURCES = ("generated", "moderator", "replay", "imported")
+# Rows that trim() and the generators never delete or relabel
+PROTECTED_SOURCES = ("moderator", "imported")
+
+
+def content_hash(text: str) -> int:
+    """Signed 64-bit hash of the text, used as the row id"""
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class TrainingStore:
+    """Deduplicated labelled samples for training"""
+
+    def __init__(self, db_path: str = "data/training.db"):
+        """
+        Open (and create) the store
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._bulk = False
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS samples (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def add(self, text: str, label: str, source: str = "moderator") -> bool:
+        """
+        Add one sample. A moderator decision replaces the label of an existing
+        text, other sources never overwrite.
+
+        Returns:
+            True if a row was inserted or relabelled
+        """
+        return self.add_many([(text, label)], source) > 0
+
+    def add_many(self, samples: Iterable[Tuple[str, str]], source: str = "generated") -> int:
+        """
+        Add samples in one transaction, exact duplicates are dropped
+
+        Returns:
+            Number of rows inserted (or relabelled for moderator samples)
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source: {source}")
+        now = time.time()
+        rows = [(content_hash(text), text, label, source, now)
+                for text, label in samples if text and label in LABELS]
+        # Inserting in key order touches far fewer b-tree pages
+        rows.sort(key=itemgetter(0))
+        if source == "moderator":
+            sql = """
+                INSERT INTO samples (id, text, label, source, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    label = excluded.label, source = excluded.source, created_at = excluded.created_at
+            """
+        else:
+            sql = "INSERT OR IGNORE INTO samples (id, text, label, source, created_at) VALUES (?, ?, ?, ?, ?)"
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(sql, rows)
+            if not self._bulk:
+                self._conn.commit()
+            return self._conn.total_changes - before
+
+    @contextmanager
+    def bulk(self, cache_mb: int = 64):
+        """
+        Batch many add_many() calls into one transaction with a larger page
+        cache, for generators and imports that write hundreds of thousands of rows
+        """
+        with self._lock:
+            self._conn.execute(f"PRAGMA cache_size=-{cache_mb * 1024}")
+            self._bulk = True
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._bulk = False
+                self._conn.commit()
+                self._conn.execute("PRAGMA cache_size=-2000")
+
+    def load(self, sources: Optional[Sequence[str]] = None,
+             include_replay: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        All texts and labels, ordered by content hash so the order is stable
+
+        Args:
+            sources: Only these sources (default: all but "replay")
+            include_replay: With the default sources, also load "replay" rows, which
+                are a model's own predictions rather than decided labels
+        """
+        if not sources:
+            sources = SOURCES if include_replay else [s for s in SOURCES if s != "replay"]
+        sql = f"SELECT text, label FROM samples WHERE source IN ({','.join('?' * len(sources))})"
+        params = tuple(sources)
+        sql += " ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not rows:
+            return [], []
+        texts, labels = zip(*rows)
+        return list(texts), list(labels)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+    def counts(self, since: Optional[float] = None) -> dict:
+        """Row count per (source, label), only rows added at or after `since` if given"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, label, COUNT(*) FROM samples WHERE created_at >= ? GROUP BY source, label",
+                (since if since is not None else float("-inf"),)
+            ).fetchall()
+        return {(source, label): n for source, label, n in rows}
+
+    def trim(self, label: str, keep: int, source: str = "generated", since: Optional[float] = None) -> int:
+        """
+        Keep at most `keep` rows of one label and source. The rows with the
+        smallest content hashes stay, a pseudo-random subset that is the same
+        on every run. With `since` only rows added at or after it are
+        counted and deleted, older rows are left alone.
+
+        Returns:
+            Number of rows deleted
+
+        Raises:
+            ValueError: For moderator decisions and imported rows, which are never trimmed
+        """
+        if source in PROTECTED_SOURCES:
+            raise ValueError(f"{source} rows are never trimmed")
+        with self._lock:
+            # The first row past `keep` is the boundary, NULL (nothing deleted) if there are fewer
+            since = since if since is not None else float("-inf")
+            cursor = self._conn.execute("""
+                DELETE FROM samples WHERE source = ? AND label = ? AND created_at >= ? AND id >= (
+                    SELECT id FROM samples WHERE source = ? AND label = ? AND created_at >= ?
+                    ORDER BY id LIMIT 1 OFFSET ?
+                )
+            """, (source, label, since, source, label, since, keep))
+            if not self._bulk:
+                self._conn.commit()
+            return cursor.rowcount
+
+    def import_csv(self, csv_path: str, source: str = "imported", chunk_size: int = 10000) -> int:
+        """
+        Import a text,label CSV such as the old data/training_data.csv.
+        A later row for the same text wins. The old CSV has no provenance (it
+        mixes generated rows and moderator decisions), so its rows are kept as
+        "imported", which trim() and the generators leave alone. Only a moderator
+        decision relabels a text later in the file, such rows are kept as
+        "moderator". A third column text,label,source is used as is.
+        Moderator decisions already in the store are never overwritten by other
+        sources, nor imported rows by generated or replayed ones. Malformed rows
+        are skipped and re-importing the same file changes nothing.
+
+        Args:
+            csv_path: CSV file
+            source: Source of rows without a source column
+            chunk_size: Rows per insert batch
+
+        Returns:
+            Number of rows inserted or relabelled
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source: {source}")
+        # Resolve the file first, later rows replace earlier ones
+        latest: Dict[int, Tuple[str, str, str]] = {}
+        with open(csv_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) == 3 and row[2] in SOURCES:
+                    row_source = row[2]
+                elif len(row) == 2:
+                    row_source = source
+                else:
+                    continue
+                text, label = row[0], row[1].strip()
+                if not text or label not in LABELS:
+                    continue
+                key = content_hash(text)
+                earlier = latest.get(key)
+                if earlier and len(row) == 2 and (earlier[1] != label or earlier[2] == "moderator"):
+                    row_source = "moderator"
+                latest[key] = (text, label, row_source)
+
+        now = time.time()
+        rows = sorted((key, text, label, row_source, now) for key, (text, label, row_source) in latest.items())
+        sql = """
+            INSERT INTO samples (id, text, label, source, created_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                label = excluded.label, source = excluded.source, created_at = excluded.created_at
+            WHERE (samples.source NOT IN ('moderator', 'imported') OR excluded.source = 'moderator'
+                   OR (samples.source = 'imported' AND excluded.source = 'imported'))
+              AND (samples.label != excluded.label OR samples.source != excluded.source)
+        """
+        added = 0
+        with self.bulk():
+            for i in range(0, len(rows), chunk_size):
+                with self._lock:
+                    before = self._conn.total_changes
+                    self._conn.executemany(sql, rows[i:i + chunk_size])
+                    added += self._conn.total_changes - before
+        log.info(f"💾 Tuotu {added} uutta tai muuttunutta opetusnäytettä tiedostosta {csv_path}")
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(db_path: str = "data/training.db", legacy_csv: Optional[str] = None) -> TrainingStore:
+    """
+    Open the store, importing the old CSV once if the store is still empty
+
+    Args:
+        db_path: Path to the SQLite file
+        legacy_csv: CSV to import (default: training_data.csv next to the store)
+    """
+    store = TrainingStore(db_path)
+    if legacy_csv is None:
+        legacy_csv = os.path.join(os.path.dirname(db_path), "training_data.csv")
+    if len(store) == 0 and os.path.exists(legacy_csv):
+        store.import_csv(legacy_csv)
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "import":
+        print(__doc__)
+        sys.exit(1)
+    store = TrainingStore()
+    start = time.perf_counter()
+    added = store.import_csv(sys.argv[2])
+    print(f"Imported {added} new rows in {time.perf_counter() - start:.1f} s, store has {len(store)} rows")